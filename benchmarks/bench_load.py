@@ -0,0 +1,277 @@
+"""
+Load test: the three hooks end to end against a shared folder at realistic scale.
+
+Generates a synthetic shared folder (N agents, M days of daily logs, a
+large TASKS.md, months of inbox messages per agent, a multi-MB transcript)
+and runs session_start.py, heartbeat.py and pre_compact_handover.py as
+their own processes, the way Claude Code does. For each event it reports:
+
+- wall time p50 / p95 / p99 over --runs runs (after one warm-up run)
+- peak RSS, from os.wait4's resource usage
+- syscalls per event: strace -f -c when strace is installed, otherwise the
+  read/write syscall counts from /proc (marked *)
+- filesystem calls on the shared folder, counted by slowfs.py
+
+PreCompact is measured twice: "pre_compact" appends a few turns before
+each run (the usual incremental pass), "pre_compact_cold" drops the cursor
+so every run parses the whole transcript.
+
+Every event is then run again under slowfs.py, which adds --slow-ms to
+each filesystem call on the shared folder, to approximate a synced or
+network folder. --json saves the results; --compare flags events whose
+p50 or p95 grew by more than --tolerance against a saved run (exit 1).
+
+Usage:
+    python3 benchmarks/bench_load.py [--agents 6] [--days 90] [--tasks 5000]
+        [--messages 5000] [--transcript-mb 20] [--runs 30] [--slow-ms 5]
+        [--json results.json] [--compare results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import (make_sandbox, percentile, write_daily_logs, write_inboxes,  # noqa: E402
+                    write_task_board, write_transcript)
+
+SLOWFS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slowfs.py")
+# Settings that change what is measured (run counts only change the precision)
+SCALE_KEYS = ("agents", "days", "entries", "tasks", "messages", "transcript_mb", "slow_ms", "flags")
+AGENT_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy"]
+
+
+def build_folder(args):
+    """Sandbox with the synthetic shared folder; returns (root, hooks_dir, shared_dir, transcript, chunk)."""
+    agents = [AGENT_NAMES[i % len(AGENT_NAMES)] + ("" if i < len(AGENT_NAMES) else str(i))
+              for i in range(args.agents)]
+    root, hooks_dir, shared = make_sandbox(agents[0], all_agents=agents, prefix="ccm-load-")
+    write_daily_logs(shared, agents, args.days, entries_per_day=args.entries)
+    write_task_board(shared, agents, args.tasks)
+    write_inboxes(shared, agents, args.messages)
+    for name in ("CHANGELOG.md", "DECISIONS.md", "RESOURCES.md", "SQUAD.md"):
+        with open(os.path.join(shared, name), "w") as f:
+            f.write(f"# {name}\n")
+    transcript = os.path.join(root, "transcript.jsonl")
+    write_transcript(transcript, int(args.transcript_mb * 1_000_000))
+    chunk = os.path.join(root, "turns.jsonl")  # appended before each incremental PreCompact
+    write_transcript(chunk, 100_000, seed=1)
+    # Built up front, as PreCompact would have: SessionStart then measures the query, not a build
+    subprocess.run([sys.executable, os.path.join(hooks_dir, "recall.py"), "build", "--quiet"],
+                   env=dict(os.environ, TEMP=root), check=True)
+    return root, hooks_dir, shared, transcript, chunk
+
+
+def events(root, hooks_dir, transcript, chunk):
+    """{name: (script, event, prepare)}; prepare runs before every measured run."""
+    project = os.path.join(root, "project")
+
+    def append_turns():
+        with open(chunk, "rb") as src, open(transcript, "ab") as dst:
+            dst.write(src.read())
+
+    def drop_cursor():
+        for path in glob.glob(os.path.join(root, "claude_precompact_*.json")):
+            os.remove(path)
+
+    compact = {"session_id": "load-session", "transcript_path": transcript, "cwd": project, "trigger": "auto"}
+    return {
+        "session_start": ("session_start.py", {"source": "startup", "cwd": project}, None),
+        "heartbeat": ("heartbeat.py", {"session_id": "load-session", "cwd": project}, None),
+        "pre_compact": ("pre_compact_handover.py", compact, append_turns),
+        "pre_compact_cold": ("pre_compact_handover.py", compact, drop_cursor),
+    }
+
+
+# === Measuring ===
+
+def run_measured(cmd, stdin: bytes, env):
+    """(wall seconds, peak RSS in MB or None) for one process, waited on with os.wait4."""
+    with tempfile.TemporaryFile() as err:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=err, env=env)
+        proc.stdin.write(stdin)
+        proc.stdin.close()
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - t0
+            proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+            # ru_maxrss is KB on Linux, bytes on macOS
+            rss = usage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+        else:
+            proc.wait()
+            wall, rss = time.perf_counter() - t0, None
+        if proc.returncode != 0:
+            err.seek(0)
+            raise RuntimeError(f"{' '.join(cmd)} failed:\n{err.read().decode(errors='replace')}")
+    return wall, rss
+
+
+def count_syscalls(cmd, stdin: bytes, env):
+    """Total syscalls of one run under strace -f -c, or None without strace."""
+    if not shutil.which("strace"):
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".strace", delete=False) as out:
+        path = out.name
+    try:
+        subprocess.run(["strace", "-f", "-c", "-o", path] + cmd, input=stdin,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, check=True)
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[-1] == "total":
+                    return int(parts[2] if len(parts) >= 5 else parts[1])
+    except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+        return None
+    finally:
+        os.remove(path)
+    return None
+
+
+def count_fs_calls(python, script, shared, stdin, env):
+    """(shared-folder filesystem calls by kind, read+write syscalls) from one slowfs.py run at 0 ms."""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        path = out.name
+    try:
+        run_measured(python + [SLOWFS, "--root", shared, "--latency-ms", "0", "--report", path, script], stdin, env)
+        with open(path) as f:
+            report = json.load(f)
+    finally:
+        os.remove(path)
+    proc_io = report.get("proc_io", {})
+    rw = proc_io.get("syscr", 0) + proc_io.get("syscw", 0) if proc_io else None
+    return report.get("fs_calls", {}), rw
+
+
+def measure(cmd, stdin, env, runs, prepare):
+    if prepare:
+        prepare()
+    run_measured(cmd, stdin, env)  # warm-up: .pyc, config and index caches
+    walls, rss = [], []
+    for _ in range(runs):
+        if prepare:
+            prepare()
+        wall, peak = run_measured(cmd, stdin, env)
+        walls.append(wall * 1000)
+        if peak is not None:
+            rss.append(peak)
+    return {
+        "p50": round(percentile(walls, 50), 2),
+        "p95": round(percentile(walls, 95), 2),
+        "p99": round(percentile(walls, 99), 2),
+        "rss_mb": round(max(rss), 1) if rss else None,
+    }
+
+
+# === Reporting ===
+
+def render(results):
+    lines = [f"{'event':<18}{'mode':<9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'RSS MB':>9}{'syscalls':>10}{'fs calls':>10}"]
+    for name, modes in results.items():
+        for mode, r in modes.items():
+            sys_text = "-" if r.get("syscalls") is None else f"{r['syscalls']}{'*' if r.get('syscalls_rw_only') else ''}"
+            lines.append(f"{name:<18}{mode:<9}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+                         f"{(r['rss_mb'] if r['rss_mb'] is not None else float('nan')):>9.1f}"
+                         f"{sys_text:>10}{r.get('fs_calls_total', 0):>10}")
+    return "\n".join(lines)
+
+
+def compare(results, saved, tolerance):
+    """Lines describing each p50/p95 that grew by more than tolerance; [] if none."""
+    regressions = []
+    for name, modes in results.items():
+        for mode, r in modes.items():
+            before = saved.get("results", {}).get(name, {}).get(mode)
+            if not before:
+                continue
+            for key in ("p50", "p95"):
+                growth = r[key] / max(0.001, before[key]) - 1
+                if growth > tolerance:
+                    regressions.append(f"{name} {mode} {key}: {before[key]:.1f} -> {r[key]:.1f} ms ({growth:+.0%})")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--agents", type=int, default=6)
+    ap.add_argument("--days", type=int, default=90, help="days of daily logs per agent (default 90)")
+    ap.add_argument("--entries", type=int, default=6, help="work entries per daily log (default 6)")
+    ap.add_argument("--tasks", type=int, default=5000, help="rows in TASKS.md (default 5000)")
+    ap.add_argument("--messages", type=int, default=5000, help="inbox messages per agent (default 5000)")
+    ap.add_argument("--transcript-mb", type=float, default=20, help="transcript size (default 20)")
+    ap.add_argument("--runs", type=int, default=30, help="measured runs per event (default 30)")
+    ap.add_argument("--slow-ms", type=float, default=5, help="latency per filesystem call in the slow run; 0 skips it")
+    ap.add_argument("--slow-runs", type=int, default=10, help="measured runs per event under the shim (default 10)")
+    ap.add_argument("--flags", default="", help='interpreter flags, e.g. "-S -E"')
+    ap.add_argument("--only", action="append", help="event(s) to run (default: all)")
+    ap.add_argument("--json", help="write results here")
+    ap.add_argument("--compare", help="results file from an earlier --json run")
+    ap.add_argument("--tolerance", type=float, default=0.30, help="allowed p50/p95 growth vs --compare (default 0.30)")
+    args = ap.parse_args()
+
+    python = [sys.executable] + args.flags.split()
+    t0 = time.perf_counter()
+    root, hooks_dir, shared, transcript, chunk = build_folder(args)
+    env = dict(os.environ, TEMP=root)
+    print(f"synthetic folder: {args.agents} agents x {args.days} days, {args.tasks} tasks, "
+          f"{args.messages} messages/agent, {os.path.getsize(transcript) / 1e6:.1f} MB transcript "
+          f"(built in {time.perf_counter() - t0:.1f}s)\n")
+    try:
+        results = {}
+        for name, (script, event, prepare) in events(root, hooks_dir, transcript, chunk).items():
+            if args.only and name not in args.only:
+                continue
+            script = os.path.join(hooks_dir, script)
+            stdin = json.dumps(event).encode()
+            modes = results[name] = {}
+            modes["local"] = measure(python + [script], stdin, env, args.runs, prepare)
+            if prepare:
+                prepare()
+            fs_calls, rw = count_fs_calls(python, script, shared, stdin, env)
+            if prepare:
+                prepare()
+            syscalls = count_syscalls(python + [script], stdin, env)
+            modes["local"].update(fs_calls=fs_calls, fs_calls_total=sum(fs_calls.values()),
+                                  syscalls=syscalls if syscalls is not None else rw,
+                                  syscalls_rw_only=syscalls is None)
+            if args.slow_ms > 0:
+                slow = python + [SLOWFS, "--root", shared, "--latency-ms", str(args.slow_ms), script]
+                modes["slowfs"] = measure(slow, stdin, env, args.slow_runs, prepare)
+                modes["slowfs"].update(fs_calls_total=modes["local"]["fs_calls_total"])
+        print(render(results))
+        if any(r.get("syscalls_rw_only") for modes in results.values() for r in modes.values()):
+            print("\n* strace not found: read/write syscalls only (from /proc/<pid>/io)")
+        if args.slow_ms > 0:
+            print(f"slowfs: +{args.slow_ms:g} ms per filesystem call under {shared}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    output = {"recorded": time.strftime("%Y-%m-%d %H:%M"), "python": sys.version.split()[0],
+              "config": {k: getattr(args, k) for k in SCALE_KEYS},
+              "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+            f.write("\n")
+        print(f"\nresults written to {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            saved = json.load(f)
+        if saved.get("config") != output["config"]:
+            print(f"\nnote: {args.compare} was recorded with a different configuration")
+        regressions = compare(results, saved, args.tolerance)
+        print(f"\nvs {args.compare} ({saved.get('recorded')}): "
+              + ("no regressions" if not regressions else f"{len(regressions)} regression(s)"))
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
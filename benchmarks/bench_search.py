@@ -0,0 +1,75 @@
+"""
+Benchmark: memory_search full-text index over months of logs.
+
+Builds a synthetic shared folder (N agents x D days of daily logs), then
+measures:
+- initial index build
+- a no-op refresh (nothing changed: one stat per file)
+- a refresh after one log was appended to
+- query latency (median / p95) over a mix of one- and two-word queries
+
+Usage:
+    python3 benchmarks/bench_search.py [--agents 6] [--days 180] [--queries 200]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import load_hook, make_sandbox, write_daily_logs  # noqa: E402
+
+QUERIES = ["upload", "flaky test", "deploy cache", "race workers", "billing timeout",
+           "rate limit", "migration", "stale cache deploy", "webhook retry", "memory growth"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--agents", type=int, default=6)
+    ap.add_argument("--days", type=int, default=180)
+    ap.add_argument("--entries", type=int, default=6, help="work entries per log (default 6)")
+    ap.add_argument("--queries", type=int, default=200)
+    args = ap.parse_args()
+
+    agents = [f"Agent{i}" for i in range(args.agents)]
+    root, hooks_dir, shared_dir = make_sandbox(agent=agents[0], all_agents=agents)
+    os.environ["TEMP"] = root
+    try:
+        paths = write_daily_logs(shared_dir, agents, args.days, args.entries)
+        size_mb = sum(os.path.getsize(p) for p in paths) / 1e6
+        print(f"{len(paths)} logs, {size_mb:.1f} MB")
+
+        search = load_hook(hooks_dir, "memory_search")
+        db = search.connect(os.path.join(root, "search.sqlite"))
+
+        t0 = time.perf_counter()
+        stats = search.refresh(db, shared_dir)
+        print(f"initial build:   {(time.perf_counter() - t0) * 1000:8.1f} ms  ({stats['docs']} documents)")
+
+        t0 = time.perf_counter()
+        search.refresh(db, shared_dir)
+        print(f"no-op refresh:   {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+        with open(paths[-1], "a", encoding="utf-8") as f:
+            f.write("### 23:59 — Fix upload module\n- **outcome:** Appended during the benchmark.\n")
+        t0 = time.perf_counter()
+        stats = search.refresh(db, shared_dir)
+        print(f"1-file refresh:  {(time.perf_counter() - t0) * 1000:8.1f} ms  ({stats['indexed']} file re-indexed)")
+
+        times = []
+        for i in range(args.queries):
+            t0 = time.perf_counter()
+            search.search(QUERIES[i % len(QUERIES)], k=10, db=db, refresh_first=False)
+            times.append((time.perf_counter() - t0) * 1000)
+        times.sort()
+        print(f"query top-10:    {statistics.median(times):8.2f} ms median, "
+              f"{times[int(0.95 * (len(times) - 1))]:.2f} ms p95")
+        db.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: hook startup cost (interpreter + imports + config), per hook.
+
+Runs each hook end to end as its own process against a small synthetic
+shared folder, the way Claude Code does:
+- wall time over N runs (median / p95), next to a bare `python3 -c pass`
+- total import time and the heaviest imports, from `python3 -X importtime`
+  (median of IMPORT_RUNS runs)
+
+Results are compared with benchmarks/startup_baseline.json, which the
+project tracks; a hook whose import time grows by more than --tolerance
+is reported as a regression (exit 1). Refresh with --update after an
+intentional change.
+
+Usage:
+    python3 benchmarks/bench_startup.py [--runs 20] [--flags "-S -E"] [--update]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import make_sandbox, percentile  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+IMPORT_RUNS = 5  # -X importtime runs per hook; the median one is reported
+
+HOOKS = {
+    "heartbeat": {},
+    "session_start": {"source": "startup", "cwd": "/tmp/project"},
+    "pre_compact_handover": {"session_id": "bench-session", "cwd": "/tmp/project"},
+}
+
+
+def run_once(cmd, stdin, env):
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, input=stdin, capture_output=True, env=env)
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{proc.stderr.decode(errors='replace')}")
+    return elapsed, proc.stderr.decode(errors="replace")
+
+
+def parse_importtime(stderr):
+    """(total self µs, [(cumulative µs, module)] top-level imports) from -X importtime output."""
+    total = 0
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        total += int(self_us)
+        if not name.startswith(" "):
+            top.append((int(cumulative_us), name.strip()))
+    top.sort(reverse=True)
+    return total, top
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=20, help="runs per hook (default 20)")
+    ap.add_argument("--flags", default="-S -E", help='interpreter flags (default "-S -E")')
+    ap.add_argument("--tolerance", type=float, default=0.30, help="allowed import-time growth vs baseline (default 0.30)")
+    ap.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    args = ap.parse_args()
+
+    flags = args.flags.split()
+    root, hooks_dir, shared_dir = make_sandbox(all_agents=["Alice", "Bob", "Carol"])
+    env = dict(os.environ, TEMP=root)
+    try:
+        for name in ("CHANGELOG.md", "DECISIONS.md", "TASKS.md"):
+            with open(os.path.join(shared_dir, name), "w") as f:
+                f.write(f"# {name}\n")
+
+        bare = [run_once([sys.executable] + flags + ["-c", "pass"], b"", env)[0] for _ in range(args.runs)]
+        bare_ms = statistics.median(bare) * 1000
+        print(f"python3 {' '.join(flags)} -c pass: {bare_ms:.1f} ms median\n")
+
+        results = {}
+        for hook, event in HOOKS.items():
+            script = os.path.join(hooks_dir, f"{hook}.py")
+            stdin = json.dumps(event).encode()
+            run_once([sys.executable] + flags + [script], stdin, env)  # warm config/.pyc caches
+            walls = [run_once([sys.executable] + flags + [script], stdin, env)[0] * 1000 for _ in range(args.runs)]
+            # Median of a few -X importtime runs: one run on a busy machine is too noisy to gate on
+            samples = sorted((parse_importtime(run_once([sys.executable] + flags + ["-X", "importtime", script],
+                                                        stdin, env)[1]) for _ in range(IMPORT_RUNS)),
+                             key=lambda sample: sample[0])
+            import_us, top = samples[len(samples) // 2]
+            results[hook] = {
+                "wall_ms_median": round(statistics.median(walls), 2),
+                "wall_ms_p95": round(percentile(walls, 95), 2),
+                "import_us": import_us,
+            }
+            print(f"{hook:<22} wall {results[hook]['wall_ms_median']:6.1f} ms median "
+                  f"({results[hook]['wall_ms_median'] - bare_ms:+.1f} vs bare), p95 {results[hook]['wall_ms_p95']:6.1f} ms, "
+                  f"imports {import_us / 1000:5.1f} ms")
+            print("    heaviest: " + ", ".join(f"{mod} {us / 1000:.1f}ms" for us, mod in top[:5]))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.update:
+        with open(BASELINE, "w") as f:
+            json.dump({"recorded": date.today().isoformat(), "python": sys.version.split()[0],
+                       "flags": args.flags, "hooks": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nbaseline written to {os.path.relpath(BASELINE)}")
+        return 0
+
+    try:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        print("\nno baseline yet — run with --update to record one")
+        return 0
+
+    regressions = []
+    print(f"\nvs baseline ({baseline.get('recorded')}, Python {baseline.get('python')}):")
+    for hook, now in results.items():
+        before = baseline.get("hooks", {}).get(hook)
+        if not before:
+            continue
+        growth = now["import_us"] / max(1, before["import_us"]) - 1
+        flag = "  REGRESSION" if growth > args.tolerance else ""
+        print(f"  {hook:<22} imports {before['import_us'] / 1000:5.1f} -> {now['import_us'] / 1000:5.1f} ms ({growth:+.0%}){flag}")
+        if flag:
+            regressions.append(hook)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Benchmark: raw-byte prefilter vs json.loads on every transcript line.
+
+Generates a synthetic transcript (default 50 MB), then runs
+pre_compact_handover.extract_work_from_transcript from a cold cursor with
+PREFILTER on and off, reporting CPU time per compaction and the saving.
+
+Usage:
+    python3 benchmarks/bench_transcript_prefilter.py [--mb 50] [--runs 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import make_sandbox, load_hook, write_transcript  # noqa: E402
+
+
+def time_extract(mod, transcript, runs):
+    """Best-of-N CPU seconds for a full (cold cursor) extraction."""
+    best = None
+    work = None
+    for _ in range(runs):
+        try:
+            os.remove(mod._cursor_path(transcript))
+        except FileNotFoundError:
+            pass
+        t0 = time.process_time()
+        work = mod.extract_work_from_transcript(transcript)
+        elapsed = time.process_time() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, work
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--mb", type=float, default=50, help="transcript size in MB (default 50)")
+    ap.add_argument("--runs", type=int, default=3, help="runs per mode, best is reported (default 3)")
+    args = ap.parse_args()
+
+    root, hooks_dir, _ = make_sandbox()
+    try:
+        mod = load_hook(hooks_dir, "pre_compact_handover")
+        mod.hook_config.STATE_DIR = root
+        transcript = os.path.join(root, "transcript.jsonl")
+        size = write_transcript(transcript, int(args.mb * 1_000_000))
+
+        mod.PREFILTER = False
+        full, work_full = time_extract(mod, transcript, args.runs)
+        mod.PREFILTER = True
+        fast, work_fast = time_extract(mod, transcript, args.runs)
+
+        if work_full != work_fast:
+            differ = sorted(k for k in set(work_full) | set(work_fast) if work_full.get(k) != work_fast.get(k))
+            print(f"MISMATCH: prefilter changed the extracted summary ({', '.join(differ)})", file=sys.stderr)
+            return 1
+
+        failing = sum(1 for runs in work_fast["commands"].values() if runs[1])
+        print(f"transcript: {size / 1e6:.1f} MB, {work_fast['tool_calls']} tool calls, "
+              f"{failing}/{len(work_fast['commands'])} commands with failures (identical with and without prefilter)")
+        print(f"json.loads every line : {full * 1000:8.1f} ms CPU")
+        print(f"byte prefilter        : {fast * 1000:8.1f} ms CPU")
+        print(f"saved per compaction  : {(full - fast) * 1000:8.1f} ms CPU ({full / fast:.1f}x)")
+        return 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Hooks read agent_config.json from their own directory, so every benchmark
+works on a throwaway copy of hooks/ pointed at a synthetic shared folder.
+Nothing here touches a real shared folder or ~/.claude.
+"""
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOOKS_SRC = os.path.join(REPO_DIR, "hooks")
+
+
+def make_sandbox(agent="Alice", all_agents=None, prefix="ccm-bench-"):
+    """Copy hooks/ into a temp dir with a config pointing at an empty shared folder.
+
+    Returns (root, hooks_dir, shared_dir).
+    """
+    root = tempfile.mkdtemp(prefix=prefix)
+    hooks_dir = os.path.join(root, "hooks")
+    shared_dir = os.path.join(root, "shared")
+    shutil.copytree(HOOKS_SRC, hooks_dir, ignore=shutil.ignore_patterns("__pycache__", "agent_config.json"))
+    os.makedirs(os.path.join(shared_dir, agent, "logs"))
+    cfg = {"agent": agent, "shared_path": shared_dir, "all_agents": all_agents or [agent]}
+    with open(os.path.join(hooks_dir, "agent_config.json"), "w") as f:
+        json.dump(cfg, f)
+    return root, hooks_dir, shared_dir
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (pct in 0-100)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def load_hook(hooks_dir, name):
+    """Import hooks_dir/<name>.py as a fresh module."""
+    if hooks_dir not in sys.path:
+        sys.path.insert(0, hooks_dir)
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", os.path.join(hooks_dir, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def write_transcript(path, target_bytes, seed=0, result_bytes=(2_000, 40_000)):
+    """Write a synthetic transcript JSONL of roughly target_bytes.
+
+    Record layout follows Claude Code transcripts (the top-level "type" comes
+    before "message" in user records and after it in assistant records). The
+    mix mirrors real sessions: each assistant turn (text + one tool_use) is
+    followed by a user tool_result carrying file contents or command output,
+    with the odd system record in between. Tool results dominate the bytes.
+    Every 7th turn is a parallel batch instead: three Bash tool_uses answered
+    by one user record holding all three results, only the middle one
+    failed, so per-result error flags are exercised.
+    """
+    rng = random.Random(seed)
+    tools = ["Read", "Edit", "Write", "Bash", "Grep", "Glob"]
+    # Real source text: quotes, newlines and tabs make JSON decoding work as hard as it does on real tool output
+    with open(os.__file__, encoding="utf-8") as src:
+        filler = src.read()
+    written = 0
+    turn = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target_bytes:
+            turn += 1
+            tool_id = f"toolu_{turn:08d}"
+            name = rng.choice(tools)
+            ts = f"2026-01-01T{(turn // 3600) % 24:02d}:{(turn // 60) % 60:02d}:{turn % 60:02d}.000Z"
+            records = [
+                {
+                    "parentUuid": f"u{turn - 1}", "isSidechain": False, "sessionId": "bench",
+                    "message": {
+                        "id": f"msg_{turn:08d}", "role": "assistant", "model": "bench",
+                        "content": [
+                            {"type": "text", "text": f"Step {turn}: checking module {turn % 17} and updating the handler accordingly."},
+                            {"type": "tool_use", "id": tool_id, "name": name, "input": {
+                                "file_path": f"/repo/src/module_{turn % 17}.py",
+                                "command": f"pytest tests/test_{turn % 11}.py -q",
+                                "description": f"Run tests for module {turn % 11}",
+                            }},
+                        ],
+                        "usage": {"input_tokens": 40 + turn % 9, "output_tokens": 120 + turn % 50,
+                                  "cache_read_input_tokens": 20_000, "cache_creation_input_tokens": 300},
+                    },
+                    "type": "assistant", "uuid": f"a{turn}", "timestamp": ts,
+                },
+                {
+                    "parentUuid": f"a{turn}", "isSidechain": False, "sessionId": "bench", "type": "user",
+                    "message": {"role": "user", "content": [{
+                        "tool_use_id": tool_id, "type": "tool_result",
+                        "content": filler[: rng.randint(*result_bytes)],
+                        "is_error": rng.random() < 0.05,
+                    }]},
+                    "uuid": f"u{turn}", "timestamp": ts,
+                },
+            ]
+            if turn % 7 == 0:
+                records = _parallel_batch(turn, ts, filler, rng, result_bytes)
+            if turn % 25 == 0:
+                records.append({"type": "system", "subtype": "info", "content": "Auto-compact threshold approaching", "timestamp": ts})
+            for rec in records:
+                line = json.dumps(rec, separators=(",", ":")) + "\n"
+                f.write(line)
+                written += len(line)
+    return written
+
+
+def _parallel_batch(turn, ts, filler, rng, result_bytes):
+    """An assistant turn with three Bash tool_uses and one user record with their three results."""
+    ids = [f"toolu_{turn:08d}_{i}" for i in range(3)]
+    commands = [f"make check-{(turn + i) % 5}" for i in range(3)]
+    return [
+        {
+            "parentUuid": f"u{turn - 1}", "isSidechain": False, "sessionId": "bench",
+            "message": {
+                "id": f"msg_{turn:08d}", "role": "assistant", "model": "bench",
+                "content": [{"type": "tool_use", "id": tool_id, "name": "Bash", "input": {"command": command}}
+                            for tool_id, command in zip(ids, commands)],
+                "usage": {"input_tokens": 40, "output_tokens": 90,
+                          "cache_read_input_tokens": 20_000, "cache_creation_input_tokens": 300},
+            },
+            "type": "assistant", "uuid": f"a{turn}", "timestamp": ts,
+        },
+        {
+            "parentUuid": f"a{turn}", "isSidechain": False, "sessionId": "bench", "type": "user",
+            "message": {"role": "user", "content": [
+                {"tool_use_id": tool_id, "type": "tool_result",
+                 "content": filler[: rng.randint(*result_bytes)], "is_error": i == 1}
+                for i, tool_id in enumerate(ids)]},
+            "uuid": f"u{turn}", "timestamp": ts,
+        },
+    ]
+
+
+_TOPICS = ["auth", "billing", "upload", "search", "deploy", "cache", "crawler", "dashboard",
+           "webhook", "migration", "scheduler", "export", "onboarding", "alerts", "payments"]
+_VERBS = ["fix", "build", "research", "deploy", "config", "review", "design"]
+_NOTES = ["flaky test under load", "timeout on large payloads", "race between workers",
+          "missing index on the events table", "retry storm after outage", "stale cache after deploy",
+          "rate limit from the upstream API", "memory growth in long sessions", "slow cold start"]
+
+
+def write_daily_logs(shared_dir, agents, days, entries_per_day=6, seed=0, end=None):
+    """Write `days` daily logs per agent in the template layout (Work Log last).
+
+    Returns the list of log paths written.
+    """
+    from datetime import date, timedelta
+
+    rng = random.Random(seed)
+    end = end or date.today()
+    paths = []
+    for agent in agents:
+        logs = os.path.join(shared_dir, agent, "logs")
+        os.makedirs(logs, exist_ok=True)
+        for back in range(days, 0, -1):
+            day = (end - timedelta(days=back)).isoformat()
+            topic = rng.choice(_TOPICS)
+            lines = [
+                f"# Daily Log — {day}",
+                f"**Agent:** {agent} | **Session start:** 09:00 UTC | **Session end:** 18:00 UTC",
+                "",
+                "## Summary",
+                f"Worked on {topic}: {rng.choice(_NOTES)}.",
+                "",
+                "## Handoff Notes",
+                f"Continue the {topic} work; check the {rng.choice(_TOPICS)} side too.",
+                "",
+                "## Blockers",
+                "None" if rng.random() < 0.7 else f"Waiting on access to the {rng.choice(_TOPICS)} service.",
+                "",
+                "## Work Log",
+                "",
+            ]
+            for i in range(entries_per_day):
+                topic = rng.choice(_TOPICS)
+                status = rng.choice(["done", "done", "in-progress", "blocked"])
+                lines += [
+                    f"### {9 + i:02d}:{rng.randint(0, 59):02d} — {rng.choice(_VERBS).title()} {topic} module",
+                    f"- **project:** {topic}-service",
+                    f"- **type:** {rng.choice(_VERBS)}",
+                    f"- **status:** {status}",
+                    f"- **files_touched:** src/{topic}/handler.py, tests/test_{topic}.py",
+                    f"- **outcome:** {rng.choice(_NOTES).capitalize()} in {topic}; {rng.choice(['resolved', 'mitigated', 'investigating'])}.",
+                    "",
+                ]
+            path = os.path.join(logs, f"{day}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines))
+            paths.append(path)
+    return paths
+
+
+def write_task_board(shared_dir, agents, rows, seed=0):
+    """Write TASKS.md with `rows` active tasks spread over agents, plus a Completed table.
+
+    Returns the board's path.
+    """
+    rng = random.Random(seed)
+    statuses = ["TODO", "In Progress", "Blocked", "Assigned", "Review"]
+    lines = ["# Shared Task Board", f"**Last updated:** 2026-01-01 09:00 by {agents[0]}", "",
+             "## Active Tasks", "",
+             "| ID | Task | Owner | Priority | Status | Assigned By | Notes |",
+             "|----|------|-------|----------|--------|-------------|-------|"]
+    for i in range(rows):
+        owner = rng.choice(agents + ["Unassigned"]) if rng.random() < 0.9 else ", ".join(rng.sample(agents, min(2, len(agents))))
+        lines.append(f"| T{i:05d} | {rng.choice(_VERBS).title()} {rng.choice(_TOPICS)}: {rng.choice(_NOTES)} | {owner} "
+                     f"| P{rng.randint(0, 3)} | {rng.choice(statuses)} | human | |")
+    lines += ["", "## Completed (Last 7 Days)", "",
+              "| ID | Task | Owner | Completed | Notes |", "|----|------|-------|-----------|-------|"]
+    for i in range(rows // 10):
+        lines.append(f"| C{i:05d} | {rng.choice(_VERBS).title()} {rng.choice(_TOPICS)} | {rng.choice(agents)} | 2026-01-01 | |")
+    path = os.path.join(shared_dir, "TASKS.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def write_inboxes(shared_dir, agents, messages, unread=3, seed=0, end=None):
+    """Write `messages` messages per agent as monthly inbox shards (see hooks/inbox.py).
+
+    All but the last `unread` are marked read by the inbox cursor.
+    """
+    from datetime import datetime, timedelta
+
+    rng = random.Random(seed)
+    end = end or datetime.now()
+    for agent in agents:
+        directory = os.path.join(shared_dir, "messages", agent.lower())
+        os.makedirs(directory, exist_ok=True)
+        shards, ends = {}, []  # ends: (shard, offset just past the message) in order
+        for i in range(messages):
+            when = end - timedelta(minutes=(messages - i) * 37)
+            sender = rng.choice([a for a in agents if a != agent] or agents)
+            block = (f"## From {sender} — {when:%Y-%m-%d %H:%M}\n\n"
+                     f"{rng.choice(_VERBS).title()} of {rng.choice(_TOPICS)} is ready: {rng.choice(_NOTES)}.\n\n")
+            data = shards.setdefault(f"{when:%Y-%m}.md", bytearray())
+            data += block.encode("utf-8")
+            ends.append((f"{when:%Y-%m}.md", len(data)))
+        for name, data in shards.items():
+            with open(os.path.join(directory, name), "wb") as f:
+                f.write(data)
+        if messages > unread:
+            with open(os.path.join(directory, ".cursor"), "w") as f:
+                f.write("%s %d\n" % ends[messages - unread - 1])
@@ -0,0 +1,105 @@
+"""
+Slow-filesystem shim: run a hook as if its shared folder were a synced folder.
+
+Synced and network folders (Dropbox, OneDrive, SMB, NFS) are slow per
+metadata operation, not per byte: every stat, open, listdir, rename and
+unlink can cost milliseconds. Without FUSE, this wraps the Python-level
+filesystem calls (os.stat/lstat/open/listdir/scandir/replace/rename/remove/
+mkdir, builtins.open, io.open) so that any call on a path under --root
+sleeps --latency-ms first, then runs the script as __main__. Imports are
+unaffected (importlib uses its own references), so only the hook's own
+I/O on the shared folder is slowed.
+
+The shim also counts the calls it intercepted, per kind, and on exit
+writes them to --report as JSON together with the process's read/write
+syscall counts from /proc/self/io (Linux), for when strace isn't
+available. It imports nothing the hooks don't already, so at 0 ms it
+adds only a few milliseconds to a run.
+
+Usage:
+    python3 benchmarks/slowfs.py --root /path/to/shared --latency-ms 5 \\
+        [--report counts.json] hooks/session_start.py < event.json
+"""
+import atexit
+import builtins
+import io
+import os
+import sys
+import time
+
+# Calls that take a path as their first argument
+PATH_CALLS = ("stat", "lstat", "open", "listdir", "scandir", "replace", "rename", "remove", "unlink", "mkdir", "rmdir")
+
+
+def install(root, latency_s, counts):
+    """Wrap the filesystem calls; returns nothing, counts is filled in per call kind."""
+    root = os.path.abspath(root)
+
+    def wrap(kind, fn):
+        def slowed(path=".", *args, **kwargs):
+            if isinstance(path, (str, bytes, os.PathLike)):
+                target = os.fsdecode(os.fspath(path))
+                if not os.path.isabs(target):
+                    target = os.path.join(os.getcwd(), target)
+                if target.startswith(root):
+                    counts[kind] = counts.get(kind, 0) + 1
+                    if latency_s:
+                        time.sleep(latency_s)
+            return fn(path, *args, **kwargs)
+        slowed.__wrapped__ = fn
+        return slowed
+
+    for name in PATH_CALLS:
+        setattr(os, name, wrap(name, getattr(os, name)))
+    opener = wrap("open", io.open)
+    builtins.open = io.open = opener
+
+
+def proc_io() -> dict:
+    """syscr/syscw (read/write syscalls) and rchar/wchar for this process; {} off Linux."""
+    stats = {}
+    try:
+        with io.FileIO("/proc/self/io") as f:
+            for line in f.read().decode().splitlines():
+                key, _, value = line.partition(":")
+                stats[key.strip()] = int(value)
+    except OSError:
+        pass
+    return stats
+
+
+def main(argv):
+    # Flags by hand rather than argparse: the shim's own startup is part of what gets timed
+    options = {"--root": None, "--latency-ms": "5", "--report": None}
+    while argv and argv[0] in options:
+        if len(argv) < 2:
+            break
+        options[argv[0]] = argv[1]
+        argv = argv[2:]
+    if not argv or options["--root"] is None:
+        print(__doc__.strip().split("Usage:")[1], file=sys.stderr)
+        return 2
+
+    counts = {}
+    report = options["--report"]
+    write = io.open  # the real one, for the report itself
+
+    def dump():
+        if report:
+            import json
+            with write(report, "w") as f:
+                json.dump({"fs_calls": counts, "proc_io": proc_io()}, f)
+
+    atexit.register(dump)
+    script = os.path.abspath(argv[0])
+    with io.open(script, "rb") as f:
+        code = compile(f.read(), script, "exec")
+    install(options["--root"], float(options["--latency-ms"]) / 1000.0, counts)
+    sys.argv = [script] + argv[1:]
+    sys.path[0] = os.path.dirname(script)
+    exec(code, {"__name__": "__main__", "__file__": script, "__builtins__": builtins})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
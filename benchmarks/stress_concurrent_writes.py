@@ -0,0 +1,280 @@
+"""
+Stress test: N concurrent hook processes writing the same shared folder.
+
+Starts N worker processes against one sandbox agent. Each one runs R rounds
+at the same moment as the others; a round is what a busy session does:
+
+    - append a turn to its own transcript, then run PreCompact on it
+      (daily-log entry, metrics record, handover, rollup)
+    - run PreCompact on one transcript shared by every worker, so
+      concurrent compactions of the same session race for its cursor
+    - run the heartbeat (prompt metrics, per-session state)
+    - send a message to the agent's inbox and mark what it sees as read
+
+Then checks that nothing was lost, torn or counted twice: one intact
+daily-log entry per private compaction and one for the shared transcript
+(later compactions of it find nothing new), every metrics line valid JSON with
+the expected counts, the shared transcript's tool calls counted exactly
+once, every message present once, every log byte and message journaled
+exactly once, and the handover pointer and per-session heartbeat state
+readable. Last, an inbox backlog larger than SessionStart shows: nothing
+unread may be marked read unseen, and `inbox.py read` must print it all.
+Exits 1 on any failure.
+
+Usage:
+    python3 benchmarks/stress_concurrent_writes.py [--workers 16] [--rounds 10]
+"""
+import argparse
+import json
+import marshal
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import make_sandbox, write_transcript  # noqa: E402
+
+AGENT = "Alice"
+
+
+def _turn(worker, rnd):
+    """One assistant turn (a Bash call) plus its result, as transcript lines."""
+    tool_id = f"toolu_w{worker}r{rnd}"
+    records = [
+        {"type": "assistant", "timestamp": "2026-01-01T00:00:00.000Z", "message": {
+            "id": f"msg_w{worker}r{rnd}", "role": "assistant",
+            "content": [{"type": "text", "text": f"Marker w{worker}r{rnd} finished its round. Moving on to the next one"},
+                        {"type": "tool_use", "id": tool_id, "name": "Bash",
+                         "input": {"command": f"echo w{worker}r{rnd}"}}],
+            "usage": {"input_tokens": 10, "output_tokens": 20}}},
+        {"type": "user", "timestamp": "2026-01-01T00:00:01.000Z", "message": {
+            "role": "user", "content": [{"tool_use_id": tool_id, "type": "tool_result",
+                                         "content": f"w{worker}r{rnd}", "is_error": False}]}},
+    ]
+    return "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+
+
+def worker(hooks_dir, root, index, rounds, start_at):
+    sys.path.insert(0, hooks_dir)
+    import heartbeat
+    import inbox
+    import pre_compact_handover
+
+    own = os.path.join(root, f"transcript_{index}.jsonl")
+    common = os.path.join(root, "common.jsonl")
+    session = f"session-{index}"
+    time.sleep(max(0.0, start_at - time.time()))
+    for rnd in range(rounds):
+        with open(own, "a", encoding="utf-8") as f:
+            f.write(_turn(index, rnd))
+        pre_compact_handover.run({"transcript_path": own, "session_id": session, "cwd": root})
+        pre_compact_handover.run({"transcript_path": common, "session_id": "common", "cwd": root})
+        heartbeat.run({"session_id": session, "cwd": root})
+        inbox.send(AGENT, f"ping w{index}r{rnd}", sender=f"Worker{index}")
+        messages, _ = inbox.unread(AGENT)
+        if messages:
+            inbox.mark_read(AGENT, messages[-1])
+    return 0
+
+
+# === Checks ===
+
+def check(hooks_dir, shared, root, workers, rounds, common_calls):
+    sys.path.insert(0, hooks_dir)
+    import daily_log
+    import handover_store
+    import inbox
+    import journal
+
+    failures = []
+    markers = {f"w{i}r{r}" for i in range(workers) for r in range(rounds)}
+
+    # Daily log: one whole entry per private compaction, one per shared one
+    logs = os.path.join(shared, AGENT, "logs")
+    text = ""
+    for name in sorted(os.listdir(logs)):
+        if name.endswith(".md"):
+            with open(os.path.join(logs, name), encoding="utf-8") as f:
+                text += f.read()
+    entries = text.split("\n### ")[1:]
+    torn = [e for e in entries if "- **notes:** Auto-logged" not in e]
+    seen = {}
+    for e in entries:
+        for line in e.splitlines():
+            if line.startswith("- **outcome:** Marker "):
+                key = line.split()[3]
+                seen[key] = seen.get(key, 0) + 1
+    expected = 2 * workers * rounds
+    if len(entries) != workers * rounds + 1:
+        failures.append(f"daily log: {len(entries)} entries, expected {workers * rounds + 1}")
+    if torn:
+        failures.append(f"daily log: {len(torn)} torn entries")
+    missing = sorted(markers - set(seen))
+    doubled = sorted(k for k, n in seen.items() if n > 1 and k in markers)
+    if missing:
+        failures.append(f"daily log: {len(missing)} compactions lost (e.g. {missing[0]})")
+    if doubled:
+        failures.append(f"daily log: {len(doubled)} compactions logged twice (e.g. {doubled[0]})")
+    index = daily_log.load_index(os.path.join(logs, sorted(n for n in os.listdir(logs) if n.endswith(".md"))[0]))
+    if not index:
+        failures.append("daily log: index did not load")
+
+    # Metrics: every line whole; counts match; the shared transcript counted once
+    metrics_dir = os.path.join(shared, AGENT, "metrics")
+    records, bad = [], 0
+    for name in os.listdir(metrics_dir):
+        with open(os.path.join(metrics_dir, name), "rb") as f:
+            for raw in f:
+                try:
+                    records.append(json.loads(raw))
+                except ValueError:
+                    bad += 1
+    compactions = [r for r in records if r.get("ev") == "pre_compact"]
+    prompts = [r for r in records if r.get("ev") == "prompt"]
+    common_counted = sum(r.get("tool_calls", 0) for r in compactions if r.get("session") == "common")
+    private_counted = sum(r.get("tool_calls", 0) for r in compactions if r.get("session") != "common")
+    if bad:
+        failures.append(f"metrics: {bad} torn lines")
+    if len(compactions) != expected or len(prompts) != workers * rounds:
+        failures.append(f"metrics: {len(compactions)} pre_compact / {len(prompts)} prompt records, "
+                        f"expected {expected} / {workers * rounds}")
+    if common_counted != common_calls:
+        failures.append(f"metrics: shared transcript counted {common_counted} tool calls, it has {common_calls}")
+    if private_counted != workers * rounds:
+        failures.append(f"metrics: private transcripts counted {private_counted} tool calls, "
+                        f"expected {workers * rounds}")
+
+    # Inbox: every message once, whole; cursor on a message boundary
+    texts = []
+    for shard in inbox.shards(AGENT):
+        with open(os.path.join(inbox.inbox_dir(AGENT), shard), "rb") as f:
+            data = f.read()
+        texts.extend(t for _, _, t in inbox.split_messages(data))
+        cursor_shard, offset = inbox.read_cursor(AGENT)
+        if cursor_shard == shard and offset and not data[offset:].startswith(inbox.HEADING) and offset != len(data):
+            failures.append(f"inbox: cursor {offset} is not on a message boundary")
+    got = [t.rsplit("ping ", 1)[-1] for t in texts]
+    if sorted(got) != sorted(markers):
+        failures.append(f"inbox: {len(got)} messages ({len(set(got))} distinct), expected {len(markers)}")
+
+    # Journal: each message recorded once; the log's journaled ranges tile it with no gap or overlap
+    records = journal.recent(1 << 30)
+    journaled = [r for r in records if r["kind"] == "message"]
+    if len(journaled) != len(markers):
+        failures.append(f"journal: {len(journaled)} message records, expected {len(markers)}")
+    for name in sorted(os.listdir(logs)):
+        if not name.endswith(".md"):
+            continue
+        ranges = sorted((r["start"], r["end"]) for r in records
+                        if r["kind"] == "log" and r["file"] == f"{AGENT}/logs/{name}")
+        covered = 0
+        for start, end in ranges:
+            if start != covered:
+                failures.append(f"journal: {name} range [{start}:{end}) after {covered}")
+                break
+            covered = end
+        if covered != os.path.getsize(os.path.join(logs, name)):
+            failures.append(f"journal: {name} journaled up to {covered} of {os.path.getsize(os.path.join(logs, name))}")
+
+    # Handover pointer names a readable handover
+    latest = handover_store.latest(AGENT)
+    try:
+        if not latest or "Handover" not in handover_store.read_file(latest[0]):
+            failures.append("handover: LATEST missing or unreadable")
+    except OSError as e:
+        failures.append(f"handover: {e}")
+
+    # Heartbeat: one state file per session, each readable
+    states = [n for n in os.listdir(root) if n.startswith("claude_heartbeat_") and n.endswith(".marshal")]
+    for name in states:
+        with open(os.path.join(root, name), "rb") as f:
+            if not isinstance(marshal.load(f), dict):
+                failures.append(f"heartbeat: {name} unreadable")
+    if len(states) != workers:
+        failures.append(f"heartbeat: {len(states)} state files, expected one per session ({workers})")
+
+    leftovers = [os.path.join(d, n) for d, _, names in os.walk(root) for n in names if n.endswith(".tmp")]
+    if leftovers:
+        failures.append(f"{len(leftovers)} temp files left behind (e.g. {leftovers[0]})")
+    return failures, len(entries), len(records), len(texts)
+
+
+def check_inbox_backlog(hooks_dir, env, count=25):
+    """Send more unread messages than SessionStart shows; none may be lost."""
+    sys.path.insert(0, hooks_dir)
+    import inbox
+
+    failures = []
+    sent = [f"backlog {i:03d}" for i in range(count)]
+    for text in sent:
+        inbox.send(AGENT, text, sender="Backlog")
+    subprocess.run([sys.executable, os.path.join(hooks_dir, "session_start.py")], input=b"{}",
+                   capture_output=True, env=env, check=True)
+    unread, _ = inbox.unread_summary(AGENT)
+    if unread != count:
+        failures.append(f"inbox backlog: {count - unread} of {count} unread marked read by SessionStart unseen")
+    seen, cursor = [], inbox.read_cursor(AGENT)
+    while True:  # small pages, as inbox.py read takes them
+        messages, remaining = inbox.oldest_unread(AGENT, limit=200)
+        if not messages or (messages[0]["shard"] == cursor[0] and messages[0]["start"] != cursor[1]):
+            break  # none left, or a gap after the cursor
+        seen += [m["text"].rsplit("\n", 1)[-1] for m in messages]
+        inbox.mark_read(AGENT, messages[-1])
+        cursor = inbox.read_cursor(AGENT)
+        if not remaining:
+            break
+    if seen != sent:
+        failures.append(f"inbox backlog: paged through {len(seen)} messages, expected {count} in order")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--workers", type=int, default=16, help="concurrent hook processes (default 16)")
+    ap.add_argument("--rounds", type=int, default=10, help="rounds per worker (default 10)")
+    ap.add_argument("--keep", action="store_true", help="keep the sandbox for inspection")
+    ap.add_argument("--worker", nargs=4, metavar=("HOOKS", "ROOT", "INDEX", "START"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        hooks_dir, root, index, start_at = args.worker
+        return worker(hooks_dir, root, int(index), args.rounds, float(start_at))
+
+    root, hooks_dir, shared = make_sandbox(AGENT, prefix="ccm-stress-")
+    try:
+        common = os.path.join(root, "common.jsonl")
+        write_transcript(common, 2_000_000, result_bytes=(200, 2_000))
+        with open(common, "rb") as f:
+            common_calls = sum(line.count(b'"type":"tool_use"') for line in f)  # parallel batches hold several
+
+        env = dict(os.environ, TEMP=root)  # per-session state files land in the sandbox
+        start_at = time.time() + 1.0 + 0.05 * args.workers
+        procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--rounds", str(args.rounds),
+                                   "--worker", hooks_dir, root, str(i), str(start_at)], env=env)
+                 for i in range(args.workers)]
+        codes = [p.wait() for p in procs]
+        elapsed = time.time() - start_at
+        if any(codes):
+            print(f"FAIL: {sum(1 for c in codes if c)} worker(s) exited non-zero", file=sys.stderr)
+            return 1
+
+        failures, entries, lines, messages = check(hooks_dir, shared, root, args.workers, args.rounds, common_calls)
+        failures += check_inbox_backlog(hooks_dir, env)
+        print(f"{args.workers} workers x {args.rounds} rounds in {elapsed:.1f}s: "
+              f"{entries} log entries, {lines} metrics lines, {messages} messages")
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        if not failures:
+            print("OK: no lost, torn or double-counted writes")
+        return 1 if failures else 0
+    finally:
+        if args.keep:
+            print(f"sandbox kept at {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+"""
+Archive — keeps the shared folder's loose files to a hot window and bundles the rest.
+
+    {agent}/logs/YYYY-MM-DD.md              ← the last archive_hot_days days, loose
+    {agent}/archive/YYYY-MM.zip             ← every older day of that month, one member each
+    {agent}/archive/YYYY-MM.idx.json        ← each archived day's sections and entries (byte ranges)
+    messages/{agent}/archive/YYYY.zip       ← read inbox shards of closed months
+    journal/archive/YYYY.zip                ← journal shards of closed months
+
+Daily logs are only appended to while they are current, so once a day is
+older than the hot window (archive_hot_days, default 14) and untouched
+for a day, `archive.py run` moves it into its month's bundle. Bundles
+are rebuilt whole and swapped in with an atomic replace, with fixed
+member timestamps, so an unchanged month gives byte-identical bundles
+and sync clients have nothing to re-upload. The loose log and its index
+sidecar are removed only once the bundle and its index are in place.
+
+The bundle index holds daily_log's index for each day, so a day or a
+single entry is found without listing or decompressing anything else:
+read_day() and read_entry() look for the loose log first, then the
+bundle. memory_search and log_rollup read archived days the same way, so
+archiving changes where history lives, not what the hooks can see.
+
+Inbox shards are archived only once the read cursor has moved past them.
+Handovers already have their own retention (handover_store.py prune).
+
+With "archive_git": true (or --git) a run ends with a git snapshot of
+the shared folder: `git add -A` and a commit when anything changed.
+
+    python3 archive.py                          # loose vs archived, per agent
+    python3 archive.py run [--all] [--dry-run] [--git]
+    python3 archive.py show 2026-08-03 [--agent X] [--entry N]
+    python3 archive.py restore 2026-08 [--agent X]
+    python3 archive.py snapshot [--init] [-m MESSAGE]
+
+Part of Claude Code Memory.
+"""
+import io
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from datetime import date, timedelta
+
+import daily_log
+import hook_config
+import shared_io
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+ALL_AGENTS = _cfg.get("all_agents", [AGENT])
+HOT_DAYS = int(_cfg.get("archive_hot_days", 14))
+GIT = bool(_cfg.get("archive_git", False))
+
+INDEX_VERSION = 1
+SETTLE_SECONDS = 86400  # a log modified this recently is never archived, whatever its date
+_DAY_LOG_RE = re.compile(r"^(\d{4}-\d{2})-\d{2}\.md$")
+_SHARD_RE = re.compile(r"^(\d{4})-\d{2}\.(?:md|tsv)$")
+_MEMBER_DATE_RE = re.compile(r"^(\d{4})-(\d{2})(?:-(\d{2}))?")
+
+
+def logs_dir(agent=None) -> str:
+    return os.path.join(SHARED, agent or AGENT, "logs")
+
+
+def archive_dir(agent=None) -> str:
+    return os.path.join(SHARED, agent or AGENT, "archive")
+
+
+def bundle_path(agent, month: str) -> str:
+    return os.path.join(archive_dir(agent), f"{month}.zip")
+
+
+def index_path(agent, month: str) -> str:
+    return os.path.join(archive_dir(agent), f"{month}.idx.json")
+
+
+def load_index(agent, month: str) -> dict:
+    """{"version", "days": {day: daily_log index}} of a month's bundle; empty if none."""
+    try:
+        with open(index_path(agent, month), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"version": INDEX_VERSION, "days": {}}
+
+
+def read_member(bundle, name: str):
+    """Bytes of one member of a bundle, or None."""
+    try:
+        with zipfile.ZipFile(bundle) as z:
+            return z.read(name)
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def _member_info(name: str) -> zipfile.ZipInfo:
+    """Member header dated by its name, so a rebuilt bundle with the same content is byte-identical."""
+    m = _MEMBER_DATE_RE.match(name)
+    when = (int(m.group(1)), int(m.group(2)), int(m.group(3) or 1), 0, 0, 0) if m else (1980, 1, 1, 0, 0, 0)
+    info = zipfile.ZipInfo(name, date_time=when)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def _write_bundle(bundle, members: dict):
+    """Replace bundle with exactly members ({name: bytes}), atomically."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        for name in sorted(members):
+            z.writestr(_member_info(name), members[name])
+    shared_io.atomic_write(bundle, buf.getvalue(), fsync=True)
+
+
+def _members(bundle) -> dict:
+    try:
+        with zipfile.ZipFile(bundle) as z:
+            return {name: z.read(name) for name in z.namelist()}
+    except FileNotFoundError:
+        return {}
+
+
+# === Reading (loose first, then the bundle) ===
+
+def archived_months(agent=None) -> list:
+    try:
+        names = os.listdir(archive_dir(agent))
+    except OSError:
+        return []
+    return sorted(n[:-len(".idx.json")] for n in names if n.endswith(".idx.json") and n[:4].isdigit())
+
+
+def archived_days(agent=None) -> list:
+    return sorted(day for month in archived_months(agent) for day in load_index(agent, month)["days"])
+
+
+def day_bytes(day: str, agent=None):
+    """Raw bytes of a day's log, loose or archived; None if there is none."""
+    try:
+        with open(os.path.join(logs_dir(agent), f"{day}.md"), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return read_member(bundle_path(agent or AGENT, day[:7]), f"{day}.md")
+
+
+def read_day(day: str, agent=None):
+    """Text of a day's log, loose or archived; None if there is none."""
+    data = day_bytes(day, agent)
+    return None if data is None else data.decode("utf-8", errors="replace")
+
+
+def day_index(day: str, agent=None):
+    """daily_log index of a day, loose or archived; None if there is none."""
+    path = os.path.join(logs_dir(agent), f"{day}.md")
+    if os.path.exists(path):
+        return daily_log.load_index(path, save=False)
+    return load_index(agent or AGENT, day[:7])["days"].get(day)
+
+
+def read_entry(day: str, n: int, agent=None):
+    """Text of a day's n-th work entry (negative counts from the end); None if out of range."""
+    index = day_index(day, agent)
+    data = day_bytes(day, agent) if index else None
+    try:
+        start, end, _ = index["entries"][n]
+    except (TypeError, IndexError):
+        return None
+    return data[start:end].decode("utf-8", errors="replace").strip() if data else None
+
+
+# === Archiving ===
+
+def closed_days(agent=None, hot_days=HOT_DAYS, now=None) -> list:
+    """[(day, path)] of loose logs older than the hot window and left alone for a day."""
+    now = time.time() if now is None else now
+    cutoff = (date.fromtimestamp(now) - timedelta(days=hot_days)).isoformat()
+    days = []
+    try:
+        names = sorted(os.listdir(logs_dir(agent)))
+    except OSError:
+        return days
+    for name in names:
+        path = os.path.join(logs_dir(agent), name)
+        if _DAY_LOG_RE.match(name) and name[:10] < cutoff:
+            try:
+                if os.path.getmtime(path) < now - SETTLE_SECONDS:
+                    days.append((name[:10], path))
+            except OSError:
+                pass
+    return days
+
+
+def archive_logs(agent=None, hot_days=HOT_DAYS, dry_run=False, now=None) -> list:
+    """Move closed days into their month's bundle; returns the days archived."""
+    agent = agent or AGENT
+    by_month = {}
+    for day, path in closed_days(agent, hot_days, now):
+        by_month.setdefault(day[:7], []).append((day, path))
+    done = []
+    for month, days in sorted(by_month.items()):
+        if dry_run:
+            done.extend(day for day, _ in days)
+            continue
+        os.makedirs(archive_dir(agent), exist_ok=True)
+        with shared_io.file_lock(bundle_path(agent, month)):
+            done.extend(_archive_month(agent, month, days))
+    return done
+
+
+def _archive_month(agent, month, days) -> list:
+    members = _members(bundle_path(agent, month))
+    index = load_index(agent, month)
+    stamps = {}
+    for day, path in days:
+        try:
+            _refresh_rollup(path, agent)
+            stamps[day] = os.stat(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        members[f"{day}.md"] = data
+        day_idx = daily_log.index_of(data)
+        day_idx["size"] = len(data)
+        index["days"][day] = day_idx
+    if not stamps:
+        return []
+    _write_bundle(bundle_path(agent, month), members)
+    shared_io.atomic_write(index_path(agent, month), json.dumps(index, separators=(",", ":")).encode("utf-8"))
+
+    # Only now drop the loose copies — and not one that changed since it was read
+    for day, st in stamps.items():
+        path = os.path.join(logs_dir(agent), f"{day}.md")
+        try:
+            now_st = os.stat(path)
+            if (now_st.st_mtime_ns, now_st.st_size) == (st.st_mtime_ns, st.st_size):
+                os.remove(path)
+                _remove(daily_log.sidecar_path(path))
+        except OSError:
+            pass
+    return sorted(stamps)
+
+
+def _refresh_rollup(path, agent):
+    """Bring the day's rollup up to date while the loose log still exists (derived data; errors ignored)."""
+    import log_rollup
+
+    try:
+        log_rollup.update_day(path, agent)
+    except (OSError, ValueError):
+        pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def archive_shards(directory, before: str, dry_run=False) -> list:
+    """Move monthly shards (YYYY-MM.md / .tsv) older than month `before` into directory/archive/YYYY.zip."""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    by_year = {}
+    for name in names:
+        if _SHARD_RE.match(name) and name[:7] < before:
+            by_year.setdefault(name[:4], []).append(name)
+    done = []
+    for year, shards in sorted(by_year.items()):
+        if dry_run:
+            done.extend(shards)
+            continue
+        bundle = os.path.join(directory, "archive", f"{year}.zip")
+        os.makedirs(os.path.dirname(bundle), exist_ok=True)
+        with shared_io.file_lock(bundle):
+            members = _members(bundle)
+            stamps = {}
+            for name in shards:
+                path = os.path.join(directory, name)
+                try:
+                    stamps[name] = os.stat(path)
+                    with open(path, "rb") as f:
+                        members[name] = f.read()
+                except OSError:
+                    stamps.pop(name, None)
+            _write_bundle(bundle, members)
+            for name, st in stamps.items():
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getsize(path) == st.st_size:
+                        os.remove(path)
+                        done.append(name)
+                except OSError:
+                    pass
+    return done
+
+
+def archive_inbox(agent=None, hot_days=HOT_DAYS, dry_run=False, now=None) -> list:
+    """Archive inbox shards of closed months that the read cursor is past."""
+    import inbox
+
+    now = time.time() if now is None else now
+    before = (date.fromtimestamp(now) - timedelta(days=hot_days)).isoformat()[:7]
+    cursor_shard, _ = inbox.read_cursor(agent)
+    before = min(before, cursor_shard[:7])  # never the cursor's shard or later; nothing if never read
+    return archive_shards(inbox.inbox_dir(agent), before, dry_run)
+
+
+def archive_journal(hot_days=HOT_DAYS, dry_run=False, now=None) -> list:
+    import journal
+
+    now = time.time() if now is None else now
+    before = (date.fromtimestamp(now) - timedelta(days=hot_days)).isoformat()[:7]
+    return archive_shards(journal.JOURNAL_DIR, before, dry_run)
+
+
+def restore(month: str, agent=None) -> list:
+    """Put an archived month back as loose logs (existing loose files win) and drop its bundle."""
+    agent = agent or AGENT
+    bundle = bundle_path(agent, month)
+    restored = []
+    with shared_io.file_lock(bundle):
+        for name, data in sorted(_members(bundle).items()):
+            path = os.path.join(logs_dir(agent), name)
+            if not os.path.exists(path):
+                shared_io.atomic_write(path, data, fsync=True)
+                restored.append(name[:10])
+        _remove(index_path(agent, month))
+        _remove(bundle)
+    return restored
+
+
+# === Git snapshot ===
+
+def _git(*args):
+    import subprocess
+
+    return subprocess.run(["git", "-C", SHARED] + list(args), capture_output=True, text=True)
+
+
+def snapshot(message=None, init=False) -> str:
+    """Commit the shared folder's current state to git; returns what happened."""
+    try:
+        inside = _git("rev-parse", "--is-inside-work-tree")
+    except OSError:
+        return "git not found"
+    if inside.returncode != 0:
+        if not init:
+            return f"{SHARED} is not a git repository (use snapshot --init)"
+        _git("init", "-q")
+        ignore = os.path.join(SHARED, ".gitignore")
+        if not os.path.exists(ignore):
+            with open(ignore, "w", encoding="utf-8") as f:
+                f.write("*.lock\n*.tmp\n")
+    _git("add", "-A")
+    if not _git("status", "--porcelain").stdout.strip():
+        return "nothing to snapshot"
+    identity = []
+    if not _git("config", "user.email").stdout.strip():
+        identity = ["-c", f"user.name={AGENT}", "-c", f"user.email={AGENT.lower()}@claude-memory.local"]
+    result = _git(*identity, "commit", "-q", "-m", message or f"Memory snapshot {date.today().isoformat()} ({AGENT})")
+    if result.returncode != 0:
+        return f"git commit failed: {(result.stderr or result.stdout).strip()}"
+    return "snapshot " + _git("rev-parse", "--short", "HEAD").stdout.strip()
+
+
+# === CLI ===
+
+def _agents(args) -> list:
+    if args.all:
+        return [a for a in ALL_AGENTS if os.path.isdir(logs_dir(a))]
+    return [args.agent]
+
+
+def main(argv):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Archive closed days and shards of the shared folder.")
+    ap.add_argument("cmd", nargs="?", default="status", choices=("status", "run", "show", "restore", "snapshot"))
+    ap.add_argument("target", nargs="?", help="day (show) or month (restore)")
+    ap.add_argument("--agent", default=AGENT)
+    ap.add_argument("--all", action="store_true", help="every agent in all_agents")
+    ap.add_argument("--hot-days", type=int, default=HOT_DAYS, help=f"days kept loose (default {HOT_DAYS})")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--git", action="store_true", default=GIT, help="git snapshot after the run")
+    ap.add_argument("--entry", type=int, help="show only this work entry (0-based; -1 = last)")
+    ap.add_argument("--init", action="store_true", help="snapshot: git init the shared folder if needed")
+    ap.add_argument("-m", dest="message", help="snapshot commit message")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "status":
+        for agent in _agents(args):
+            try:
+                loose = [n for n in os.listdir(logs_dir(agent)) if _DAY_LOG_RE.match(n)]
+            except OSError:
+                loose = []
+            months = archived_months(agent)
+            print(f"{agent}: {len(loose)} loose day(s), {len(archived_days(agent))} archived in {len(months)} bundle(s)"
+                  + (f" ({months[0]} … {months[-1]})" if months else ""))
+    elif args.cmd == "run":
+        prefix = "would archive" if args.dry_run else "archived"
+        for agent in _agents(args):
+            days = archive_logs(agent, args.hot_days, args.dry_run)
+            shards = archive_inbox(agent, args.hot_days, args.dry_run)
+            print(f"{agent}: {prefix} {len(days)} day(s), {len(shards)} inbox shard(s)")
+        print(f"journal: {prefix} {len(archive_journal(args.hot_days, args.dry_run))} shard(s)")
+        if args.git and not args.dry_run:
+            print(snapshot())
+    elif args.cmd == "show":
+        if not args.target:
+            ap.error("show needs a day (YYYY-MM-DD)")
+        text = read_day(args.target, args.agent) if args.entry is None else read_entry(args.target, args.entry, args.agent)
+        if text is None:
+            print(f"no log for {args.agent} on {args.target}" + (f" entry {args.entry}" if args.entry is not None else ""))
+            return 1
+        print(text)
+    elif args.cmd == "restore":
+        if not args.target:
+            ap.error("restore needs a month (YYYY-MM)")
+        print(f"restored {len(restore(args.target, args.agent))} day(s)")
+    else:
+        print(snapshot(args.message, args.init))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,297 @@
+"""
+Daily log index — one parser for {AGENT}/logs/YYYY-MM-DD.md, shared by all hooks.
+
+Scans a log once and records byte ranges:
+- sections: every `## Heading` with the offsets of its heading line and body
+- entries:  every `### ` work entry inside a `## Work Log` section
+
+The index is saved next to the log as a hidden sidecar
+(`.YYYY-MM-DD.md.idx.json`) and reused while the log's mtime and size are
+unchanged. Logs are append-only, so when a log has only grown the scan
+resumes from its last work entry (or last section heading) instead of byte 0,
+provided a checksum of the bytes just before that point still matches (a
+log rewritten to a larger size is rescanned whole).
+
+New entries are appended in place (append_entry): `## Work Log` is the last
+section of a daily log, so an entry goes at the end of the file with one
+locked O_APPEND write. Logs whose last section is something else get a
+`## Work Log (continued)` heading once, and are append-only from then on.
+
+Readers then seek straight to the bytes they need — the last two entries,
+the Summary body — instead of re-reading and re-splitting the whole file.
+
+Part of Claude Code Memory.
+
+CLI (used by the weekly-consolidate skill):
+    python3 daily_log.py <log.md>                 # index summary
+    python3 daily_log.py <log.md> --entries 5     # last 5 work entries
+    python3 daily_log.py <log.md> --json          # raw index
+"""
+import json
+import os
+import sys
+import zlib
+
+import shared_io
+
+INDEX_VERSION = 3
+ANCHOR_BYTES = 4096  # bytes before the resume point that must be unchanged to resume
+CONTINUED_HEADING = "## Work Log (continued)"
+
+
+def sidecar_path(log_path) -> str:
+    log_path = str(log_path)
+    head, name = os.path.split(log_path)
+    return os.path.join(head, f".{name}.idx.json")
+
+
+def _section_kind(name: str) -> str:
+    """Map a heading to the role the hooks care about (same prefixes the hooks always used)."""
+    if name.startswith("Summary"):
+        return "summary"
+    if name.startswith("Work Log"):
+        return "work"
+    if name.startswith("Handoff"):
+        return "handoff"
+    if name.startswith("Blockers"):
+        return "blockers"
+    if name.startswith("Metrics"):
+        return "metrics"
+    return ""
+
+
+def _scan(f, index: dict, pos: int, line_no: int):
+    """Parse lines from byte pos (a line start) to EOF, appending to index.
+
+    pos must be the start of a section heading or, inside the last Work Log
+    section, the start of a work entry.
+    """
+    sections = index["sections"]
+    entries = index["entries"]
+    in_work = bool(sections) and sections[-1]["kind"] == "work"
+    entry = None
+    ends_with_newline = True
+
+    f.seek(pos)
+    for raw in f:
+        if raw.startswith(b"## "):
+            if sections:
+                sections[-1]["end"] = pos
+            if entry is not None:
+                entry[1] = pos
+                entry = None
+            name = raw[3:].decode("utf-8", errors="replace").strip()
+            kind = _section_kind(name)
+            sections.append({
+                "name": name, "kind": kind,
+                "head": pos, "body": pos + len(raw), "end": None, "line": line_no,
+            })
+            in_work = kind == "work"
+        elif in_work and raw.startswith(b"### "):
+            if entry is not None:
+                entry[1] = pos
+            entry = [pos, None, line_no]
+            entries.append(entry)
+        pos += len(raw)
+        line_no += 1
+        ends_with_newline = raw.endswith(b"\n")
+
+    if sections:
+        sections[-1]["end"] = pos
+    if entry is not None:
+        entry[1] = pos
+    # Same count as len(content.split("\n")) on the decoded text
+    index["lines"] = line_no + 1 if ends_with_newline else line_no
+    index["size"] = pos
+
+
+def build_index(log_path, previous=None) -> dict:
+    """Index a log, resuming from where previous left off when the log only grew."""
+    log_path = str(log_path)
+    with open(log_path, "rb") as f:
+        st = os.fstat(f.fileno())
+        index = None
+
+        if previous and previous.get("version") == INDEX_VERSION and previous.get("sections") \
+                and st.st_size >= previous.get("size", 0):
+            index = _resume(f, previous)
+
+        if index is None:
+            index = {"version": INDEX_VERSION, "sections": [], "entries": []}
+            _scan(f, index, 0, 0)
+
+        index["anchor"] = _anchor(f, _resume_point(index)[0])
+    index["mtime_ns"] = st.st_mtime_ns
+    index["size"] = st.st_size
+    return index
+
+
+def index_of(data: bytes) -> dict:
+    """Index of a log held in memory, e.g. a day read back from an archive bundle."""
+    import io
+
+    index = {"version": INDEX_VERSION, "sections": [], "entries": []}
+    _scan(io.BytesIO(data), index, 0, 0)
+    return index
+
+
+def _resume_point(index: dict):
+    """(offset, line number, expected line prefix) a later scan of this log resumes from.
+
+    The last work entry when the log ends in Work Log (the usual case — only
+    that entry can have grown), else the last heading.
+    """
+    if not index["sections"]:
+        return 0, 0, b""
+    last = index["sections"][-1]
+    entries = index["entries"]
+    if last["kind"] == "work" and entries and entries[-1][0] >= last["head"]:
+        start, _, line_no = entries[-1]
+        return start, line_no, b"### "
+    return last["head"], last["line"], b"## " + last["name"].encode("utf-8")
+
+
+def _anchor(f, start: int) -> list:
+    """[start, crc32 of the ANCHOR_BYTES before start]."""
+    begin = max(0, start - ANCHOR_BYTES)
+    f.seek(begin)
+    return [start, zlib.crc32(f.read(start - begin))]
+
+
+def _resume(f, previous: dict):
+    """Continue a previous index over an appended-to log, or None if the prefix moved.
+
+    Trusted only when the bytes before the resume point still checksum the
+    same and the line there is the entry or heading the index expects.
+    """
+    last = previous["sections"][-1]
+    entries = previous["entries"]
+    start, line_no, expect = _resume_point(previous)
+    if previous.get("anchor") != _anchor(f, start):
+        return None
+    if not f.readline().rstrip().startswith(expect):
+        return None
+
+    if start == last["head"]:
+        previous["sections"] = previous["sections"][:-1]
+    else:
+        last["end"] = None
+    previous["entries"] = [e for e in entries if e[0] < start]
+    _scan(f, previous, start, line_no)
+    return previous
+
+
+def load_index(log_path, save=True) -> dict:
+    """Index for log_path, from the sidecar when it is current, rebuilt (and saved) when not."""
+    log_path = str(log_path)
+    st = os.stat(log_path)
+    side = sidecar_path(log_path)
+    try:
+        with open(side, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        previous = None
+
+    if previous and previous.get("version") == INDEX_VERSION \
+            and previous.get("mtime_ns") == st.st_mtime_ns and previous.get("size") == st.st_size:
+        return previous
+
+    index = build_index(log_path, previous)
+    if save:
+        save_index(log_path, index)
+    return index
+
+
+def save_index(log_path, index: dict):
+    try:
+        shared_io.atomic_write(sidecar_path(log_path), json.dumps(index, separators=(",", ":")).encode("utf-8"))
+    except OSError:
+        pass  # index is an optimisation — a read-only or full share must not break the hook
+
+
+def read_range(log_path, start: int, end: int, limit=None) -> str:
+    """Decoded bytes [start, end) of the log, reading at most limit bytes."""
+    length = end - start
+    if limit is not None:
+        length = min(length, limit)
+    if length <= 0:
+        return ""
+    with open(str(log_path), "rb") as f:
+        f.seek(start)
+        return f.read(length).decode("utf-8", errors="ignore")
+
+
+def sections_of(index: dict, kind: str):
+    return [s for s in index["sections"] if s["kind"] == kind]
+
+
+def section_text(log_path, index: dict, kind: str, limit=None) -> str:
+    """Body text of every section of this kind, joined, stripped."""
+    parts = []
+    budget = limit
+    for s in sections_of(index, kind):
+        text = read_range(log_path, s["body"], s["end"], budget)
+        parts.append(text)
+        if budget is not None:
+            budget -= len(text.encode("utf-8"))
+            if budget <= 0:
+                break
+    return "".join(parts).strip()
+
+
+def last_entries(log_path, index: dict, n: int, limit=None):
+    """Text of the last n work entries (each read up to limit bytes)."""
+    return [read_range(log_path, start, end, limit).rstrip() for start, end, _ in index["entries"][-n:]]
+
+
+def ends_in_work_log(index: dict) -> bool:
+    """True if an entry appended at EOF lands inside a Work Log section."""
+    return bool(index["sections"]) and index["sections"][-1]["kind"] == "work"
+
+
+def append_entry(log_path, entry: str, header: str = "", fsync=True) -> tuple:
+    """Append a work entry to a daily log in place; returns the (start, end) bytes written.
+
+    header is written first when the log does not exist yet. Cost is one
+    locked O_APPEND write of the entry, whatever the size of the log.
+    """
+    log_path = str(log_path)
+    data = entry.encode("utf-8")
+    with shared_io.open_append(log_path) as fd:
+        size = os.fstat(fd).st_size
+        if size == 0:
+            data = header.encode("utf-8") + data
+        else:
+            # Saved when rebuilt, so the next append resumes from about here, not further back
+            index = load_index(log_path)
+            if not ends_in_work_log(index):
+                data = f"\n{CONTINUED_HEADING}\n".encode("utf-8") + data
+        shared_io.write_all(fd, data, fsync)
+        return size, size + len(data)
+
+
+def main(argv):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Index a daily log and print sections/entries.")
+    ap.add_argument("log", help="path to a YYYY-MM-DD.md daily log")
+    ap.add_argument("--entries", type=int, default=0, help="print the last N work entries")
+    ap.add_argument("--json", action="store_true", help="print the raw index")
+    args = ap.parse_args(argv)
+
+    index = load_index(args.log)
+    if args.json:
+        print(json.dumps(index, indent=2))
+        return 0
+    if args.entries:
+        print("\n\n".join(last_entries(args.log, index, args.entries)))
+        return 0
+
+    print(f"{args.log}: {index['size']} bytes, {index['lines']} lines, {len(index['entries'])} work entries")
+    for s in index["sections"]:
+        print(f"  ## {s['name']:<30} bytes {s['body']}-{s['end']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,241 @@
+"""
+Handover store — per-agent, compressed, deduplicated PreCompact handovers.
+
+    handovers/{agent}/20261018_141502_1a2b3c4d_9f86d081884c.md.gz
+    handovers/{agent}/LATEST      ← "name epoch": the newest handover
+
+Each agent keeps its own directory, named in lower case like its inbox
+and journal mark, so retention and the "latest" pointer never touch
+another agent's handovers. A directory saved under the name as configured
+is renamed on that agent's next save and read until then. A handover is written once,
+compressed with a standard-library codec (gzip by default; "lzma" or
+"none" via handover_codec). The name ends in a hash of the content with
+timestamps masked out. When a compaction produces the same handover as
+one already kept, no new file is written and only the pointer moves.
+New handovers are recorded in the change journal (journal.py).
+
+LATEST is a one-line pointer, so the newest handover is found in O(1)
+without listing or sorting the directory. Retention is per agent: the
+newest handover_keep files (default 10), and none older than
+handover_max_age_days (default 30).
+
+    python3 handover_store.py                 # print this agent's latest handover
+    python3 handover_store.py list [--agent X]
+    python3 handover_store.py prune
+
+Part of Claude Code Memory.
+"""
+import hashlib
+import os
+import re
+import sys
+import time
+
+import hook_config
+import journal
+import shared_io
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+HANDOVER_DIR = os.path.join(SHARED, "handovers")
+CODEC = _cfg.get("handover_codec", "gzip")
+KEEP = int(_cfg.get("handover_keep", 10))
+MAX_AGE_DAYS = float(_cfg.get("handover_max_age_days", 30))
+
+POINTER_NAME = "LATEST"
+EXTENSIONS = {"gzip": ".md.gz", "lzma": ".md.xz", "none": ".md"}
+# Masked before hashing: the generation time in the title and footer would
+# otherwise make every handover unique
+_TIMESTAMP_RE = re.compile(rb"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(?::\d{2})?")
+
+
+def agent_dir(agent=None) -> str:
+    return os.path.join(HANDOVER_DIR, (agent or AGENT).lower())
+
+
+def _legacy_dir(agent=None):
+    """The directory as first named, with the agent's own case; None if that is agent_dir."""
+    legacy = os.path.join(HANDOVER_DIR, agent or AGENT)
+    return legacy if legacy != agent_dir(agent) else None
+
+
+def _migrate(agent):
+    """Rename an agent's store from its original-case name to agent_dir."""
+    legacy = _legacy_dir(agent)
+    if legacy and os.path.isdir(legacy) and not os.path.exists(agent_dir(agent)):
+        try:
+            os.rename(legacy, agent_dir(agent))
+        except OSError:
+            pass  # another session got there first
+
+
+def pointer_path(agent=None) -> str:
+    return os.path.join(agent_dir(agent), POINTER_NAME)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(_TIMESTAMP_RE.sub(b"", data)).hexdigest()[:12]
+
+
+def _hash_of(name: str) -> str:
+    """The content hash in a stored handover's file name."""
+    return name.split(".", 1)[0].rsplit("_", 1)[-1]
+
+
+def encode(data: bytes, codec=CODEC) -> bytes:
+    if codec == "gzip":
+        import gzip
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if codec == "lzma":
+        import lzma
+        return lzma.compress(data)
+    return data
+
+
+def read_file(path) -> str:
+    """Text of a stored handover, decompressed according to its extension."""
+    path = str(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        import gzip
+        data = gzip.decompress(data)
+    elif path.endswith(".xz"):
+        import lzma
+        data = lzma.decompress(data)
+    return data.decode("utf-8", errors="replace")
+
+
+def stored(agent=None) -> list:
+    """Handover file names in an agent's directory, oldest first."""
+    try:
+        names = os.listdir(agent_dir(agent))
+    except OSError:
+        return []
+    return sorted(n for n in names if n[:8].isdigit() and n.endswith(tuple(EXTENSIONS.values())))
+
+
+# === Latest pointer ===
+
+def latest(agent=None):
+    """(path, saved_at epoch) of an agent's newest handover, or None. One small read."""
+    for directory in filter(None, (agent_dir(agent), _legacy_dir(agent))):
+        try:
+            with open(os.path.join(directory, POINTER_NAME), "r", encoding="utf-8") as f:
+                name, _, saved_at = f.read(512).strip().partition(" ")
+            return os.path.join(directory, name), float(saved_at)
+        except FileNotFoundError:
+            continue  # not saved yet, or still under its original-case name
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+def _point_to(agent, name: str, saved_at: float):
+    shared_io.atomic_write(pointer_path(agent), f"{name} {saved_at:.3f}\n".encode("utf-8"))
+
+
+# === Saving ===
+
+def save(content: str, session_id="", agent=None, now=None) -> tuple:
+    """Store a handover; returns (path, deduplicated).
+
+    If a kept handover has the same content (timestamps aside) the pointer
+    moves to it and nothing else is written. Saves of one agent's handovers
+    run one at a time, so the pointer always names the last one saved and
+    retention never removes a file another session is pointing at.
+    """
+    agent = agent or AGENT
+    now = time.time() if now is None else now
+    _migrate(agent)
+    os.makedirs(agent_dir(agent), exist_ok=True)
+    with shared_io.file_lock(pointer_path(agent)):
+        return _save(content, session_id, agent, now)
+
+
+def _save(content, session_id, agent, now) -> tuple:
+    data = content.encode("utf-8")
+    digest = content_hash(data)
+    directory = agent_dir(agent)
+    names = stored(agent)
+    same = [n for n in names if _hash_of(n) == digest]
+    if same:
+        _point_to(agent, same[-1], now)
+        return os.path.join(directory, same[-1]), True
+
+    stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now))
+    sid = "".join(c for c in session_id[:8] if c.isalnum()) or "unknown"
+    name = f"{stamp}_{sid}_{digest}{EXTENSIONS.get(CODEC, '.md')}"
+    path = os.path.join(directory, name)
+    encoded = encode(data, CODEC if CODEC in EXTENSIONS else "none")
+    shared_io.atomic_write(path, encoded)
+    _point_to(agent, name, now)
+    prune(agent, now, names + [name])
+    try:
+        journal.record("handover", path, 0, len(encoded), content.split("\n", 1)[0].lstrip("# "), agent, now)
+    except OSError:
+        pass
+    return path, False
+
+
+def _mtime_ns(agent, name) -> int:
+    """Orders handovers saved within the same second."""
+    try:
+        return os.stat(os.path.join(agent_dir(agent), name)).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def prune(agent=None, now=None, names=None) -> int:
+    """Apply retention to one agent's handovers; the latest is always kept. Returns files removed."""
+    agent = agent or AGENT
+    now = time.time() if now is None else now
+    names = names if names is not None else stored(agent)
+    names = sorted(names, key=lambda n: (n[:15], _mtime_ns(agent, n)))
+    current = latest(agent)
+    keep_name = os.path.basename(current[0]) if current else None
+    cutoff = time.strftime("%Y%m%d_%H%M%S", time.localtime(now - MAX_AGE_DAYS * 86400))
+
+    removed = 0
+    for i, name in enumerate(names):
+        too_many = i < len(names) - max(KEEP, 1)
+        too_old = MAX_AGE_DAYS > 0 and name[:15] < cutoff
+        if (too_many or too_old) and name != keep_name:
+            try:
+                os.remove(os.path.join(agent_dir(agent), name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+# === CLI ===
+
+def main(argv):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Read and maintain per-agent handovers.")
+    ap.add_argument("cmd", nargs="?", default="show", choices=("show", "list", "prune"))
+    ap.add_argument("--agent", default=AGENT)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "show":
+        current = latest(args.agent)
+        if not current:
+            print(f"no handover for {args.agent}")
+            return 1
+        print(read_file(current[0]))
+    elif args.cmd == "list":
+        current = latest(args.agent)
+        for name in stored(args.agent):
+            size = os.path.getsize(os.path.join(agent_dir(args.agent), name))
+            mark = "  <- latest" if current and os.path.basename(current[0]) == name else ""
+            print(f"{name}  {size:>7} bytes{mark}")
+    else:
+        print(f"removed {prune(args.agent)} handover(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
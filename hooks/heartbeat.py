@@ -1,30 +1,57 @@
 """
-Heartbeat hook — checks shared docs and inbox for changes.
+Heartbeat hook — checks shared docs, inbox and team activity for changes.
 Runs on every UserPromptSubmit. Outputs nothing if no changes (0 tokens).
 Outputs JSON additionalContext if changes detected.
 
+Team activity comes from the change journal (journal.py): each session
+keeps a cursor into it and is told about the records other agents added
+since its last prompt. The hook also journals entries this agent wrote
+to its own daily log by hand since the last sync.
+
+If heartbeat_watcher.py is running, the hook just asks it over a local
+socket; otherwise it stats the watched files itself.
+
 Part of Claude Code Memory.
 
 Config: reads agent name + shared path from agent_config.json
 in the same directory as this script.
 """
-import os, sys, json, time
-from pathlib import Path
+# Runs on every prompt, so startup is the cost that matters: only built-in
+# modules at import time (no pathlib), json/socket imported when needed, state
+# kept as marshal. Safe to run as `python3 -S -E heartbeat.py`.
+import marshal
+import os
+import sys
+import time
 
-# === CONFIG (from agent_config.json) ===
-SCRIPT_DIR = Path(__file__).parent
-CONFIG_PATH = SCRIPT_DIR / "agent_config.json"
+import hook_config
+import inbox
+import journal
+import shared_io
+import telemetry
 
-try:
-    with open(CONFIG_PATH) as f:
-        _cfg = json.load(f)
-except (FileNotFoundError, json.JSONDecodeError):
-    _cfg = {}
+# === CONFIG (from agent_config.json) ===
+SCRIPT_DIR = hook_config.SCRIPT_DIR
+_cfg = hook_config.load()
 
 AGENT = _cfg.get("agent", "Agent")
-SHARED = Path(_cfg.get("shared_path", str(SCRIPT_DIR)))
+SHARED = _cfg.get("shared_path", SCRIPT_DIR)
 
-STATE_FILE = os.path.join(os.environ.get("TEMP", "/tmp"), "claude_heartbeat_last.json")
+# Last-seen mtimes, one file per agent and session: parallel sessions each
+# get their own "since your last prompt"
+STATE_KIND = "heartbeat"
+
+# Optional long-lived watcher (heartbeat_watcher.py) that serves changes over
+# a local socket. With "heartbeat_watcher": true the hook starts it on demand.
+USE_WATCHER = bool(_cfg.get("heartbeat_watcher", False))
+WATCHER_SOCKET = hook_config.state_path("heartbeat", AGENT, ext=".sock")
+WATCHER_TIMEOUT = 0.2  # seconds — fall back to scanning rather than stall the prompt
+
+# One {"ts", "ev": "prompt", "project"} line per prompt in the agent's
+# metrics file (same format as metrics.py, written here without importing json)
+METRICS = bool(_cfg.get("metrics", True))
+
+TEAM_ALERTS = 5  # newest journal records named per prompt; the rest are counted
 
 # Files to watch (high-signal, low-noise)
 WATCH = {
@@ -35,72 +62,279 @@ WATCH = {
 }
 
 
-def load_state():
+def state_file(session=""):
+    return hook_config.state_path(STATE_KIND, AGENT, session)
+
+
+def load_state(session=""):
+    data = hook_config.read_owned(state_file(session))
     try:
-        with open(STATE_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        state = marshal.loads(data) if data else {}
+        return state if isinstance(state, dict) else {}
+    except (EOFError, ValueError, TypeError):
         return {}
 
 
-def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f)
+def save_state(state, session=""):
+    try:
+        shared_io.atomic_write(state_file(session), marshal.dumps(state), private=True)
+    except (OSError, ValueError):
+        pass
 
 
-def check_messages_inbox():
-    """Check messages/ folder for direct agent messages."""
-    alerts = []
-    msg_dir = SHARED / "messages"
+def scan_watched():
+    """Stat the WATCH files; {filename: mtime} for those that exist."""
+    mtimes = {}
+    for filename in WATCH:
+        try:
+            mtimes[filename] = os.path.getmtime(os.path.join(SHARED, filename))
+        except FileNotFoundError:
+            pass
+    return mtimes
+
+
+def scan_inbox():
+    """This agent's inbox state: {"unread", "newest", "legacy"}.
+
+    unread counts messages past the read cursor and newest is when the last
+    of them arrived; legacy is the mtime of a non-empty old-style
+    messages/{agent}.md (0 if none). Other agents' inboxes are not looked at.
+    """
+    count, newest = inbox.unread_summary(AGENT)
+    legacy = 0
     try:
-        for f in os.listdir(msg_dir):
-            if f.endswith(".md"):
-                filepath = msg_dir / f
-                mtime = os.path.getmtime(filepath)
-                ago = int(time.time() - mtime)
-                if ago < 3600:
-                    agent_name = f.replace(".md", "")
-                    alerts.append(f"Message in messages/{f} ({ago//60}m ago)")
-    except FileNotFoundError:
+        st = os.stat(inbox.legacy_path(AGENT))
+        if st.st_size:
+            legacy = st.st_mtime
+    except OSError:
         pass
+    return {"unread": count, "newest": newest, "legacy": legacy}
+
+
+def check_messages_inbox(inbox_state=None, now=None):
+    """Alert on unread messages in this agent's inbox."""
+    alerts = []
+    now = now or time.time()
+    if inbox_state is None:
+        inbox_state = scan_inbox()
+    count = inbox_state.get("unread", 0)
+    ago = int(now - inbox_state.get("newest", 0))
+    if count and ago < 3600:
+        alerts.append(f"{count} unread message{'s' if count > 1 else ''} in messages/{AGENT.lower()}/ "
+                      f"({ago//60}m ago) — python3 hooks/inbox.py read")
+    ago = int(now - inbox_state.get("legacy", 0))
+    if inbox_state.get("legacy") and ago < 3600:
+        alerts.append(f"Message in messages/{AGENT.lower()}.md ({ago//60}m ago)")
     return alerts
 
 
-def main():
-    # Read stdin (hook event data) — required but we don't need it
+def own_log_path(now=None):
+    return os.path.join(SHARED, AGENT, "logs", time.strftime("%Y-%m-%d", time.localtime(now)) + ".md")
+
+
+def scan_team(state):
+    """Other agents' journal records since this session's cursor: (records, new cursor).
+
+    Journals this agent's own new log entries first. On a session's first
+    prompt the cursor starts at the end of the journal, so nothing old is
+    reported.
+    """
     try:
-        sys.stdin.read()
-    except:
+        journal.sync_log(own_log_path())
+    except OSError:
         pass
+    cursor = state.get("journal")
+    if not cursor:
+        return [], journal.end_cursor()
+    records, cursor = journal.read_since(tuple(cursor))
+    own_inbox = f"messages/{AGENT.lower()}/"
+    return [r for r in records
+            if r["agent"] != AGENT and not (r["kind"] == "message" and r["file"].startswith(own_inbox))], cursor
+
+
+def check_team(records):
+    """One alert naming the newest of other agents' journal records."""
+    if not records:
+        return []
+    items = []
+    for r in records[-TEAM_ALERTS:]:
+        digest = r["digest"][:80]
+        if r["kind"] == "log":
+            items.append(f"{r['agent']} logged: {digest}" if digest else f"{r['agent']} updated their log")
+        elif r["kind"] == "message":
+            items.append(f"{r['agent']} → {digest}")
+        else:
+            items.append(f"{r['agent']} saved a {r['kind']}")
+    more = len(records) - len(items)
+    return ["Team: " + "; ".join(items) + (f" (+{more} more — python3 hooks/journal.py)" if more > 0 else "")]
+
 
-    state = load_state()
+def collect_changes(state, watched, inbox_state, now=None, team=None):
+    """Changes worth reporting given last-seen state and current mtimes.
+
+    team is scan_team()'s (records, cursor), if it was read. Returns
+    (changed, new_state). Pure — used both by the hook's own scan and by
+    heartbeat_watcher, which keeps the mtimes and state in memory.
+    """
+    now = now or time.time()
     changed = []
     new_state = dict(state)
 
     # Check shared docs
     for filename, label in WATCH.items():
-        path = SHARED / filename
-        try:
-            mtime = os.path.getmtime(path)
-            new_state[filename] = mtime
-            last_seen = state.get(filename, 0)
-            if mtime > last_seen and last_seen > 0:
-                ago = int(time.time() - mtime)
-                if ago < 3600:
-                    mins = ago // 60
-                    changed.append(f"{label} ({mins}m ago)" if mins > 0 else f"{label} (just now)")
-        except FileNotFoundError:
-            pass
+        if filename not in watched:
+            continue
+        mtime = watched[filename]
+        new_state[filename] = mtime
+        last_seen = state.get(filename, 0)
+        if mtime > last_seen and last_seen > 0:
+            ago = int(now - mtime)
+            if ago < 3600:
+                mins = ago // 60
+                changed.append(f"{label} ({mins}m ago)" if mins > 0 else f"{label} (just now)")
 
     # Check messages/ inbox
-    inbox_alerts = check_messages_inbox()
-    changed.extend(inbox_alerts)
+    changed.extend(check_messages_inbox(inbox_state, now))
 
-    save_state(new_state)
+    # Other agents' new journal records
+    if team is not None:
+        records, cursor = team
+        new_state["journal"] = list(cursor)
+        changed.extend(check_team(records))
+    return changed, new_state
+
+
+def ask_watcher(session=""):
+    """Changes for one session from a running heartbeat_watcher, or None if there isn't one.
+
+    One connect + one short read on a local socket; the watcher holds the
+    mtimes and last-seen state in memory, so no files are touched here. The
+    socket is only trusted if this user owns it; the reply is plain text,
+    "ok" and then one change per line.
+    """
+    if not hook_config.owned(WATCHER_SOCKET):
+        return None
+    import socket
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(WATCHER_TIMEOUT)
+            sock.connect(WATCHER_SOCKET)
+            sock.sendall(f"poll {session}\n".encode("utf-8"))
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        status, *changed = b"".join(chunks).decode("utf-8").split("\n")
+        return [line for line in changed if line] if status == "ok" else None
+    except (OSError, ValueError):
+        return None
 
+
+def start_watcher():
+    """Launch heartbeat_watcher in the background (it detaches itself)."""
+    import subprocess
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPT_DIR, "heartbeat_watcher.py"), "start"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            close_fds=True,
+        )
+    except OSError:
+        pass
+
+
+def record_prompt(cwd=None):
+    """Append a prompt event to {AGENT}/metrics/YYYY-MM.jsonl (one locked O_APPEND write)."""
+    if not METRICS:
+        return
+    now = time.time()
+    project = os.path.basename(cwd or os.getcwd())
+    if '"' in project or "\\" in project or min(project or " ") < " ":
+        import json
+        project = json.dumps(project)[1:-1]
+    line = f'{{"ts":{now:.3f},"ev":"prompt","project":"{project}"}}\n'
+    path = os.path.join(SHARED, AGENT, "metrics", time.strftime("%Y-%m", time.localtime(now)) + ".jsonl")
+    try:
+        shared_io.append_bytes(path, line.encode("utf-8"), fsync=False)
+    except OSError:
+        pass
+
+
+def run(event=None):
+    """Heartbeat output for one prompt ("" when nothing changed)."""
+    probe = telemetry.start("heartbeat")
+    event = event or {}
+    session = str(event.get("session_id") or "")
+    with probe.phase("record_prompt"):
+        record_prompt(event.get("cwd"))
+    with probe.phase("watcher"):
+        changed = ask_watcher(session)
+    if changed is None:
+        if USE_WATCHER:
+            probe.count("watcher_miss")
+            start_watcher()  # ready from the next prompt; scan this time
+        with probe.phase("scan"):
+            state = load_state(session)
+            team = scan_team(state)
+            changed, new_state = collect_changes(state, scan_watched(), scan_inbox(), team=team)
+            save_state(new_state, session)
+        probe.count("team_records", len(team[0]))
+
+    output = ""
     if changed:
+        import json
         msg = f"[HEARTBEAT] Updates: {'; '.join(changed)}"
-        print(json.dumps({"additionalContext": msg}))
+        output = json.dumps({"additionalContext": msg})
+        probe.count("alerts", len(changed))
+    probe.finish()
+    return output
+
+
+def field_of(raw: str, key: str) -> str:
+    """A string field of the hook's event JSON; json is imported only for a value with escapes."""
+    at = raw.find(f'"{key}"')
+    if at == -1:
+        return ""
+    start = raw.find('"', raw.find(":", at) + 1) + 1
+    if start == 0:
+        return ""
+    end = start
+    while True:
+        end = raw.find('"', end)
+        if end == -1:
+            return ""
+        value = raw[start:end]
+        if (len(value) - len(value.rstrip("\\"))) % 2 == 0:
+            break
+        end += 1  # an escaped quote, not the closing one
+    if "\\" in value:
+        import json
+        try:
+            value = json.loads(f'"{value}"')
+        except ValueError:
+            return ""
+    return value
+
+
+def session_of(raw: str) -> str:
+    """session_id from the hook's event JSON, found without importing json."""
+    return field_of(raw, "session_id")
+
+
+def main():
+    # Read stdin (hook event data) — only the session id and cwd are used
+    try:
+        raw = sys.stdin.read()
+    except:
+        raw = ""
+
+    output = run({"session_id": session_of(raw), "cwd": field_of(raw, "cwd")})
+    if output:
+        print(output)
 
 
 if __name__ == "__main__":
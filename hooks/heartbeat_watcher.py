@@ -0,0 +1,263 @@
+"""
+Heartbeat watcher — long-lived companion to heartbeat.py.
+
+Keeps the mtimes of the watched shared docs and the agent's inbox state in memory,
+updated from inotify events (Linux) or by polling every few seconds
+elsewhere, and holds the heartbeat's last-seen state for each session.
+heartbeat.py asks it for changes over a local Unix socket ("poll
+{session_id}"; the reply is "ok" and one change per line) instead of
+stat'ing files itself, so each prompt costs one connect + read instead of
+a filesystem scan. Team activity is still read from the change journal on
+each poll: a stat of its current shard, plus the new records if any.
+
+Optional: without a running watcher heartbeat.py scans as before. Set
+"heartbeat_watcher": true in agent_config.json to have the hook start it
+on demand, or manage it yourself:
+
+    python3 heartbeat_watcher.py start    # detach into the background
+    python3 heartbeat_watcher.py run      # stay in the foreground
+    python3 heartbeat_watcher.py status
+    python3 heartbeat_watcher.py stop
+
+It exits on its own after watcher_idle_minutes (default 120) without a
+request from the hook.
+
+Part of Claude Code Memory.
+"""
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+
+import heartbeat
+
+SOCKET_PATH = heartbeat.WATCHER_SOCKET
+PID_FILE = heartbeat.hook_config.state_path("heartbeat", heartbeat.AGENT, ext=".pid")
+POLL_SECONDS = float(heartbeat._cfg.get("watcher_poll_seconds", 2.0))
+RESCAN_SECONDS = 60.0  # full rescan even with inotify, in case events were missed
+IDLE_SECONDS = float(heartbeat._cfg.get("watcher_idle_minutes", 120)) * 60
+
+# inotify(7) event bits
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal inotify binding via ctypes; raises OSError where unavailable."""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is Linux-only")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+
+    def add_dir(self, path: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def read(self):
+        """Yield (directory, filename) for each pending event."""
+        try:
+            buf = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        pos = 0
+        while pos + _EVENT.size <= len(buf):
+            wd, _mask, _cookie, length = _EVENT.unpack_from(buf, pos)
+            name = buf[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            pos += _EVENT.size + length
+            if wd in self._dirs and name:
+                yield self._dirs[wd], os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher:
+    """In-memory view of the watched files plus each session's last-seen state."""
+
+    def __init__(self):
+        self.shared = str(heartbeat.SHARED)
+        self.msg_dir = os.path.join(self.shared, "messages")
+        self.inbox_dir = heartbeat.inbox.inbox_dir(heartbeat.AGENT)
+        self.watched = {}
+        self.inbox = {}
+        self.states = {}  # session id -> last-seen state, loaded on a session's first poll
+        self.rescan()
+
+    def rescan(self):
+        self.watched = heartbeat.scan_watched()
+        self.inbox = heartbeat.scan_inbox()
+
+    def on_event(self, directory: str, name: str):
+        """Re-stat just the file an event named; any inbox change re-reads the inbox state."""
+        if directory == self.inbox_dir or (directory == self.msg_dir and name.endswith(".md")):
+            self.inbox = heartbeat.scan_inbox()
+            return
+        if directory == self.shared and name in heartbeat.WATCH:
+            table, path = self.watched, os.path.join(self.shared, name)
+        else:
+            return
+        try:
+            table[name] = os.path.getmtime(path)
+        except FileNotFoundError:
+            table.pop(name, None)
+
+    def poll(self, session=""):
+        """What heartbeat.py would report to session right now; advances its last-seen state."""
+        state = self.states.get(session)
+        if state is None:
+            state = heartbeat.load_state(session)
+        changed, self.states[session] = heartbeat.collect_changes(state, self.watched, self.inbox,
+                                                                  team=heartbeat.scan_team(state))
+        return changed
+
+    def save(self):
+        """Hand each session's state back to the scanning fallback."""
+        for session, state in self.states.items():
+            heartbeat.save_state(state, session)
+
+
+def serve():
+    pid_fd = heartbeat.shared_io.claim_pid_file(PID_FILE)
+    if pid_fd is None:
+        return  # two hooks raced to start one; the other won
+    watcher = Watcher()
+    try:
+        notify = Inotify()
+        notify.add_dir(watcher.shared)
+        for directory in (watcher.msg_dir, watcher.inbox_dir):
+            if os.path.isdir(directory):
+                notify.add_dir(directory)
+    except (OSError, AttributeError):
+        notify = None  # polling fallback
+
+    try:
+        os.unlink(SOCKET_PATH)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        os.close(pid_fd)  # someone else's file at our path: the hook will not trust it either
+        return
+    old_umask = os.umask(0o077)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(SOCKET_PATH)
+    os.umask(old_umask)
+    server.listen(16)
+    server.setblocking(False)
+
+    sel = selectors.DefaultSelector()
+    sel.register(server, selectors.EVENT_READ, "client")
+    if notify:
+        sel.register(notify.fd, selectors.EVENT_READ, "inotify")
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # run the cleanup below
+    last_scan = last_client = time.monotonic()
+    interval = RESCAN_SECONDS if notify else POLL_SECONDS
+    try:
+        while time.monotonic() - last_client < IDLE_SECONDS:
+            for key, _ in sel.select(timeout=min(interval, 5.0)):
+                if key.data == "inotify":
+                    for directory, name in notify.read():
+                        # Directories created after we started
+                        if directory == watcher.shared and name == "messages":
+                            notify.add_dir(watcher.msg_dir)
+                        elif directory == watcher.msg_dir and os.path.join(directory, name) == watcher.inbox_dir:
+                            notify.add_dir(watcher.inbox_dir)
+                        watcher.on_event(directory, name)
+                elif key.data == "client":
+                    try:
+                        conn, _ = server.accept()
+                    except BlockingIOError:
+                        continue
+                    with conn:
+                        conn.settimeout(1.0)
+                        try:
+                            request = conn.recv(256).decode("utf-8", errors="replace").split()
+                            session = request[1] if len(request) > 1 else ""
+                            changed = (line.replace("\n", " ") for line in watcher.poll(session))
+                            conn.sendall("\n".join(["ok", *changed]).encode("utf-8"))
+                        except OSError:
+                            pass
+                    last_client = time.monotonic()
+            if time.monotonic() - last_scan >= interval:
+                watcher.rescan()
+                last_scan = time.monotonic()
+    finally:
+        watcher.save()  # the scanning fallback picks up where we left off
+        sel.close()
+        server.close()
+        if notify:
+            notify.close()
+        os.close(pid_fd)
+        for path in (SOCKET_PATH, PID_FILE):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def running_pid():
+    return heartbeat.shared_io.read_pid(PID_FILE)
+
+
+def start():
+    """Detach (double fork) and serve; no-op if a watcher is already running."""
+    if running_pid() or not hasattr(os, "fork"):
+        return
+    if os.fork():
+        return
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    try:
+        serve()
+    finally:
+        os._exit(0)
+
+
+def main(argv):
+    cmd = argv[0] if argv else "run"
+    if cmd == "run":
+        serve()
+    elif cmd == "start":
+        start()
+    elif cmd == "stop":
+        pid = running_pid()
+        if pid:
+            os.kill(pid, signal.SIGTERM)
+    elif cmd == "status":
+        pid = running_pid()
+        print(f"running (pid {pid}, socket {SOCKET_PATH})" if pid else "not running")
+        return 0 if pid else 1
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        pass
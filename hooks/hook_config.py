@@ -0,0 +1,113 @@
+"""
+Config loader shared by the hooks.
+
+Reads agent_config.json from this script's directory. The parsed config is
+cached in TEMP as a marshal blob keyed on the config file's mtime and size,
+so a warm start is one stat + one small read, and json is only imported
+when the config actually changed. The cache is 0600 and only read back
+when this user owns it.
+
+Startup-sensitive: imports nothing beyond os, marshal and time (all built
+in), and works under `python3 -S -E`.
+
+Part of Claude Code Memory.
+"""
+import marshal
+import os
+import time
+
+# Every hook imports this module first, so this is as close to its process
+# start as Python code gets: (wall clock, CPU the interpreter spent starting)
+LOADED_AT = (time.perf_counter(), time.process_time())
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(SCRIPT_DIR, "agent_config.json")
+STATE_DIR = os.environ.get("TEMP", "/tmp")
+_UID = getattr(os, "getuid", lambda: 0)()
+CACHE_PATH = os.path.join(STATE_DIR, f"claude_memory_config_{_UID}.marshal")
+
+
+def state_path(kind: str, agent: str, session="", ext=".marshal") -> str:
+    """Host-local state file for one agent (and one session, if given).
+
+    Sessions and agents sharing STATE_DIR each get their own file, so one
+    never overwrites another's state: claude_{kind}_{uid}_{agent}[_{session}]{ext}.
+    """
+    name = f"claude_{kind}_{_UID}_{_safe(agent)}"
+    if session:
+        name += "_" + _safe(session)[:64]
+    return os.path.join(STATE_DIR, name + ext)
+
+
+def state_files(kind: str) -> list:
+    """Every host-local state file of this kind for this user (all agents and sessions)."""
+    prefix = f"claude_{kind}_{_UID}_"
+    try:
+        names = os.listdir(STATE_DIR)
+    except OSError:
+        return []
+    return sorted(os.path.join(STATE_DIR, n) for n in names if n.startswith(prefix))
+
+
+def owned(path) -> bool:
+    """True if path exists and belongs to this user (not a symlink someone else planted).
+
+    State lives in a TEMP other users can write to, so a socket or cache
+    found there is only trusted when it is ours.
+    """
+    try:
+        return os.lstat(path).st_uid == _UID
+    except OSError:
+        return False
+
+
+def read_owned(path):
+    """Contents of a state file in TEMP, or None if it is missing or not this user's.
+
+    Checked on the open file, so a file swapped in after the check is never read.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_uid != _UID:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def _safe(text: str) -> str:
+    return "".join(c if c.isalnum() or c in "-." else "_" for c in str(text)) or "_"
+
+
+def load() -> dict:
+    """agent_config.json as a dict ({} if missing or invalid)."""
+    try:
+        st = os.stat(CONFIG_PATH)
+    except OSError:
+        return {}
+    stamp = (CONFIG_PATH, st.st_mtime_ns, st.st_size)
+
+    data = read_owned(CACHE_PATH)
+    if data:
+        try:
+            cached_stamp, cfg = marshal.loads(data)
+            if cached_stamp == stamp:
+                return cfg
+        except (EOFError, ValueError, TypeError):
+            pass
+
+    import json
+    try:
+        with open(CONFIG_PATH) as f:
+            cfg = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(cfg, dict):
+        return {}
+
+    try:
+        import shared_io
+        shared_io.atomic_write(CACHE_PATH, marshal.dumps((stamp, cfg)), private=True)
+    except (OSError, ValueError):
+        pass
+    return cfg
@@ -0,0 +1,370 @@
+"""
+Inbox — append-only, sharded message log per recipient with a read cursor.
+
+    messages/{agent}/2026-10.md     ← one shard per month, append-only
+    messages/{agent}/.cursor        ← "2026-10.md 18342": read up to here
+
+A message is a `## From {Sender} — YYYY-MM-DD HH:MM` block, appended to the
+recipient's current shard in one locked O_APPEND write and recorded in the
+change journal (journal.py). Readers never scan history: unread messages
+are the bytes from the cursor forward, and the few already-read messages
+shown for context come from a bounded window just before it, so read cost
+stays flat however long the inbox gets.
+
+Writes to the old single-file inbox (messages/{agent}.md) are still picked
+up: the next read moves them into the current shard.
+
+    python3 inbox.py send --to AgentB "Schema is merged, rebase when you can"
+    python3 inbox.py read                 # print all unread, oldest first, mark them read
+    python3 inbox.py read --peek          # print unread, leave them unread
+    python3 inbox.py status               # unread count (exit 1 if none)
+
+Part of Claude Code Memory.
+"""
+# Imported by heartbeat.py on every prompt: built-in modules only at import
+# time, shared_io and journal loaded when a write needs them.
+import os
+import sys
+import time
+
+import hook_config
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+MESSAGES_DIR = os.path.join(SHARED, "messages")
+
+CURSOR_NAME = ".cursor"
+UNREAD_BYTES = 256 * 1024  # newest unread bytes read at most; older unread are counted, not shown
+HEADING = b"## "
+
+
+def inbox_dir(agent=None) -> str:
+    return os.path.join(MESSAGES_DIR, (agent or AGENT).lower())
+
+
+def legacy_path(agent=None) -> str:
+    """The single-file inbox used before shards."""
+    return os.path.join(MESSAGES_DIR, (agent or AGENT).lower() + ".md")
+
+
+def shard_name(ts=None) -> str:
+    return time.strftime("%Y-%m", time.localtime(ts)) + ".md"
+
+
+def shards(agent=None) -> list:
+    """Shard file names, oldest first."""
+    try:
+        names = os.listdir(inbox_dir(agent))
+    except OSError:
+        return []
+    return sorted(n for n in names if n.endswith(".md") and n[:4].isdigit())
+
+
+# === Cursor ===
+
+def read_cursor(agent=None) -> tuple:
+    """(shard, offset) read so far; ("", 0) before the first read."""
+    try:
+        with open(os.path.join(inbox_dir(agent), CURSOR_NAME), "rb") as f:
+            shard, _, offset = f.read(256).decode("utf-8").strip().partition(" ")
+        return shard, int(offset)
+    except (OSError, ValueError, UnicodeDecodeError):
+        return "", 0
+
+
+def write_cursor(agent, shard: str, offset: int):
+    """Move the cursor forward (never back) with an atomic replace.
+
+    Compare and replace happen under the cursor's lock, so of two sessions
+    marking messages read the one further ahead wins.
+    """
+    import shared_io
+
+    if (shard, offset) <= read_cursor(agent):
+        return
+    path = os.path.join(inbox_dir(agent), CURSOR_NAME)
+    with shared_io.file_lock(path):
+        if (shard, offset) > read_cursor(agent):
+            shared_io.atomic_write(path, f"{shard} {offset}\n".encode("utf-8"))
+
+
+# === Reading ===
+
+def split_messages(data: bytes, base=0) -> list:
+    """[(start, end, text)] for each `## ` block in data; offsets are base-relative."""
+    starts = [0] if data.startswith(HEADING) else []
+    pos = data.find(b"\n" + HEADING)
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = data.find(b"\n" + HEADING, pos + 1)
+    if starts[:1] != [0] and data[:starts[0] if starts else len(data)].strip():
+        starts.insert(0, 0)  # text before the first heading is a message too
+    blocks = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(data)
+        text = data[start:end].decode("utf-8", errors="replace").strip()
+        if text:
+            blocks.append((base + start, base + end, text))
+    return blocks
+
+
+def _unread_ranges(agent, cursor):
+    """[(shard, start, size)] of bytes past the cursor, oldest first."""
+    shard, offset = cursor
+    ranges = []
+    for name in shards(agent):
+        if name < shard:
+            continue
+        try:
+            size = os.path.getsize(os.path.join(inbox_dir(agent), name))
+        except OSError:
+            continue
+        start = offset if name == shard else 0
+        if size > start:
+            ranges.append((name, start, size))
+    return ranges
+
+
+def unread(agent=None, limit=UNREAD_BYTES) -> tuple:
+    """(messages, skipped): the newest unread messages within limit bytes, oldest first.
+
+    Each message is a dict with shard, start, end, text and mtime (the
+    shard's). skipped counts older unread messages left out by the limit.
+    """
+    ranges = _unread_ranges(agent, read_cursor(agent))
+    messages, skipped, budget = [], 0, limit
+    for name, start, size in reversed(ranges):
+        path = os.path.join(inbox_dir(agent), name)
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                begin = max(start, size - budget)
+                f.seek(begin)
+                data = f.read(size - begin)
+        except OSError:
+            continue
+        blocks = split_messages(data, begin)
+        if begin > start:
+            # Cut mid-message: drop the partial first block, count what was skipped
+            if blocks and not data.startswith(HEADING):
+                blocks = blocks[1:]
+            skipped += count_messages(agent, [(name, start, begin)])
+        budget -= len(data)
+        messages[:0] = [{"shard": name, "start": s, "end": e, "text": t, "mtime": mtime}
+                        for s, e, t in blocks]
+        if budget <= 0:
+            skipped += count_messages(agent, ranges[:ranges.index((name, start, size))])
+            break
+    return messages, skipped
+
+
+def oldest_unread(agent=None, limit=UNREAD_BYTES) -> tuple:
+    """(messages, remaining): the oldest unread messages within limit bytes, and how many follow.
+
+    The messages run on from the cursor with no gap, so marking the last of
+    them read never passes over one that was not returned. A first message
+    longer than limit is returned whole.
+    """
+    ranges = _unread_ranges(agent, read_cursor(agent))
+    messages, budget = [], limit
+    for i, (name, start, size) in enumerate(ranges):
+        path = os.path.join(inbox_dir(agent), name)
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                f.seek(start)
+                data = f.read(min(size - start, budget))
+                while not messages and start + len(data) < size and data.find(b"\n" + HEADING) == -1:
+                    data += f.read(min(1 << 20, size - start - len(data)))  # one long first message
+        except OSError:
+            continue
+        blocks = split_messages(data, start)
+        end = start + len(data)
+        if end < size:
+            blocks = blocks[:-1]  # cut mid-message: it comes with the next page
+            end = blocks[-1][1] if blocks else start
+        messages += [{"shard": name, "start": s, "end": e, "text": t, "mtime": mtime} for s, e, t in blocks]
+        budget -= end - start
+        if end < size or budget <= 0:
+            return messages, count_messages(agent, [(name, end, size)] + ranges[i + 1:])
+    return messages, 0
+
+
+def count_messages(agent, ranges) -> int:
+    """Messages in the given (shard, start, end) byte ranges, read in chunks."""
+    count = 0
+    for name, start, end in ranges:
+        try:
+            with open(os.path.join(inbox_dir(agent), name), "rb") as f:
+                f.seek(start)
+                first = True
+                tail = b"\n"
+                while start < end:
+                    chunk = f.read(min(1 << 20, end - start))
+                    if not chunk:
+                        break
+                    data = tail + chunk
+                    count += data.count(b"\n" + HEADING)
+                    if first and chunk.strip() and not chunk.lstrip().startswith(HEADING):
+                        count += 1  # leading text without a heading
+                    first = False
+                    tail = data[-len(HEADING):]
+                    start += len(chunk)
+        except OSError:
+            continue
+    return count
+
+
+def unread_summary(agent=None) -> tuple:
+    """(count, newest mtime) of unread messages; (0, 0) if none. Cheap when there are none."""
+    ranges = _unread_ranges(agent, read_cursor(agent))
+    if not ranges:
+        return 0, 0
+    newest = 0
+    for name, _, _ in ranges:
+        try:
+            newest = max(newest, os.path.getmtime(os.path.join(inbox_dir(agent), name)))
+        except OSError:
+            pass
+    return count_messages(agent, ranges), newest
+
+
+def recent(agent=None, limit=16 * 1024, count=5) -> list:
+    """Up to count already-read messages just before the cursor (within limit bytes of its shard)."""
+    shard, offset = read_cursor(agent)
+    if not shard or offset <= 0:
+        return []
+    path = os.path.join(inbox_dir(agent), shard)
+    begin = max(0, offset - limit)
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            f.seek(begin)
+            data = f.read(offset - begin)
+    except OSError:
+        return []
+    blocks = split_messages(data, begin)
+    if begin > 0 and blocks and not data.startswith(HEADING):
+        blocks = blocks[1:]
+    return [{"shard": shard, "start": s, "end": e, "text": t, "mtime": mtime}
+            for s, e, t in blocks[-count:]]
+
+
+def mark_read(agent, message: dict):
+    """Everything up to the end of message counts as read."""
+    write_cursor(agent, message["shard"], message["end"])
+
+
+# === Writing ===
+
+def _append(agent, data: bytes, shard=None):
+    import shared_io
+
+    return shared_io.append_bytes(os.path.join(inbox_dir(agent), shard or shard_name()), data)
+
+
+def send(to: str, text: str, sender=None, ts=None):
+    """Append one message to to's inbox and journal it; returns (shard, start, end)."""
+    stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(ts))
+    block = f"## From {sender or AGENT} — {stamp}\n\n{text.strip()}\n\n".encode("utf-8")
+    shard = shard_name()
+    start, end = _append(to, block, shard)
+    try:
+        import journal
+        opening = text.strip().partition("\n")[0]
+        journal.record("message", os.path.join(inbox_dir(to), shard), start, end,
+                       f"{to}: {opening}", sender or AGENT)
+    except OSError:
+        pass  # the message is delivered; only the feed misses it
+    return shard, start, end
+
+
+def absorb_legacy(agent=None) -> int:
+    """Move messages written to the old single-file inbox into the current shard.
+
+    The file is renamed away before it is read, so a sender appending to it
+    meanwhile starts a fresh file that the next call picks up. On the very
+    first migration the absorbed history counts as read.
+    """
+    path = legacy_path(agent)
+    try:
+        if os.path.getsize(path) == 0:
+            return 0
+    except OSError:
+        return 0
+    first = read_cursor(agent) == ("", 0) and not shards(agent)
+    claimed = f"{path}.{os.getpid()}.absorb"
+    try:
+        os.rename(path, claimed)
+        with open(claimed, "rb") as f:
+            data = f.read()
+    except OSError:
+        return 0
+    if data.startswith(b"# "):
+        data = data.partition(b"\n")[2]  # the file's title, not a message
+    if data.strip():
+        data = data.lstrip(b"\n")
+        if not data.endswith(b"\n\n"):
+            data = data.rstrip(b"\n") + b"\n\n"
+        _, end = _append(agent, data)
+        if first:
+            write_cursor(agent, shard_name(), end)
+    os.remove(claimed)
+    return len(data)
+
+
+# === CLI ===
+
+def main(argv):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Send and read inter-agent messages.")
+    sub = ap.add_subparsers(dest="cmd")
+    p_send = sub.add_parser("send", help="append a message to an agent's inbox")
+    p_send.add_argument("--to", required=True)
+    p_send.add_argument("--from", dest="sender", default=AGENT)
+    p_send.add_argument("text", nargs="?", help="message text (default: stdin)")
+    p_read = sub.add_parser("read", help="print unread messages and mark them read")
+    p_read.add_argument("--peek", action="store_true", help="leave them unread")
+    p_read.add_argument("--agent", default=AGENT)
+    p_status = sub.add_parser("status", help="number of unread messages")
+    p_status.add_argument("--agent", default=AGENT)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "send":
+        text = args.text if args.text is not None else sys.stdin.read()
+        if not text.strip():
+            print("empty message", file=sys.stderr)
+            return 2
+        shard, start, _ = send(args.to, text, args.sender)
+        print(f"sent to messages/{args.to.lower()}/{shard} @ {start}")
+    elif args.cmd == "read":
+        absorb_legacy(args.agent)
+        messages, remaining = oldest_unread(args.agent)
+        if not messages:
+            print("no unread messages")
+        while messages:
+            # A page at a time, oldest first, so a long backlog is read whole in bounded memory
+            for m in messages:
+                print(m["text"] + "\n")
+            if args.peek:
+                if remaining:
+                    print(f"({remaining} more unread messages not shown)")
+                break
+            mark_read(args.agent, messages[-1])
+            messages, remaining = oldest_unread(args.agent) if remaining else ([], 0)
+    elif args.cmd == "status":
+        absorb_legacy(args.agent)
+        count, newest = unread_summary(args.agent)
+        print(f"{count} unread" + (f", newest {time.strftime('%Y-%m-%d %H:%M', time.localtime(newest))}"
+                                   if count else ""))
+        return 0 if count else 1
+    else:
+        ap.print_help()
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
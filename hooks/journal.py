@@ -0,0 +1,287 @@
+"""
+Change journal — one append-only feed of what every agent wrote to the shared folder.
+
+    journal/2026-10.tsv        ← one shard per month, append-only
+    journal/.{agent}.mark      ← "2026-10-18.md 18342": own log journaled up to here
+
+Whenever a hook appends to a daily log, saves a handover or sends a
+message, it appends one line here:
+
+    ts <TAB> agent <TAB> kind <TAB> file <TAB> start <TAB> end <TAB> digest
+
+kind is log, handover or message; file is relative to the shared folder;
+[start, end) is the byte range that was written; digest is a one-line
+summary (entry titles, message opening). Lines are single locked O_APPEND
+writes, so concurrent writers never interleave within a record.
+
+Log entries agents write by hand are journaled too: sync_log() compares
+the agent's log with its mark and records whatever was appended since, so
+every prompt (heartbeat) and every boot (SessionStart) catch up on it.
+
+Readers keep their own cursor, a (shard, offset) pair, and read only the
+bytes past it: the cost is proportional to the new records, not to the
+number of agents, logs or directories.
+
+    python3 journal.py                   # last 20 records
+    python3 journal.py tail -n 50 [--agent X] [--kind log]
+
+Part of Claude Code Memory.
+"""
+# Imported by heartbeat.py on every prompt: built-in modules only, no json —
+# records are tab-separated so reading them needs nothing but str.split.
+import os
+import sys
+import time
+
+import hook_config
+import shared_io
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+JOURNAL_DIR = os.path.join(SHARED, "journal")
+
+READ_BYTES = 256 * 1024   # newest bytes past a cursor read at most; older records are skipped
+DIGEST_BYTES = 16 * 1024  # tail of a log range read to find its entry titles
+DIGEST_CHARS = 160
+FIELDS = ("ts", "agent", "kind", "file", "start", "end", "digest")
+
+
+def shard_name(ts=None) -> str:
+    return time.strftime("%Y-%m", time.localtime(ts)) + ".tsv"
+
+
+def shards() -> list:
+    """Shard file names, oldest first."""
+    try:
+        names = os.listdir(JOURNAL_DIR)
+    except OSError:
+        return []
+    return sorted(n for n in names if n.endswith(".tsv") and n[:4].isdigit())
+
+
+def _size(name) -> int:
+    try:
+        return os.path.getsize(os.path.join(JOURNAL_DIR, name))
+    except OSError:
+        return 0
+
+
+# === Writing ===
+
+def _clean(text: str) -> str:
+    return " ".join(str(text).split())[:DIGEST_CHARS]
+
+
+def record(kind: str, path, start: int, end: int, digest="", agent=None, ts=None) -> tuple:
+    """Append one record; returns the (start, end) of the line in its shard.
+
+    Not fsync'd: the journal is a feed of what changed, and the files it
+    points at hold the data.
+    """
+    ts = time.time() if ts is None else ts
+    try:
+        rel = os.path.relpath(str(path), SHARED)
+    except ValueError:  # on another drive (Windows): no relative path exists
+        rel = os.path.abspath(str(path))
+    rel = rel.replace(os.sep, "/")
+    line = f"{ts:.3f}\t{_clean(agent or AGENT)}\t{kind}\t{rel}\t{start}\t{end}\t{_clean(digest)}\n"
+    return shared_io.append_bytes(os.path.join(JOURNAL_DIR, shard_name(ts)), line.encode("utf-8"), fsync=False)
+
+
+def mark_path(agent=None) -> str:
+    return os.path.join(JOURNAL_DIR, f".{(agent or AGENT).lower()}.mark")
+
+
+def _read_mark(agent) -> tuple:
+    """(log file name, offset) of the agent's log journaled so far; ("", 0) if none."""
+    try:
+        with open(mark_path(agent), "rb") as f:
+            name, _, offset = f.read(256).decode("utf-8").strip().partition(" ")
+        return name, int(offset)
+    except (OSError, ValueError, UnicodeDecodeError):
+        return "", 0
+
+
+def log_digest(path, start: int, end: int) -> str:
+    """Titles of the `### HH:MM — Title` entries in [start, end) of a log, else its first line."""
+    begin = max(start, end - DIGEST_BYTES)
+    try:
+        with open(str(path), "rb") as f:
+            f.seek(begin)
+            text = f.read(end - begin).decode("utf-8", errors="ignore")
+    except OSError:
+        return ""
+    titles = []
+    for line in text.splitlines():
+        if line.startswith("### "):
+            title = line[4:].strip()
+            head, sep, rest = title.partition(" — ")
+            titles.append(rest.strip() if sep and ":" in head else title)
+    if titles:
+        return "; ".join(titles)
+    return next((line.strip() for line in text.splitlines() if line.strip()), "")
+
+
+def sync_log(log_path, agent=None) -> int:
+    """Journal whatever was appended to an agent's daily log since its mark; returns records written.
+
+    Cheap when nothing changed (one small read and one stat). When the log
+    is a new day's, the rest of the previous one is journaled first; a log
+    that shrank was rewritten and is journaled whole. Concurrent callers
+    take turns, so no range is journaled twice.
+    """
+    agent = agent or AGENT
+    log_path = str(log_path)
+    name = os.path.basename(log_path)
+    try:
+        size = os.path.getsize(log_path)
+    except OSError:
+        return 0
+    if _read_mark(agent) == (name, size):
+        return 0
+    written = 0
+    with shared_io.file_lock(mark_path(agent)):
+        marked, offset = _read_mark(agent)
+        if marked and marked != name:
+            previous = os.path.join(os.path.dirname(log_path), marked)
+            try:
+                old_size = os.path.getsize(previous)
+            except OSError:
+                old_size = 0
+            if old_size > offset:
+                record("log", previous, offset, old_size, log_digest(previous, offset, old_size), agent)
+                written += 1
+            offset = 0
+        size = os.path.getsize(log_path)
+        shrunk = size < offset
+        if shrunk:
+            offset = 0  # rewritten in place since the mark, so journal all of it
+        if size > offset:
+            record("log", log_path, offset, size, log_digest(log_path, offset, size), agent)
+            written += 1
+        if written or shrunk or marked != name:
+            shared_io.atomic_write(mark_path(agent), f"{name} {size}\n".encode("utf-8"))
+    return written
+
+
+# === Reading ===
+
+def parse(line: bytes):
+    """A record as a dict, or None for a malformed line."""
+    fields = line.decode("utf-8", errors="replace").rstrip("\n").split("\t", 6)
+    if len(fields) != len(FIELDS):
+        return None
+    try:
+        fields[0], fields[4], fields[5] = float(fields[0]), int(fields[4]), int(fields[5])
+    except ValueError:
+        return None
+    return dict(zip(FIELDS, fields))
+
+
+def _records(data: bytes) -> list:
+    records = []
+    for line in data.split(b"\n"):
+        if line:
+            r = parse(line)
+            if r:
+                records.append(r)
+    return records
+
+
+def end_cursor() -> tuple:
+    """Cursor at the end of the journal: a reader starting here sees only new records."""
+    names = shards()
+    return (names[-1], _size(names[-1])) if names else (shard_name(), 0)
+
+
+def read_since(cursor, limit=READ_BYTES) -> tuple:
+    """(records, cursor): complete records past cursor, oldest first, and where to read from next.
+
+    In the common case (nothing new, same month) this is a single stat.
+    When more than limit bytes are waiting, only the newest are read.
+    """
+    shard, offset = cursor
+    current = shard_name()
+    if shard == current:
+        names = [shard]
+    else:
+        names = [n for n in shards() if n >= shard] or [current]
+    ranges = []
+    for name in names:
+        size = _size(name)
+        start = offset if name == shard else 0
+        if size > start:
+            ranges.append((name, start, size))
+    if not ranges:
+        return [], (names[-1], offset if names[-1] == shard else 0)
+
+    records, budget = [], limit
+    last_name, _, last_size = ranges[-1]
+    new_cursor = (last_name, last_size)
+    for name, start, size in reversed(ranges):
+        begin = max(start, size - budget)
+        try:
+            with open(os.path.join(JOURNAL_DIR, name), "rb") as f:
+                f.seek(begin)
+                data = f.read(size - begin)
+        except OSError:
+            continue
+        complete = data.rfind(b"\n") + 1
+        if name == last_name:
+            new_cursor = (name, begin + complete)  # a record still being written is read next time
+        data = data[:complete]
+        if begin > start:
+            data = data.partition(b"\n")[2]  # cut mid-record
+        records[:0] = _records(data)
+        budget -= size - begin
+        if budget <= 0:
+            break
+    return records, new_cursor
+
+
+def recent(limit=32 * 1024) -> list:
+    """Records in the last limit bytes of the journal (newest shard, then the one before), oldest first."""
+    records, budget = [], limit
+    for name in reversed(shards()[-2:]):
+        size = _size(name)
+        begin = max(0, size - budget)
+        try:
+            with open(os.path.join(JOURNAL_DIR, name), "rb") as f:
+                f.seek(begin)
+                data = f.read(size - begin)
+        except OSError:
+            continue
+        if begin:
+            data = data.partition(b"\n")[2]
+        records[:0] = _records(data[:data.rfind(b"\n") + 1])
+        budget -= size - begin
+        if budget <= 0:
+            break
+    return records
+
+
+# === CLI ===
+
+def main(argv):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Show the shared folder's change journal.")
+    ap.add_argument("cmd", nargs="?", default="tail", choices=("tail",))
+    ap.add_argument("-n", type=int, default=20, help="records to show (default 20)")
+    ap.add_argument("--agent", help="only this agent's records")
+    ap.add_argument("--kind", choices=("log", "handover", "message"))
+    args = ap.parse_args(argv)
+
+    records = [r for r in recent(max(32 * 1024, args.n * 512))
+               if (not args.agent or r["agent"] == args.agent) and (not args.kind or r["kind"] == args.kind)]
+    for r in records[-args.n:]:
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["ts"]))
+        print(f"{stamp}  {r['agent']:<10} {r['kind']:<8} {r['file']} [{r['start']}:{r['end']}]  {r['digest']}")
+    if not records:
+        print("journal is empty")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
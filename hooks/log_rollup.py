@@ -0,0 +1,414 @@
+"""
+Log rollups — pre-aggregated, machine-readable summaries of the daily logs.
+
+Streams {AGENT}/logs/YYYY-MM-DD.md one work entry at a time (byte ranges
+from daily_log's index) and reads the standard entry fields:
+
+    ### HH:MM — {Task Title}
+    - **project:** / **type:** / **status:** / **files_touched:**
+    - **cost_usd:** / **tokens_used:**
+
+and writes, under {AGENT}/rollups/:
+
+    days/YYYY-MM-DD.json     per-day totals, per-project breakdown, summary + blockers
+    weeks/YYYY-Www.json/.md  one ISO week: per-project and per-day tables, open items
+    projects.json            all-time per-project totals, first/last seen, latest status
+
+Incremental: a day rollup records the (mtime_ns, size) of its log and is
+only rebuilt when the log changed; weeks and projects are merged from the
+day rollups, never from raw logs. Days archive.py has moved into monthly
+bundles keep their rollups (rebuilt from the bundle if deleted). PreCompact
+folds the entry it appends into today's rollup (add_entry), reading only
+those bytes, so the weekly-consolidate skill reads one compact week file
+instead of seven raw logs.
+
+    python3 log_rollup.py                       # update, print this week's markdown
+    python3 log_rollup.py --week 2026-W41       # a past week
+    python3 log_rollup.py --agent Bob --json    # another agent, as JSON
+    python3 log_rollup.py --projects            # all-time project table
+
+Part of Claude Code Memory.
+"""
+import json
+import os
+import re
+import sys
+from datetime import date, timedelta
+
+import daily_log
+import hook_config
+import shared_io
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+
+ROLLUP_VERSION = 1
+DONE_STATUSES = ("done", "complete", "completed", "shipped")
+_DAY_LOG_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.md$")
+_TITLE_RE = re.compile(r"^### (\d{1,2}:\d{2})\s*(?:—|-+)?\s*(.*)$")
+_FIELD_RE = re.compile(r"^- \*\*(\w+):\*\*\s*(.*)$")
+_NUMBER_RE = re.compile(r"[-+]?\d[\d,]*(?:\.\d+)?")
+
+
+def rollup_dir(agent=None) -> str:
+    return os.path.join(SHARED, agent or AGENT, "rollups")
+
+
+def logs_dir(agent=None) -> str:
+    return os.path.join(SHARED, agent or AGENT, "logs")
+
+
+# === Parsing ===
+
+def parse_number(text: str, scaled=False) -> float:
+    """First number in a field value: "$1,234.50" -> 1234.5; with scaled, "12k" -> 12000, "1.2M" -> 1200000."""
+    m = _NUMBER_RE.search(text or "")
+    if not m:
+        return 0.0
+    value = float(m.group(0).replace(",", ""))
+    if scaled:
+        value *= {"k": 1e3, "m": 1e6}.get(text[m.end():m.end() + 1].lower(), 1)
+    return value
+
+
+def parse_entry(text: str) -> dict:
+    """One `### HH:MM — Title` entry as a dict of its fields."""
+    lines = text.strip().split("\n")
+    m = _TITLE_RE.match(lines[0]) if lines else None
+    entry = {"time": m.group(1) if m else "", "title": (m.group(2) if m else lines[0].lstrip("#")).strip()}
+    for line in lines[1:]:
+        f = _FIELD_RE.match(line.strip())
+        if f:
+            entry[f.group(1).lower()] = f.group(2).strip()
+    return entry
+
+
+def _placeholder(value: str) -> bool:
+    """Template text like {project_name} left in an entry."""
+    return not value or (value.startswith("{") and value.endswith("}"))
+
+
+def iter_entries(log_path):
+    """Parsed work entries of a log, streamed one byte range at a time."""
+    index = daily_log.load_index(log_path, save=False)
+    with open(str(log_path), "rb") as f:
+        for start, end, _ in index["entries"]:
+            f.seek(start)
+            yield parse_entry(f.read(end - start).decode("utf-8", errors="replace"))
+
+
+# === Aggregation ===
+
+def _bucket():
+    return {"entries": 0, "cost_usd": 0.0, "tokens_used": 0, "by_status": {}, "by_type": {}, "files": []}
+
+
+def _add(bucket, entry):
+    bucket["entries"] += 1
+    bucket["cost_usd"] = round(bucket["cost_usd"] + parse_number(entry.get("cost_usd", "")), 4)
+    bucket["tokens_used"] += int(parse_number(entry.get("tokens_used", ""), scaled=True))
+    for key, field in (("by_status", "status"), ("by_type", "type")):
+        value = entry.get(field, "")
+        value = "unknown" if _placeholder(value) else value.lower()
+        bucket[key][value] = bucket[key].get(value, 0) + 1
+    files = entry.get("files_touched", "")
+    if not _placeholder(files):
+        _union(bucket["files"], (f.strip() for f in files.split(",")))
+
+
+def _union(into: list, items):
+    """Append items not already in into (keeps first-seen order)."""
+    seen = set(into)
+    for item in items:
+        if item and item not in seen:
+            seen.add(item)
+            into.append(item)
+
+
+def _merge(into, bucket):
+    into["entries"] += bucket["entries"]
+    into["cost_usd"] = round(into["cost_usd"] + bucket["cost_usd"], 4)
+    into["tokens_used"] += bucket["tokens_used"]
+    for key in ("by_status", "by_type"):
+        for value, n in bucket[key].items():
+            into[key][value] = into[key].get(value, 0) + n
+    _union(into["files"], bucket["files"])
+
+
+def build_day(log_path, agent=None) -> dict:
+    """Rollup of one daily log."""
+    log_path = str(log_path)
+    st = os.stat(log_path)
+    index = daily_log.load_index(log_path, save=False)
+    with open(log_path, "rb") as f:
+        def read(start, end):
+            f.seek(start)
+            return f.read(end - start)
+
+        return _day_rollup(os.path.basename(log_path)[:-3], [st.st_mtime_ns, st.st_size], index, read, agent)
+
+
+def _day_rollup(day, source, index, read, agent) -> dict:
+    """Rollup of a day's log from its index; read(start, end) returns the log's bytes."""
+    rollup = {
+        "version": ROLLUP_VERSION,
+        "agent": agent or AGENT,
+        "day": day,
+        "source": source,
+        "totals": _bucket(),
+        "projects": {},
+        "items": [],
+        "summary": _section(index, read, "summary", 1200),
+        "blockers": _section(index, read, "blockers", 800),
+    }
+    for start, end, _ in index["entries"]:
+        _fold(rollup, parse_entry(read(start, end).decode("utf-8", errors="replace")))
+    return rollup
+
+
+def _fold(rollup, entry):
+    project = entry.get("project", "")
+    project = "(none)" if _placeholder(project) else project
+    _add(rollup["totals"], entry)
+    _add(rollup["projects"].setdefault(project, _bucket()), entry)
+    rollup["items"].append({"time": entry["time"], "title": entry["title"], "project": project,
+                            "status": entry.get("status", "").lower()})
+
+
+def _section(index, read, kind, limit) -> str:
+    """daily_log.section_text over read(): bodies of every section of this kind, up to limit bytes."""
+    parts = []
+    for s in daily_log.sections_of(index, kind):
+        parts.append(read(s["body"], s["body"] + min(s["end"] - s["body"], limit)))
+        limit -= len(parts[-1])
+        if limit <= 0:
+            break
+    return b"".join(parts).decode("utf-8", errors="ignore").strip()
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write(path, text):
+    shared_io.atomic_write(path, text.encode("utf-8"))
+
+
+def update_day(log_path, agent=None):
+    """Day rollup for log_path, rebuilt and saved only if the log changed since last time."""
+    log_path = str(log_path)
+    st = os.stat(log_path)
+    out = os.path.join(rollup_dir(agent), "days", os.path.basename(log_path)[:-3] + ".json")
+    cached = _read_json(out)
+    if cached and cached.get("version") == ROLLUP_VERSION and cached.get("source") == [st.st_mtime_ns, st.st_size]:
+        return cached, False
+    rollup = build_day(log_path, agent)
+    _write(out, json.dumps(rollup, indent=1, ensure_ascii=False))
+    return rollup, True
+
+
+def add_entry(log_path, start: int, end: int, agent=None):
+    """Fold the entry just appended at [start, end) into the log's saved day rollup.
+
+    Reads only those bytes. If the rollup does not end where the entry
+    starts (missing, or the log changed in between), the whole day is
+    rebuilt instead.
+    """
+    log_path = str(log_path)
+    st = os.stat(log_path)
+    out = os.path.join(rollup_dir(agent), "days", os.path.basename(log_path)[:-3] + ".json")
+    rollup = _read_json(out)
+    if not (rollup and rollup.get("version") == ROLLUP_VERSION and (rollup.get("source") or [0, 0])[1] == start
+            and st.st_size == end):
+        return update_day(log_path, agent)
+    with open(log_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # The bytes may open with a "## Work Log (continued)" heading before the entry
+    at = data.find(b"### ")
+    for text in (data[at:].decode("utf-8", errors="replace").split("\n### ") if at != -1 else []):
+        _fold(rollup, parse_entry(text if text.startswith("### ") else "### " + text))
+    rollup["source"] = [st.st_mtime_ns, st.st_size]
+    _write(out, json.dumps(rollup, indent=1, ensure_ascii=False))
+    return rollup, True
+
+
+def update_all(agent=None) -> tuple:
+    """Bring every day rollup up to date; returns ({day: rollup}, days rebuilt)."""
+    days, rebuilt = {}, 0
+    try:
+        names = sorted(os.listdir(logs_dir(agent)))
+    except OSError:
+        names = []
+    for name in names:
+        if _DAY_LOG_RE.match(name):
+            rollup, changed = update_day(os.path.join(logs_dir(agent), name), agent)
+            days[rollup["day"]] = rollup
+            rebuilt += changed
+
+    # Days archive.py has bundled: final, so their saved rollups stand
+    import archive
+    for day in archive.archived_days(agent):
+        if day not in days:
+            rollup, changed = archived_day(day, agent)
+            if rollup:
+                days[day] = rollup
+                rebuilt += changed
+    return days, rebuilt
+
+
+def archived_day(day: str, agent=None) -> tuple:
+    """(rollup, rebuilt) of an archived day: the saved rollup, else rebuilt from the bundle."""
+    import archive
+
+    out = os.path.join(rollup_dir(agent), "days", f"{day}.json")
+    cached = _read_json(out)
+    if cached and cached.get("version") == ROLLUP_VERSION:
+        return cached, False
+    data = archive.day_bytes(day, agent)
+    if data is None:
+        return None, False
+    rollup = _day_rollup(day, [0, len(data)], daily_log.index_of(data), lambda start, end: data[start:end], agent)
+    _write(out, json.dumps(rollup, indent=1, ensure_ascii=False))
+    return rollup, True
+
+
+def iso_week(day: str) -> str:
+    y, w, _ = date.fromisoformat(day).isocalendar()
+    return f"{y}-W{w:02d}"
+
+
+def week_bounds(week: str):
+    """(monday, sunday) ISO dates of "YYYY-Www"."""
+    year, num = week.split("-W")
+    monday = date.fromisocalendar(int(year), int(num), 1)
+    return monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+
+
+def build_week(days: dict, week: str, agent=None) -> dict:
+    first, last = week_bounds(week)
+    totals = _bucket()
+    projects = {}
+    per_day = {}
+    open_items, blockers = [], []
+    for day in sorted(d for d in days if first <= d <= last):
+        rollup = days[day]
+        _merge(totals, rollup["totals"])
+        for name, bucket in rollup["projects"].items():
+            _merge(projects.setdefault(name, _bucket()), bucket)
+        per_day[day] = {k: rollup["totals"][k] for k in ("entries", "cost_usd", "tokens_used")}
+        per_day[day]["projects"] = sorted(rollup["projects"])
+        open_items.extend(dict(item, day=day) for item in rollup["items"]
+                          if item["status"] and not item["status"].startswith(DONE_STATUSES))
+        text = rollup.get("blockers", "")
+        if text and text.lower().strip(" .") not in ("none", "n/a", "-") and not _placeholder(text):
+            blockers.append({"day": day, "text": text})
+    return {"version": ROLLUP_VERSION, "agent": agent or AGENT, "week": week, "from": first, "to": last,
+            "totals": totals, "projects": projects, "days": per_day,
+            "open_items": open_items[-20:], "blockers": blockers}
+
+
+def build_projects(days: dict) -> dict:
+    """All-time per-project totals with first/last day and latest status."""
+    projects = {}
+    for day in sorted(days):
+        for name, bucket in days[day]["projects"].items():
+            p = projects.setdefault(name, dict(_bucket(), first_day=day, last_day=day, last_status=""))
+            _merge(p, bucket)
+            p["last_day"] = day
+        for item in days[day]["items"]:
+            if item["status"]:
+                projects[item["project"]]["last_status"] = item["status"]
+    for p in projects.values():
+        p["files"] = len(p["files"])
+    return projects
+
+
+# === Rendering ===
+
+def _tokens(n):
+    return f"{n / 1e6:.1f}M" if n >= 1e6 else f"{n / 1e3:.0f}k" if n >= 1e3 else str(n)
+
+
+def _status_line(by_status):
+    return " · ".join(f"{s} {n}" for s, n in sorted(by_status.items(), key=lambda kv: -kv[1]))
+
+
+def render_week(week: dict) -> str:
+    t = week["totals"]
+    lines = [
+        f"# Rollup — {week['agent']} — {week['week']} ({week['from']} → {week['to']})",
+        f"**Entries:** {t['entries']} | **Cost:** ${t['cost_usd']:.2f} | **Tokens:** {_tokens(t['tokens_used'])} "
+        f"| **Files:** {len(t['files'])} | {_status_line(t['by_status'])}",
+        "",
+        "## By project",
+        "| Project | Entries | Statuses | Cost | Tokens | Files |",
+        "|---------|---------|----------|------|--------|-------|",
+    ]
+    for name, p in sorted(week["projects"].items(), key=lambda kv: -kv[1]["entries"]):
+        lines.append(f"| {name} | {p['entries']} | {_status_line(p['by_status'])} | ${p['cost_usd']:.2f} "
+                     f"| {_tokens(p['tokens_used'])} | {len(p['files'])} |")
+    lines += ["", "## By day", "| Day | Entries | Cost | Tokens | Projects |", "|-----|---------|------|--------|----------|"]
+    for day, d in week["days"].items():
+        lines.append(f"| {day} | {d['entries']} | ${d['cost_usd']:.2f} | {_tokens(d['tokens_used'])} | {', '.join(d['projects'])} |")
+    if week["open_items"]:
+        lines += ["", "## Not done"]
+        lines += [f"- {i['day']} {i['time']} {i['project']}: {i['title']} [{i['status']}]" for i in week["open_items"]]
+    if week["blockers"]:
+        lines += ["", "## Blockers"]
+        lines += [f"- {b['day']}: {' '.join(b['text'].split())}" for b in week["blockers"]]
+    return "\n".join(lines) + "\n"
+
+
+def render_projects(projects: dict) -> str:
+    lines = ["| Project | Entries | First | Last | Last status | Cost | Tokens | Files |",
+             "|---------|---------|-------|------|-------------|------|--------|-------|"]
+    for name, p in sorted(projects.items(), key=lambda kv: kv[1]["last_day"], reverse=True):
+        lines.append(f"| {name} | {p['entries']} | {p['first_day']} | {p['last_day']} | {p['last_status']} "
+                     f"| ${p['cost_usd']:.2f} | {_tokens(p['tokens_used'])} | {p['files']} |")
+    return "\n".join(lines) + "\n"
+
+
+def update(agent=None, week=None) -> tuple:
+    """Refresh day rollups, then write the week's and the all-time project rollups.
+
+    Returns (week rollup, days rebuilt).
+    """
+    days, rebuilt = update_all(agent)
+    week = week or iso_week(date.today().isoformat())
+    week_rollup = build_week(days, week, agent)
+    out = rollup_dir(agent)
+    _write(os.path.join(out, "weeks", f"{week}.json"), json.dumps(week_rollup, indent=1, ensure_ascii=False))
+    _write(os.path.join(out, "weeks", f"{week}.md"), render_week(week_rollup))
+    _write(os.path.join(out, "projects.json"), json.dumps(build_projects(days), indent=1, ensure_ascii=False))
+    return week_rollup, rebuilt
+
+
+def main(argv):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Update and print log rollups.")
+    ap.add_argument("--agent", help=f"whose logs (default {AGENT})")
+    ap.add_argument("--week", help="ISO week YYYY-Www (default: this week)")
+    ap.add_argument("--json", action="store_true", help="print the week rollup as JSON")
+    ap.add_argument("--projects", action="store_true", help="print the all-time project table")
+    args = ap.parse_args(argv)
+
+    week, rebuilt = update(args.agent, args.week)
+    if args.projects:
+        print(render_projects(_read_json(os.path.join(rollup_dir(args.agent), "projects.json")) or {}), end="")
+    elif args.json:
+        print(json.dumps(week, indent=2, ensure_ascii=False))
+    else:
+        print(render_week(week), end="")
+    print(f"[{rebuilt} day rollup(s) rebuilt — {rollup_dir(args.agent)}]", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
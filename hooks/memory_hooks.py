@@ -0,0 +1,332 @@
+"""
+Memory hooks dispatcher — one entry point for every Claude Code Memory hook.
+
+    python3 memory_hooks.py session-start      # SessionStart
+    python3 memory_hooks.py pre-compact        # PreCompact
+    python3 memory_hooks.py heartbeat          # UserPromptSubmit
+
+Reads the hook event JSON from stdin and prints exactly what the
+individual hook script would print (the scripts still work on their own).
+
+Optional server mode keeps one warm process per agent: config, imported
+modules, the daily log index and section caches stay loaded between
+events. When a server is running the dispatcher is a thin client — it
+forwards the event over a local Unix socket and prints the reply — so an
+event costs interpreter startup plus one round trip instead of imports,
+config parsing and cold caches. With no server it runs the hook in-process.
+
+    python3 memory_hooks.py serve              # foreground
+    python3 memory_hooks.py start | stop | status
+
+Set "hook_server": true in agent_config.json to have the dispatcher start
+the server on demand. It reloads the hook modules when agent_config.json
+changes and exits after hook_server_idle_minutes (default 120) idle.
+
+The socket and pid file are per user and agent in TEMP, and the client only
+talks to a socket owned by its own user. Once an event reaches the server
+it runs there only: if the hook fails, or the reply is late, the client
+reports it instead of running the hook again, which could log twice.
+
+Part of Claude Code Memory.
+"""
+import os
+import sys
+
+import hook_config
+
+EVENTS = {
+    "session-start": "session_start",
+    "SessionStart": "session_start",
+    "pre-compact": "pre_compact_handover",
+    "PreCompact": "pre_compact_handover",
+    "heartbeat": "heartbeat",
+    "UserPromptSubmit": "heartbeat",
+}
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+USE_SERVER = bool(_cfg.get("hook_server", False))
+SOCKET_PATH = hook_config.state_path("hooks", AGENT, ext=".sock")
+PID_FILE = hook_config.state_path("hooks", AGENT, ext=".pid")
+IDLE_SECONDS = float(_cfg.get("hook_server_idle_minutes", 120)) * 60
+# Seconds to wait for a reply. PreCompact on a large first transcript can take
+# a while; a prompt should never wait long on the heartbeat.
+CLIENT_TIMEOUTS = {"heartbeat": 2.0, "session_start": 20.0, "pre_compact_handover": 60.0}
+
+
+# === In-process dispatch ===
+
+def run_event(module_name: str, payload: bytes, cwd: str) -> str:
+    """Run one hook in this process; returns its stdout text."""
+    import importlib
+    import json
+
+    try:
+        event = json.loads(payload) if payload.strip() else {}
+    except ValueError:
+        event = {}
+    if not isinstance(event, dict):
+        event = {}
+    event.setdefault("cwd", cwd)
+    module = importlib.import_module(module_name)
+    return module.run(event) or ""
+
+
+# === Client ===
+
+def ask_server(event_name: str, payload: bytes):
+    """Forward an event to a running server: (ok, output or error), or None if no server took it."""
+    if not hook_config.owned(SOCKET_PATH):
+        return None
+    # _socket is the C module underneath socket.py; importing socket.py
+    # (enum, selectors, ...) would cost more than the round trip itself
+    try:
+        import _socket
+        sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    except (ImportError, AttributeError, OSError):
+        return None
+    chunks = []
+    sent = False
+    try:
+        sock.settimeout(CLIENT_TIMEOUTS.get(EVENTS.get(event_name), 60.0))
+        sock.connect(SOCKET_PATH)
+        sock.sendall(f"{event_name}\n{os.getcwd()}\n".encode("utf-8") + payload)
+        sent = True
+        sock.shutdown(_socket.SHUT_WR)
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except OSError as e:
+        # Not sent: no server, run it here. Sent: the server may be running it now
+        return (False, f"no reply from the hook server ({e})") if sent else None
+    finally:
+        sock.close()
+    reply = b"".join(chunks).decode("utf-8", errors="replace")
+    # First byte: "0" ok, "1" the hook raised in the server (the rest is the error)
+    if reply[:1] not in ("0", "1"):
+        return False, "no reply from the hook server"
+    return reply[:1] == "0", reply[1:]
+
+
+def spawn_server():
+    import subprocess
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "start"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            close_fds=True,
+        )
+    except OSError:
+        pass
+
+
+def dispatch(event_name: str) -> int:
+    module_name = EVENTS.get(event_name)
+    if module_name is None:
+        print(f"unknown event {event_name!r}; expected one of: session-start, pre-compact, heartbeat",
+              file=sys.stderr)
+        return 2
+    try:
+        payload = sys.stdin.buffer.read()
+    except (OSError, ValueError):
+        payload = b""
+
+    reply = ask_server(event_name, payload)
+    if reply is None:
+        if USE_SERVER:
+            spawn_server()  # warm from the next event
+        output = run_event(module_name, payload, os.getcwd())
+    else:
+        ok, output = reply
+        if not ok:
+            print(f"memory hooks: {event_name}: {output}", file=sys.stderr)
+            return 1
+    if output:
+        print(output)
+    return 0
+
+
+# === Server ===
+
+class HookServer:
+    """Runs hook events for clients; modules stay imported between events."""
+
+    def __init__(self):
+        import threading
+
+        self._locks = {name: threading.Lock() for name in set(EVENTS.values())}
+        self._reload_lock = threading.Lock()
+        self._stamp = self._config_stamp()
+
+    @staticmethod
+    def _config_stamp():
+        try:
+            st = os.stat(hook_config.CONFIG_PATH)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _maybe_reload(self):
+        """Re-import everything if agent_config.json changed (module constants come from it).
+
+        Only between events: while any hook is running the reload is put off
+        to the next event, rather than holding this one up behind it.
+        """
+        stamp = self._config_stamp()
+        if stamp == self._stamp:
+            return
+        import importlib
+
+        with self._reload_lock:
+            held = []
+            for name, lock in self._locks.items():
+                if not lock.acquire(blocking=False):
+                    for other in held:
+                        other.release()
+                    return
+                held.append(lock)
+            try:
+                for name in ("hook_config", "telemetry", "shared_io", "journal", "daily_log", "archive", "inbox",
+                             "metrics", "log_rollup", "handover_store", "recall", "heartbeat", "session_start",
+                             "pre_compact_handover"):
+                    if name in sys.modules:
+                        importlib.reload(sys.modules[name])
+                self._stamp = stamp
+            finally:
+                for lock in held:
+                    lock.release()
+
+    def handle(self, conn):
+        try:
+            with conn:
+                conn.settimeout(10.0)
+                chunks = []
+                while True:
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                data = b"".join(chunks)
+                event_name, cwd, payload = data.split(b"\n", 2)
+                module_name = EVENTS[event_name.decode("utf-8")]
+
+                self._maybe_reload()
+                with self._locks[module_name]:
+                    try:
+                        reply = b"0" + run_event(module_name, payload, cwd.decode("utf-8")).encode("utf-8")
+                    except Exception as e:
+                        reply = f"1{module_name} failed in the hook server: {type(e).__name__}: {e}".encode("utf-8")
+                conn.settimeout(CLIENT_TIMEOUTS[module_name])
+                conn.sendall(reply)
+        except (OSError, ValueError, KeyError):
+            pass
+
+
+def serve():
+    import signal
+    import socket
+    import threading
+    import time
+
+    import shared_io
+
+    pid_fd = shared_io.claim_pid_file(PID_FILE)
+    if pid_fd is None:
+        return
+
+    # Warm everything up front
+    for module_name in set(EVENTS.values()):
+        __import__(module_name)
+    # The server's own start-up is no event's cost
+    __import__("telemetry").claim_startup()
+    server = HookServer()
+
+    try:
+        os.unlink(SOCKET_PATH)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        os.close(pid_fd)  # someone else's file at our path: clients will not trust it either
+        return
+    old_umask = os.umask(0o077)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(SOCKET_PATH)
+    os.umask(old_umask)
+    sock.listen(32)
+    sock.settimeout(5.0)
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    last_client = time.monotonic()
+    try:
+        while time.monotonic() - last_client < IDLE_SECONDS:
+            try:
+                conn, _ = sock.accept()
+            except socket.timeout:
+                continue
+            last_client = time.monotonic()
+            # One thread per event so a slow PreCompact never holds up a heartbeat
+            threading.Thread(target=server.handle, args=(conn,), daemon=True).start()
+    finally:
+        sock.close()
+        os.close(pid_fd)
+        for path in (SOCKET_PATH, PID_FILE):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def running_pid():
+    import shared_io
+
+    return shared_io.read_pid(PID_FILE)
+
+
+def start():
+    """Detach (double fork) and serve; no-op if a server is already running."""
+    if running_pid() or not hasattr(os, "fork"):
+        return
+    if os.fork():
+        return
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    try:
+        serve()
+    finally:
+        os._exit(0)
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 2
+    cmd = argv[0]
+    if cmd == "serve":
+        serve()
+    elif cmd == "start":
+        start()
+    elif cmd == "stop":
+        pid = running_pid()
+        if pid:
+            import signal
+            os.kill(pid, signal.SIGTERM)
+    elif cmd == "status":
+        pid = running_pid()
+        print(f"running (pid {pid}, socket {SOCKET_PATH})" if pid else "not running")
+        return 0 if pid else 1
+    else:
+        return dispatch(cmd)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        pass
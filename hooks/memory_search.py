@@ -0,0 +1,383 @@
+"""
+Memory search — full-text index over the shared folder's history.
+
+Indexes every agent's daily logs ({AGENT}/logs/*.md and the monthly
+bundles archive.py moves closed days into), handovers/ and messages/ into
+a local SQLite FTS5 database, so older context can be recalled in
+milliseconds instead of by reading raw markdown:
+
+- daily logs: one document per `### ` work entry (byte ranges come from
+  daily_log's index), plus one per Summary / Handoff / Blockers section
+- handovers:  one document per handover file (per-agent stores decompressed)
+- messages:   one document per `## From ...` message
+
+The index is incremental: each file's mtime and size are recorded, and a
+refresh re-indexes only files that changed (and drops ones that are
+gone). Queries refresh first, which costs one stat per file.
+
+The database lives in TEMP (it is a cache — delete it and it is rebuilt);
+set "search_index_path" in agent_config.json to keep it elsewhere.
+
+    python3 memory_search.py "flaky upload test"              # top 10
+    python3 memory_search.py "deploy" --agent Bob --kind work -k 5
+    python3 memory_search.py "rollback" --since 2026-01-01 --json
+    python3 memory_search.py --reindex                         # rebuild from scratch
+
+Hooks and skills can call search(query, k=...) directly.
+
+Part of Claude Code Memory.
+"""
+import os
+import re
+import sqlite3
+import sys
+import time
+import zipfile
+
+import archive
+import daily_log
+import handover_store
+import hook_config
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+DB_PATH = _cfg.get("search_index_path") or os.path.join(
+    hook_config.STATE_DIR, f"claude_memory_search_{AGENT}.sqlite")
+
+SCHEMA_VERSION = 1
+SECTION_KINDS = ("summary", "handoff", "blockers")  # non-entry log sections worth indexing
+SKIP_LOGS = {"TEMPLATE.md"}
+_DAY_RE = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+_AGENT_RE = re.compile(r"^\*\*Agent:\*\*\s*(.+)$", re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    source TEXT,          -- log / handover / message
+    kind TEXT,            -- work / summary / handoff / blockers / handover / message
+    agent TEXT,
+    day TEXT,             -- YYYY-MM-DD
+    title TEXT,
+    body TEXT,
+    start INTEGER,        -- byte range in path
+    end INTEGER
+);
+CREATE INDEX IF NOT EXISTS docs_path ON docs(path);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    title, body, content='docs', content_rowid='id', tokenize='porter unicode61'
+);
+"""
+
+
+class SearchUnavailable(RuntimeError):
+    """This Python's sqlite3 was built without FTS5."""
+
+
+def connect(path=None):
+    """Open (and if needed create) the index database."""
+    path = path or DB_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path, timeout=10)
+    db.row_factory = sqlite3.Row
+    try:
+        db.executescript(SCHEMA)
+    except sqlite3.OperationalError as e:
+        db.close()
+        raise SearchUnavailable(f"SQLite FTS5 is not available: {e}")
+    row = db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    if row is None or row[0] != str(SCHEMA_VERSION):
+        _clear(db)
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        db.commit()
+    return db
+
+
+def _clear(db):
+    db.execute("DELETE FROM files")
+    db.execute("DELETE FROM docs")
+    db.execute("INSERT INTO docs_fts(docs_fts) VALUES ('delete-all')")
+
+
+# === Splitting files into documents ===
+
+def _day_of(name: str) -> str:
+    m = _DAY_RE.search(name)
+    return f"{m.group(1)}-{m.group(2)}-{m.group(3)}" if m else ""
+
+
+def log_docs(path: str, agent: str):
+    """Documents for one daily log: each work entry, plus the summary-type sections."""
+    index = daily_log.load_index(path, save=False)
+    with open(path, "rb") as f:
+        data = f.read(index["size"])
+    return _log_docs(data, index, agent, _day_of(os.path.basename(path)))
+
+
+def archived_log_docs(path: str, agent: str):
+    """Documents for every day in a monthly archive bundle (see archive.py); ranges are within each day."""
+    month = os.path.basename(path)[:-len(".zip")]
+    days = archive.load_index(agent, month)["days"]
+    with zipfile.ZipFile(path) as z:
+        for name in sorted(z.namelist()):
+            data = z.read(name)
+            day = _day_of(name)
+            index = days.get(day) or daily_log.index_of(data)
+            yield from _log_docs(data, index, agent, day)
+
+
+def _log_docs(data: bytes, index: dict, agent: str, day: str):
+    for start, end, _ in index["entries"]:
+        text = data[start:end].decode("utf-8", errors="replace").strip()
+        title, _, body = text.partition("\n")
+        yield ("log", "work", agent, day, title.lstrip("#").strip(), body.strip(), start, end)
+
+    for s in index["sections"]:
+        if s["kind"] in SECTION_KINDS:
+            body = data[s["body"]:s["end"]].decode("utf-8", errors="replace").strip()
+            if body and not body.startswith("<!--"):
+                yield ("log", s["kind"], agent, day, s["name"], body, s["head"], s["end"])
+
+
+def _split_headings(data: bytes, prefix: bytes):
+    """(start, end) byte ranges of blocks that begin with a `prefix` heading line."""
+    starts = [0] if data.startswith(prefix) else []
+    pos = data.find(b"\n" + prefix)
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = data.find(b"\n" + prefix, pos + 1)
+    return [(s, starts[i + 1] if i + 1 < len(starts) else len(data)) for i, s in enumerate(starts)]
+
+
+def message_docs(path: str, recipient=None):
+    """One document per `## ` message in an inbox file (a monthly shard or an old single-file inbox)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return _message_docs(data, recipient or os.path.splitext(os.path.basename(path))[0])
+
+
+def archived_message_docs(path: str, recipient: str):
+    """Messages in a yearly bundle of archived inbox shards."""
+    with zipfile.ZipFile(path) as z:
+        for name in sorted(z.namelist()):
+            yield from _message_docs(z.read(name), recipient)
+
+
+def _message_docs(data: bytes, recipient: str):
+    for start, end in _split_headings(data, b"## "):
+        text = data[start:end].decode("utf-8", errors="replace").strip()
+        title, _, body = text.partition("\n")
+        title = title[3:].strip()
+        yield ("message", "message", recipient, _day_of(title), title, body.strip(), start, end)
+
+
+def handover_docs(path: str):
+    """One document per handover file (compressed ones from handover_store included)."""
+    text = handover_store.read_file(path)
+    data = text.encode("utf-8")
+    title, _, body = text.strip().partition("\n")
+    m = _AGENT_RE.search(text)
+    agent = m.group(1).strip() if m else ""
+    yield ("handover", "handover", agent, _day_of(os.path.basename(path)),
+           title.lstrip("#").strip(), body.strip(), 0, len(data))
+
+
+def source_files(shared=None):
+    """(path, splitter) for every file the index covers."""
+    shared = shared or SHARED
+    try:
+        names = sorted(os.listdir(shared))
+    except OSError:
+        return
+    for name in names:
+        logs = os.path.join(shared, name, "logs")
+        if name in ("handovers", "messages") or not os.path.isdir(logs):
+            continue
+        for entry in sorted(os.scandir(logs), key=lambda e: e.name):
+            if entry.name.endswith(".md") and entry.name not in SKIP_LOGS and entry.is_file():
+                yield entry.path, (lambda p, agent=name: log_docs(p, agent))
+        # Closed months bundled by archive.py: one file per month, however many days
+        for month in archive.archived_months(name):
+            yield archive.bundle_path(name, month), (lambda p, agent=name: archived_log_docs(p, agent))
+
+    handovers = os.path.join(shared, "handovers")
+    if os.path.isdir(handovers):
+        for entry in os.scandir(handovers):
+            # LATEST_HANDOVER.md duplicates the newest timestamped handover
+            if entry.name.startswith("handover_") and entry.name.endswith(".md"):
+                yield entry.path, handover_docs
+            elif entry.is_dir():
+                # handovers/{agent}/ stores (see handover_store.py)
+                for stored in os.scandir(entry.path):
+                    if stored.name[:8].isdigit() and stored.name.endswith(tuple(handover_store.EXTENSIONS.values())):
+                        yield stored.path, handover_docs
+
+    messages = os.path.join(shared, "messages")
+    if os.path.isdir(messages):
+        for entry in os.scandir(messages):
+            if entry.name.endswith(".md") and entry.is_file():
+                yield entry.path, message_docs
+            elif entry.is_dir():
+                # messages/{agent}/YYYY-MM.md shards (see inbox.py)
+                for shard in os.scandir(entry.path):
+                    if shard.name.endswith(".md") and shard.is_file():
+                        yield shard.path, (lambda p, agent=entry.name: message_docs(p, agent))
+                    elif shard.name == "archive" and shard.is_dir():
+                        for bundle in os.scandir(shard.path):
+                            if bundle.name.endswith(".zip"):
+                                yield bundle.path, (lambda p, agent=entry.name: archived_message_docs(p, agent))
+
+
+# === Indexing ===
+
+def _drop(db, path: str):
+    db.execute("INSERT INTO docs_fts(docs_fts, rowid, title, body) "
+               "SELECT 'delete', id, title, body FROM docs WHERE path = ?", (path,))
+    db.execute("DELETE FROM docs WHERE path = ?", (path,))
+    db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+
+def refresh(db, shared=None) -> dict:
+    """Bring the index up to date; only files whose mtime/size changed are re-read."""
+    stats = {"files": 0, "indexed": 0, "removed": 0, "docs": 0}
+    known = {row[0]: (row[1], row[2]) for row in db.execute("SELECT path, mtime_ns, size FROM files")}
+    seen = set()
+
+    with db:
+        for path, split in source_files(shared):
+            stats["files"] += 1
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            if known.get(path) == stamp:
+                continue
+            if path in known:
+                _drop(db, path)
+            try:
+                docs = list(split(path))
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                continue  # unreadable right now; retried on the next refresh
+            for doc in docs:
+                cur = db.execute(
+                    "INSERT INTO docs (path, source, kind, agent, day, title, body, start, end) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (path,) + doc)
+                db.execute("INSERT INTO docs_fts(rowid, title, body) VALUES (?, ?, ?)",
+                           (cur.lastrowid, doc[4], doc[5]))
+            db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (path,) + stamp)
+            stats["indexed"] += 1
+            stats["docs"] += len(docs)
+
+        for path in set(known) - seen:
+            _drop(db, path)
+            stats["removed"] += 1
+    return stats
+
+
+def rebuild(db, shared=None) -> dict:
+    with db:
+        _clear(db)
+    return refresh(db, shared)
+
+
+# === Querying ===
+
+def fts_query(text: str) -> str:
+    """Free text -> FTS5 query: every word must match (quoted, so punctuation is literal)."""
+    words = re.findall(r"\w[\w'-]*", text)
+    return " ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def search(query: str, k=10, agent=None, kind=None, since=None, db=None, refresh_first=True, raw=False):
+    """Top-k documents for query, best first, as dicts (with a highlighted snippet)."""
+    own = db is None
+    if own:
+        db = connect()
+    try:
+        if refresh_first:
+            refresh(db)
+        match = query if raw else fts_query(query)
+        if not match:
+            return []
+        sql = ["SELECT d.path, d.source, d.kind, d.agent, d.day, d.title, d.start, d.end,",
+               "snippet(docs_fts, 1, '[', ']', ' … ', 16) AS snippet, bm25(docs_fts, 4.0, 1.0) AS score",
+               "FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid",
+               "WHERE docs_fts MATCH ?"]
+        args = [match]
+        if agent:
+            sql.append("AND d.agent = ? COLLATE NOCASE")
+            args.append(agent)
+        if kind:
+            sql.append("AND d.kind = ?")
+            args.append(kind)
+        if since:
+            sql.append("AND d.day >= ?")
+            args.append(since)
+        sql.append("ORDER BY score LIMIT ?")
+        args.append(int(k))
+        return [dict(row) for row in db.execute(" ".join(sql), args)]
+    finally:
+        if own:
+            db.close()
+
+
+def main(argv):
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Search all agents' logs, handovers and messages.")
+    ap.add_argument("query", nargs="?", help="words to search for (all must match)")
+    ap.add_argument("-k", type=int, default=10, help="number of results (default 10)")
+    ap.add_argument("--agent", help="only this agent's documents")
+    ap.add_argument("--kind", help="work, summary, handoff, blockers, handover or message")
+    ap.add_argument("--since", help="only documents dated on or after YYYY-MM-DD")
+    ap.add_argument("--raw", action="store_true", help="pass the query to FTS5 as-is (AND/OR/NEAR, prefix*)")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    ap.add_argument("--reindex", action="store_true", help="drop and rebuild the index")
+    args = ap.parse_args(argv)
+
+    try:
+        db = connect()
+    except SearchUnavailable as e:
+        print(e, file=sys.stderr)
+        return 1
+    with db:
+        t0 = time.perf_counter()
+        stats = rebuild(db) if args.reindex else refresh(db)
+        t_refresh = time.perf_counter() - t0
+        if not args.query:
+            print(f"{stats['files']} files, {stats['indexed']} (re)indexed ({stats['docs']} documents), "
+                  f"{stats['removed']} removed in {t_refresh * 1000:.0f} ms — {DB_PATH}")
+            return 0
+
+        t0 = time.perf_counter()
+        try:
+            hits = search(args.query, args.k, args.agent, args.kind, args.since,
+                          db=db, refresh_first=False, raw=args.raw)
+        except sqlite3.OperationalError as e:
+            print(f"bad query: {e}", file=sys.stderr)
+            return 2
+        t_query = time.perf_counter() - t0
+
+    if args.json:
+        print(json.dumps(hits, indent=2, ensure_ascii=False))
+        return 0
+    for hit in hits:
+        try:
+            where = os.path.relpath(hit["path"], SHARED)
+        except ValueError:  # on another drive (Windows)
+            where = hit["path"]
+        print(f"{hit['day'] or '----------'}  {hit['agent'] or '?':<10} {hit['kind']:<9} {hit['title']}")
+        print(f"    {' '.join(hit['snippet'].split())}")
+        print(f"    {where} [{hit['start']}:{hit['end']}]")
+    print(f"{len(hits)} result(s) in {t_query * 1000:.1f} ms (refresh {t_refresh * 1000:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
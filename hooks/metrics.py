@@ -0,0 +1,175 @@
+"""
+Hook metrics — one compact JSONL record per hook event, plus a query tool.
+
+Every hook event appends a line to {AGENT}/metrics/YYYY-MM.jsonl with one
+locked O_APPEND write:
+
+    {"ts": 1760000000.0, "ev": "session_start", "project": "api", "source": "startup"}
+    {"ts": ..., "ev": "prompt", "project": "api"}
+    {"ts": ..., "ev": "pre_compact", "project": "api", "session": "1a2b3c4d5e6f",
+     "tool_calls": 42, "turns": 30, "tok_in": 1200, "tok_out": 5300, "cache_read": 410000, "cache_write": 9000}
+
+pre_compact counts are real, from the transcript's `usage` fields, and
+cover the work since the previous compaction of that session. Monthly files
+keep a months-long query to the months asked for, and aggregates never
+open the markdown logs.
+
+    python3 metrics.py                          # per day, this agent, last 30 days
+    python3 metrics.py --by project --since 2026-01-01
+    python3 metrics.py --by agent --all-agents --json
+    python3 metrics.py --by tool                # which tools fill the context
+
+Set "metrics": false in agent_config.json to stop recording.
+
+Part of Claude Code Memory.
+"""
+import json
+import os
+import sys
+import time
+
+import hook_config
+import shared_io
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+ENABLED = bool(_cfg.get("metrics", True))
+
+COUNTERS = ("tool_calls", "turns", "tok_in", "tok_out", "cache_read", "cache_write")
+EVENTS = {"session_start": "sessions", "prompt": "prompts", "pre_compact": "compactions"}
+
+
+def metrics_dir(agent=None) -> str:
+    return os.path.join(SHARED, agent or AGENT, "metrics")
+
+
+def metrics_path(agent=None, ts=None) -> str:
+    return os.path.join(metrics_dir(agent), time.strftime("%Y-%m", time.localtime(ts)) + ".jsonl")
+
+
+def record(event: str, **fields):
+    """Append one event record for this agent; never raises (metrics must not break a hook)."""
+    if not ENABLED:
+        return
+    rec = {"ts": round(time.time(), 3), "ev": event}
+    rec.update(fields)
+    line = json.dumps(rec, separators=(",", ":"), ensure_ascii=False) + "\n"
+    try:
+        shared_io.append_bytes(metrics_path(ts=rec["ts"]), line.encode("utf-8"), fsync=False)
+    except OSError:
+        pass
+
+
+# === Queries ===
+
+def iter_records(agents, since="", until=""):
+    """Records of the given agents with since <= day <= until (YYYY-MM-DD, inclusive), each tagged with agent and day."""
+    for agent in agents:
+        try:
+            names = sorted(os.listdir(metrics_dir(agent)))
+        except OSError:
+            continue
+        for name in names:
+            month = name[:7]
+            if not name.endswith(".jsonl") or (since and month < since[:7]) or (until and month > until[:7]):
+                continue
+            with open(os.path.join(metrics_dir(agent), name), "rb") as f:
+                for raw in f:
+                    try:
+                        rec = json.loads(raw)
+                    except ValueError:
+                        continue  # torn last line from a crashed writer
+                    if not isinstance(rec, dict):
+                        continue
+                    day = time.strftime("%Y-%m-%d", time.localtime(rec.get("ts", 0)))
+                    if (since and day < since) or (until and day > until):
+                        continue
+                    rec["agent"] = agent
+                    rec["day"] = day
+                    yield rec
+
+
+def aggregate(records, by="day") -> dict:
+    """{group: totals} where group is the record's day, month, project, agent or tool name.
+
+    A group's "days" is the set of days it has records on, so that a total
+    over groups counts each day once.
+    """
+    groups = {}
+    for rec in records:
+        if by == "tool":
+            # Calls per tool name, from pre_compact records
+            for name, calls in (rec.get("tools") or {}).items():
+                g = groups.setdefault(name, dict.fromkeys(("sessions", "prompts", "compactions") + COUNTERS, 0))
+                g.setdefault("days", set()).add(rec["day"])
+                g["compactions"] += 1
+                g["tool_calls"] += calls
+            continue
+        if by == "month":
+            key = rec["day"][:7]
+        else:
+            key = rec.get(by) or "(none)"
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = dict.fromkeys(("sessions", "prompts", "compactions") + COUNTERS, 0)
+            g["days"] = set()
+        counter = EVENTS.get(rec.get("ev"))
+        if counter:
+            g[counter] += 1
+        for name in COUNTERS:
+            value = rec.get(name)
+            if isinstance(value, (int, float)):
+                g[name] += value
+        g["days"].add(rec["day"])
+    return groups
+
+
+def _fmt(n):
+    return f"{n / 1e6:.1f}M" if n >= 1e6 else f"{n / 1e3:.1f}k" if n >= 1e4 else str(int(n))
+
+
+def _count(value):
+    return len(value) if isinstance(value, set) else value
+
+
+def render(groups: dict, by: str) -> str:
+    cols = ("days", "sessions", "prompts", "compactions", "tool_calls", "turns", "tok_in", "tok_out", "cache_read", "cache_write")
+    lines = [f"{by:<16}" + "".join(f"{c:>12}" for c in cols)]
+    for key in sorted(groups):
+        g = groups[key]
+        lines.append(f"{str(key)[:16]:<16}" + "".join(f"{_fmt(_count(g[c])):>12}" for c in cols))
+    if len(groups) > 1:
+        total = {c: sum(g[c] for g in groups.values()) for c in cols if c != "days"}
+        total["days"] = len(set().union(*(g["days"] for g in groups.values())))
+        lines.append(f"{'total':<16}" + "".join(f"{_fmt(total[c]):>12}" for c in cols))
+    return "\n".join(lines)
+
+
+def main(argv):
+    import argparse
+    from datetime import date, timedelta
+
+    ap = argparse.ArgumentParser(description="Aggregate hook metrics (sessions, prompts, compactions, tokens).")
+    ap.add_argument("--by", choices=("day", "month", "project", "agent", "tool"), default="day")
+    ap.add_argument("--since", default=(date.today() - timedelta(days=30)).isoformat(),
+                    help="first day, YYYY-MM-DD (default: 30 days ago)")
+    ap.add_argument("--until", default="", help="last day, YYYY-MM-DD (default: today)")
+    ap.add_argument("--agent", action="append", help="agent(s) to include (default: this agent)")
+    ap.add_argument("--all-agents", action="store_true", help="every agent in all_agents")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    agents = _cfg.get("all_agents", [AGENT]) if args.all_agents else (args.agent or [AGENT])
+    groups = aggregate(iter_records(agents, args.since, args.until), args.by)
+    if args.json:
+        print(json.dumps({key: dict(g, days=len(g["days"])) for key, g in groups.items()}, indent=2, sort_keys=True))
+    elif groups:
+        print(render(groups, args.by))
+    else:
+        print(f"no metrics since {args.since} for {', '.join(agents)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
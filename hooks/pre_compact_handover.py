@@ -9,113 +9,611 @@ The daily log is the SOURCE OF TRUTH. The handover is a BACKUP.
 This hook is the safety net — even if the agent forgot to log,
 this catches it before compaction erases context.
 
+The transcript is read as a stream (lines -> events -> folds into a
+bounded summary), only from where the previous compaction stopped, so
+memory stays flat on 100 MB transcripts. Besides token and tool counts the
+summary tracks edit counts per file, commands that failed (and whether a
+retry passed), open TODOs (the agent's TodoWrite list plus "TODO:" / "I
+still need to ..." lines), and topic shifts from keyword frequencies.
+The handover leads with those, most actionable first.
+
 Part of Claude Code Memory.
 
 Config: reads agent name + shared path from agent_config.json
 in the same directory as this script.
 """
+import hashlib
 import json
 import os
+import re
 import sys
 from datetime import datetime, date
 from pathlib import Path
 
-# === CONFIG (from agent_config.json) ===
-SCRIPT_DIR = Path(__file__).parent
-CONFIG_PATH = SCRIPT_DIR / "agent_config.json"
+import daily_log
+import handover_store
+import hook_config
+import journal
+import log_rollup
+import metrics
+import recall
+import shared_io
+import telemetry
 
-try:
-    with open(CONFIG_PATH) as f:
-        _cfg = json.load(f)
-except (FileNotFoundError, json.JSONDecodeError):
-    _cfg = {}
+# === CONFIG (from agent_config.json) ===
+SCRIPT_DIR = Path(hook_config.SCRIPT_DIR)
+_cfg = hook_config.load()
 
 AGENT = _cfg.get("agent", "Agent")
 SHARED = Path(_cfg.get("shared_path", str(SCRIPT_DIR)))
 
 LOGS_DIR = SHARED / AGENT / "logs"
-HANDOVER_DIR = SHARED / "handovers"
-HANDOVER_DIR.mkdir(exist_ok=True)
-
-
-def extract_work_from_transcript(transcript_path: str) -> dict:
-    """Extract recent work items from transcript JSONL."""
-    result = {
-        "files_touched": set(),
+LOG_FSYNC = bool(_cfg.get("log_fsync", True))  # fsync each daily log append
+
+# How much of each rolling list survives in the saved summary
+ROLLING_LIMITS = {
+    "files_touched": 200,
+    "actions": 20,
+    "last_messages": 5,
+    "bash_commands": 10,
+    "stated_todos": 10,
+}
+MAX_EDITED_FILES = 200  # edit counts kept for the most recently edited files
+MAX_COMMANDS = 50       # outcomes kept for the most recently run commands
+MAX_TODOS = 30
+
+
+# Transcript usage fields -> metrics record names. One API response can be
+# split over several records that repeat the same usage, so it is counted
+# once per message id.
+USAGE_FIELDS = {
+    "input_tokens": "tok_in",
+    "output_tokens": "tok_out",
+    "cache_read_input_tokens": "cache_read",
+    "cache_creation_input_tokens": "cache_write",
+}
+
+
+def _empty_work() -> dict:
+    return {
+        "files_touched": [],
         "actions": [],
         "last_messages": [],
         "tool_calls": 0,
         "bash_commands": [],
+        "usage": dict.fromkeys(USAGE_FIELDS.values(), 0),
+        "last_message_id": "",
+        "turns": 0,
+        "peak_context": 0,   # largest single-turn context since the last capture
+        "tools": {},         # name -> [calls, errors, timed calls, latency ms sum, latency ms max]
+        "pending_tools": {},  # tool_use id -> [name, epoch seconds, command], until its tool_result arrives
+        "edits": {},          # file path -> [edits, seq of the last one]
+        "commands": {},       # Bash command -> [runs, failures, last run failed, seq of the last run]
+        "todos": [],          # the latest TodoWrite list: [status, content]
+        "stated_todos": [],   # "TODO: ...", "- [ ] ...", "I still need to ..." from assistant text
+        "topics": {"start": 0, "segment": {}, "spans": []},  # see _close_segment
     }
 
+
+MAX_PENDING_TOOLS = 200  # results that never arrive (interrupted turns) age out
+
+
+def _totals(work: dict) -> dict:
+    totals = dict(work["usage"])
+    totals["tool_calls"] = work["tool_calls"]
+    totals["turns"] = work["turns"]
+    return totals
+
+
+def _since(before: dict, before_tools: dict, work: dict) -> dict:
+    """Counts for what this capture covers: totals and per-tool stats minus the earlier snapshot."""
+    delta = {k: v - before.get(k, 0) for k, v in _totals(work).items()}
+    tools = {}
+    for name, stats in work["tools"].items():
+        old = before_tools.get(name, [0, 0, 0, 0, 0])
+        diff = [stats[i] - old[i] for i in range(4)] + [stats[4]]
+        if diff[0] > 0:
+            tools[name] = diff
+    delta["tools"] = tools
+    delta["peak_context"] = work["peak_context"]
+    return delta
+
+
+def _epoch(timestamp):
+    """Transcript ISO timestamp ("2026-01-01T12:00:00.123Z") -> epoch seconds, or None."""
+    if not isinstance(timestamp, str) or not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _cursor_path(transcript_path: str) -> str:
+    """Local state file for one transcript (one per agent and session)."""
+    key = hashlib.sha1(os.path.abspath(transcript_path).encode("utf-8")).hexdigest()[:16]
+    return hook_config.state_path("precompact", AGENT, key, ".json")
+
+
+def load_cursor(transcript_path: str) -> dict:
+    try:
+        with open(_cursor_path(transcript_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_cursor(transcript_path: str, cursor: dict):
+    shared_io.atomic_write(_cursor_path(transcript_path), json.dumps(cursor).encode("utf-8"))
+
+
+# Raw-byte markers checked before json.loads. Most transcript bytes are user
+# tool_result records (file contents, command output) that can never change the
+# summary, so they are classified from their bytes and skipped undecoded.
+# Quotes inside JSON string values are escaped, so these only match real keys.
+PREFILTER = True
+SNIFF_WINDOW = 2048  # bytes at each end of a long line checked for the record type
+_ASSISTANT_MARKERS = (b'"type":"assistant"', b'"type": "assistant"')
+_OTHER_MARKERS = (b'"type":"user"', b'"type":"system"', b'"type": "user"', b'"type": "system"')
+_CONTENT_MARKERS = (b'"tool_use"', b'"text"')
+
+
+def _find_any(raw: bytes, markers, start=0, end=None) -> bool:
+    if end is None:
+        end = len(raw)
+    for m in markers:
+        if raw.find(m, start, end) != -1:
+            return True
+    return False
+
+
+def _wants_decode(raw_line: bytes) -> bool:
+    """Cheap bytes sniff: could this line be an assistant record with text or tool_use parts?
+
+    The top-level "type" key sits near one end of a record (before "message"
+    for user records, after it for assistant ones), so long lines are
+    classified from a bounded window at each end and only scanned in full
+    when neither window settles it.
+    """
+    if not PREFILTER:
+        return True
+    n = len(raw_line)
+    if n > 2 * SNIFF_WINDOW:
+        tail = n - SNIFF_WINDOW
+        if _find_any(raw_line, _OTHER_MARKERS, 0, SNIFF_WINDOW):
+            return False
+        if not (_find_any(raw_line, _ASSISTANT_MARKERS, tail)
+                or _find_any(raw_line, _ASSISTANT_MARKERS, 0, SNIFF_WINDOW)):
+            if _find_any(raw_line, _OTHER_MARKERS, tail):
+                return False
+            if not _find_any(raw_line, _ASSISTANT_MARKERS):
+                return False
+    elif not _find_any(raw_line, _ASSISTANT_MARKERS):
+        return False
+    return _find_any(raw_line, _CONTENT_MARKERS)
+
+
+def _iter_complete_lines(f):
+    """Yield (end_offset, raw_line) for each newline-terminated line from the current position.
+
+    A trailing line without a newline is still being written — stop before it
+    so the next run picks it up whole.
+    """
+    pos = f.tell()
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            break
+        pos += len(raw)
+        yield pos, raw
+
+
+def _json_string_after(raw: bytes, key: bytes, start=0, end=None):
+    """(value, end) of the string following key (b'"name":') within raw[start:end]; (None, -1) if absent."""
+    i = raw.find(key, start, len(raw) if end is None else end)
+    if i == -1:
+        return None, -1
+    j = raw.find(b'"', i + len(key))
+    k = raw.find(b'"', j + 1) if j != -1 else -1
+    if k == -1:
+        return None, -1
+    return raw[j + 1:k].decode("utf-8", errors="replace"), k
+
+
+def _tool_results(raw_line: bytes):
+    """Yield ("result", tool_use_id, end epoch, is_error) for an undecoded user record.
+
+    Byte searches only when the record answers a single tool_use: its id,
+    is_error and the record timestamp are unescaped keys (quotes inside
+    string values are escaped), so they can be found without json.loads.
+    A record holding several tool_results is decoded instead, so each
+    result keeps its own is_error.
+    """
+    first = raw_line.find(b'"tool_use_id":')
+    if first == -1:
+        return
+    # Searched from the end: in a single-result record both keys are found
+    # at once (the id near the start, is_error after the content)
+    if raw_line.rfind(b'"tool_use_id":') != first:
+        try:
+            entry = json.loads(raw_line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return
+        if isinstance(entry, dict):
+            yield from _entry_events(entry)
+        return
+
+    # The timestamp follows the (large) result content: look near the end first
+    tail = max(0, len(raw_line) - SNIFF_WINDOW)
+    stamp, _ = _json_string_after(raw_line, b'"timestamp":', tail)
+    if stamp is None and tail:
+        stamp, _ = _json_string_after(raw_line, b'"timestamp":')  # rare: timestamp mid-record
+    i = raw_line.rfind(b'"is_error":', first)
+    is_error = i != -1 and raw_line[i + 11:i + 17].lstrip().startswith(b"true")
+    tool_use_id, _ = _json_string_after(raw_line, b'"tool_use_id":', first)
+    if tool_use_id is not None:
+        yield ("result", tool_use_id, _epoch(stamp), is_error)
+
+
+# === Summarizer pipeline ===
+#
+# Three generator stages over the transcript, so memory stays flat however
+# long it is: complete lines (_iter_complete_lines) -> events (_events) ->
+# folds into the bounded work summary (_fold). Events are small tuples:
+#
+#     ("turn", message id, usage)        one per API response
+#     ("text", text)                     assistant text
+#     ("tool", id, name, input, epoch)   assistant tool_use
+#     ("result", id, epoch, is_error)    user tool_result
+
+def _entry_events(entry: dict):
+    """Events in one decoded transcript record."""
+    if entry.get("type") == "user":
+        # Prefilter off, or a record with several results; otherwise _tool_results reads these from bytes
+        content = entry.get("message", {}).get("content")
+        if isinstance(content, list):
+            end = _epoch(entry.get("timestamp"))
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "tool_result":
+                    yield ("result", part.get("tool_use_id"), end, bool(part.get("is_error")))
+        return
+    if entry.get("type") != "assistant":
+        return
+
+    msg = entry.get("message", {})
+    if isinstance(msg.get("usage"), dict):
+        yield ("turn", msg.get("id", ""), msg["usage"])
+    started = _epoch(entry.get("timestamp"))
+    for part in msg.get("content", []):
+        if not isinstance(part, dict):
+            continue
+        if part.get("type") == "text":
+            yield ("text", part.get("text", ""))
+        elif part.get("type") == "tool_use":
+            tool_input = part.get("input")
+            yield ("tool", part.get("id"), part.get("name", ""),
+                   tool_input if isinstance(tool_input, dict) else {}, started)
+
+
+def _events(lines, work: dict, position: list):
+    """Events from (end offset, raw line) pairs; position[0] tracks the last offset consumed."""
+    for end, raw_line in lines:
+        position[0] = end
+        if not _wants_decode(raw_line):
+            if work["pending_tools"]:
+                yield from _tool_results(raw_line)
+            continue
+        try:
+            entry = json.loads(raw_line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if isinstance(entry, dict):
+            yield from _entry_events(entry)
+
+
+def _fold(work: dict, events):
+    """Fold events into the work summary."""
+    for event in events:
+        kind = event[0]
+        if kind == "result":
+            _finish_tool(work, event[1], event[2], event[3])
+        elif kind == "tool":
+            _note_tool(work, *event[1:])
+        elif kind == "text":
+            _note_text(work, event[1])
+        elif kind == "turn":
+            _note_turn(work, event[1], event[2])
+
+
+def _note_turn(work: dict, message_id, usage: dict):
+    if message_id and message_id == work["last_message_id"]:
+        return  # same response split over several records
+    work["last_message_id"] = message_id
+    work["turns"] += 1
+    context = 0  # everything but output: the prompt size this turn
+    for field, name in USAGE_FIELDS.items():
+        value = usage.get(field)
+        if isinstance(value, int):
+            work["usage"][name] += value
+            if name != "tok_out":
+                context += value
+    work["peak_context"] = max(work["peak_context"], context)
+    if work["turns"] - work["topics"]["start"] >= TOPIC_SEGMENT_TURNS:
+        _close_segment(work["topics"], work["turns"])
+
+
+def _note_text(work: dict, text: str):
+    text = text.strip()
+    if len(text) > 30:
+        work["last_messages"].append(text[:300])
+    _note_stated_todos(work, text)
+    _count_keywords(work["topics"], text[:2000])
+
+
+def _note_tool(work: dict, tool_use_id, tool_name: str, tool_input: dict, started):
+    work["tool_calls"] += 1
+    seq = work["tool_calls"]
+    work["tools"].setdefault(tool_name, [0, 0, 0, 0, 0])[0] += 1
+    command = None
+
+    fp = tool_input.get("file_path") or tool_input.get("notebook_path") or ""
+    if fp and tool_name in ("Write", "Edit", "MultiEdit", "NotebookEdit", "Read"):
+        name = os.path.basename(fp)
+        if name in work["files_touched"]:
+            work["files_touched"].remove(name)
+        work["files_touched"].append(name)
+        if tool_name != "Read":
+            work["actions"].append(f"{tool_name}: {name}")
+            edits = work["edits"].setdefault(fp, [0, 0])
+            edits[0] += 1
+            edits[1] = seq
+        _count_keywords(work["topics"], name)
+
+    elif tool_name == "Bash":
+        cmd = str(tool_input.get("command", ""))
+        work["bash_commands"].append((tool_input.get("description") or cmd)[:100])
+        command = " ".join(cmd.split())[:200]
+        if command:
+            runs = work["commands"].setdefault(command, [0, 0, 0, 0])
+            runs[0] += 1
+            runs[3] = seq
+
+    elif tool_name == "TodoWrite" and isinstance(tool_input.get("todos"), list):
+        # The agent's own task list: the latest call replaces the previous state
+        work["todos"] = [[str(t.get("status", "")), str(t.get("content", ""))[:200]]
+                         for t in tool_input["todos"][:MAX_TODOS] if isinstance(t, dict)]
+
+    if tool_use_id:
+        work["pending_tools"][tool_use_id] = [tool_name, started, command]
+
+
+def _finish_tool(work: dict, tool_use_id, end, is_error=False):
+    """Close a pending tool_use with its tool_result: error count, latency, command outcome."""
+    pending = work["pending_tools"].pop(tool_use_id, None)
+    if pending is None:
+        return
+    name, start = pending[0], pending[1]
+    stats = work["tools"].setdefault(name, [0, 0, 0, 0, 0])
+    if is_error:
+        stats[1] += 1
+    if start is not None and end is not None and end >= start:
+        ms = int((end - start) * 1000)
+        stats[2] += 1
+        stats[3] += ms
+        stats[4] = max(stats[4], ms)
+    command = pending[2] if len(pending) > 2 else None
+    runs = work["commands"].get(command) if command else None
+    if runs is not None:
+        runs[1] += bool(is_error)
+        runs[2] = int(bool(is_error))
+
+
+# Open TODOs the agent stated in its own words, one per matching line
+_STATED_TODO_RE = re.compile(
+    r"^\s*(?:[-*]\s*\[ \]\s*|TODO:?\s+|(?:next|then),?\s+I(?:'ll| will| need to)\s+"
+    r"|I (?:still )?need to\s+|still (?:to do|todo|left|remaining):?\s+|remaining:\s+)(.{8,})",
+    re.IGNORECASE | re.MULTILINE)
+
+
+def _note_stated_todos(work: dict, text: str):
+    for m in _STATED_TODO_RE.finditer(text[:4000]):
+        item = m.group(1).strip().rstrip(".")[:160]
+        stated = work["stated_todos"]
+        if item in stated:
+            stated.remove(item)
+        stated.append(item)
+
+
+# Topic tracking: keyword counts per segment of TOPIC_SEGMENT_TURNS turns. A
+# segment whose top keywords barely overlap the current span's starts a new
+# span (a topic shift); otherwise it extends the span.
+TOPIC_SEGMENT_TURNS = 20
+TOPIC_SHIFT_OVERLAP = 0.2  # Jaccard overlap of top keywords below which a segment is a new topic
+TOPIC_TOP = 8
+MAX_TOPIC_SPANS = 8
+MAX_SEGMENT_WORDS = 400   # distinct words counted per segment before the rare ones are dropped
+_WORD_RE = re.compile(r"[a-z][a-z0-9_]{3,}")
+_STOPWORDS = frozenset("""
+    about above after again also been before being below between both could does doing down during each
+    from further have having here into itself just more most once only other over same should some such
+    than that their theirs them then there these they this those through under until very were what when
+    where which while will with would your yours let's lets i'll i've it's that's there's now good great
+    sure okay need next first check make look looks like want file files code test tests run running
+    using used line lines change changes update updated work working done still back into well
+""".split())
+
+
+def _count_keywords(topics: dict, text: str):
+    counts = topics["segment"]
+    for word in _WORD_RE.findall(text.lower()):
+        if word not in _STOPWORDS:
+            counts[word] = counts.get(word, 0) + 1
+    if len(counts) > MAX_SEGMENT_WORDS:
+        keep = sorted(counts.items(), key=lambda kv: -kv[1])[:MAX_SEGMENT_WORDS // 4]
+        topics["segment"] = dict(keep)
+
+
+def _top_words(counts: dict, n=TOPIC_TOP) -> list:
+    return [w for w, _ in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]]
+
+
+def _close_segment(topics: dict, turn: int):
+    """End the current keyword segment at turn: extend the last span or start a new one."""
+    segment = topics["segment"]
+    start = topics["start"]
+    topics["segment"], topics["start"] = {}, turn
+    if not segment:
+        return
+    spans = topics["spans"]
+    top = set(_top_words(segment))
+    if spans:
+        last = spans[-1]
+        previous = set(_top_words(last[2]))
+        if len(top & previous) / max(1, len(top | previous)) >= TOPIC_SHIFT_OVERLAP:
+            last[1] = turn
+            for word, n in segment.items():
+                last[2][word] = last[2].get(word, 0) + n
+            last[2] = dict(sorted(last[2].items(), key=lambda kv: -kv[1])[:TOPIC_TOP * 4])
+            return
+    spans.append([start, turn, dict(sorted(segment.items(), key=lambda kv: -kv[1])[:TOPIC_TOP * 4])])
+    del spans[:-MAX_TOPIC_SPANS]
+
+
+def topic_spans(work: dict) -> list:
+    """[(first turn, last turn, top keywords)] oldest first, the open segment included."""
+    topics = work["topics"]
+    spans = [(s[0], s[1], _top_words(s[2], 5)) for s in topics["spans"]]
+    if topics["segment"]:
+        words = _top_words(topics["segment"], 5)
+        if spans and set(words) & set(spans[-1][2]):
+            spans[-1] = (spans[-1][0], work["turns"], spans[-1][2])
+        else:
+            spans.append((topics["start"], work["turns"], words))
+    return spans
+
+
+def _trim_work(work: dict):
+    dropped = 0
+    for key, limit in ROLLING_LIMITS.items():
+        dropped += max(0, len(work[key]) - limit)
+        work[key] = work[key][-limit:]
+    pending = work["pending_tools"]
+    if len(pending) > MAX_PENDING_TOOLS:
+        dropped += len(pending) - MAX_PENDING_TOOLS
+        work["pending_tools"] = dict(list(pending.items())[-MAX_PENDING_TOOLS:])
+    # Keyed tables keep their most recently used entries
+    for key, limit in (("edits", MAX_EDITED_FILES), ("commands", MAX_COMMANDS)):
+        table = work[key]
+        if len(table) > limit:
+            dropped += len(table) - limit
+            work[key] = dict(sorted(table.items(), key=lambda kv: kv[1][-1])[-limit:])
+    telemetry.count("work_trimmed", dropped)
+
+
+def extract_work_from_transcript(transcript_path: str) -> dict:
+    """Extract session work from transcript JSONL, parsing only records added since the last run.
+
+    The byte offset reached last time is saved alongside a rolling work
+    summary. If the transcript was replaced (different inode) or truncated,
+    the cursor resets and the file is read from the start. work["parsed_bytes"]
+    is how much of the transcript this call read (0: nothing new).
+    """
     if not transcript_path or not os.path.exists(transcript_path):
-        result["files_touched"] = list(result["files_touched"])
-        return result
+        work = _empty_work()
+        work["since_last"] = _since({}, {}, work)
+        work["parsed_bytes"] = 0
+        return work
+
+    cursor = load_cursor(transcript_path)
+    work = _empty_work()
+    parsed = 0
 
     try:
-        with open(transcript_path, "r", encoding="utf-8") as f:
-            f.seek(0, 2)
-            size = f.tell()
-            read_from = max(0, size - 200_000)
-            f.seek(read_from)
-            tail = f.read()
-
-        for raw_line in tail.split("\n"):
-            raw_line = raw_line.strip()
-            if not raw_line:
-                continue
-            try:
-                entry = json.loads(raw_line)
-            except (json.JSONDecodeError, TypeError):
-                continue
-
-            if entry.get("type") == "assistant":
-                msg = entry.get("message", {})
-                for part in msg.get("content", []):
-                    if not isinstance(part, dict):
-                        continue
-
-                    if part.get("type") == "text":
-                        text = part.get("text", "").strip()
-                        if len(text) > 30:
-                            result["last_messages"].append(text[:300])
-
-                    elif part.get("type") == "tool_use":
-                        tool_name = part.get("name", "")
-                        tool_input = part.get("input", {})
-                        result["tool_calls"] += 1
-
-                        if tool_name in ("Write", "Edit", "Read"):
-                            fp = tool_input.get("file_path", "")
-                            if fp:
-                                result["files_touched"].add(
-                                    os.path.basename(fp)
-                                )
-
-                        elif tool_name == "Bash":
-                            desc = tool_input.get("description", "")
-                            cmd = tool_input.get("command", "")
-                            result["bash_commands"].append(
-                                (desc or cmd)[:100]
-                            )
-
-                        if tool_name in ("Write", "Edit"):
-                            fp = tool_input.get("file_path", "")
-                            if fp:
-                                result["actions"].append(
-                                    f"{tool_name}: {os.path.basename(fp)}"
-                                )
-
-        result["files_touched"] = list(result["files_touched"])
-        result["last_messages"] = result["last_messages"][-5:]
-        result["actions"] = result["actions"][-20:]
-        result["bash_commands"] = result["bash_commands"][-10:]
+        with open(transcript_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            offset = cursor.get("offset", 0)
+            if cursor.get("inode") == st.st_ino and offset <= st.st_size:
+                work.update(cursor.get("work", {}))
+            else:
+                offset = 0
+            before = _totals(work)
+            before_tools = {name: list(stats) for name, stats in work["tools"].items()}
+            work["peak_context"] = 0
+
+            f.seek(offset)
+            position = [offset]
+            _fold(work, _events(_iter_complete_lines(f), work, position))
+            parsed = position[0] - offset
+            telemetry.note("transcript_bytes", st.st_size)
+            telemetry.note("parsed_bytes", parsed)
+            offset = position[0]
+
+        _trim_work(work)
+        save_cursor(transcript_path, {
+            "inode": st.st_ino,
+            "size": st.st_size,
+            "offset": offset,
+            "work": work,
+        })
+        # What this compaction covers: everything since the cursor was last saved
+        work["since_last"] = _since(before, before_tools, work)
 
     except Exception as e:
-        result["files_touched"] = list(result["files_touched"])
-        result["error"] = str(e)
-
-    return result
+        _trim_work(work)
+        work["error"] = str(e)
+
+    work.setdefault("since_last", _since({}, {}, work))
+    work["parsed_bytes"] = parsed  # set after save_cursor: not part of the rolling summary
+    return work
+
+
+def _fmt_ms(ms):
+    return f"{ms / 1000:.1f}s" if ms >= 1000 else f"{ms}ms"
+
+
+def tool_summary(tools: dict, limit=8) -> list:
+    """Per-tool lines, busiest first: "Bash 12 calls (1 error), avg 2.3s, max 9.1s"."""
+    lines = []
+    for name, (calls, errors, timed, total_ms, max_ms) in sorted(tools.items(), key=lambda kv: -kv[1][0])[:limit]:
+        line = f"{name} {calls} call{'s' if calls != 1 else ''}"
+        if errors:
+            line += f" ({errors} error{'s' if errors != 1 else ''})"
+        if timed:
+            line += f", avg {_fmt_ms(total_ms // timed)}, max {_fmt_ms(max_ms)}"
+        lines.append(line)
+    return lines
+
+
+def open_todos(work: dict, limit=12) -> list:
+    """Unfinished TodoWrite items (in progress first), then TODOs stated in text that aren't among them."""
+    rank = {"in_progress": 0, "pending": 1}
+    items = sorted((t for t in work["todos"] if t[0] in rank), key=lambda t: rank[t[0]])
+    lines = [f"{'[in progress] ' if status == 'in_progress' else ''}{content}" for status, content in items]
+    listed = {content.lower() for _, content in work["todos"]}
+    lines += [f"{item} (stated)" for item in reversed(work["stated_todos"]) if item.lower() not in listed]
+    return lines[:limit]
+
+
+def failed_commands(work: dict, limit=8) -> list:
+    """Commands that failed at least once: still failing first, then those that passed on a retry."""
+    failed = [(cmd, runs) for cmd, runs in work["commands"].items() if runs[1]]
+    failed.sort(key=lambda item: (-item[1][2], -item[1][3]))
+    lines = []
+    for cmd, (total, failures, last_failed, _) in failed[:limit]:
+        outcome = "still failing" if last_failed else "passed on retry"
+        lines.append(f"`{cmd[:120]}` — failed {failures} of {total} run{'s' if total != 1 else ''}, {outcome}")
+    return lines
+
+
+def edited_files(work: dict, cwd="", limit=15) -> list:
+    """Most edited files first (ties: most recent), paths relative to cwd where possible."""
+    ranked = sorted(work["edits"].items(), key=lambda kv: (-kv[1][0], -kv[1][1]))[:limit]
+    base = cwd.rstrip("/\\") + os.sep if cwd else None
+    lines = []
+    for path, (edits, _) in ranked:
+        if base and path.startswith(base):
+            path = path[len(base):]
+        lines.append(f"{path} — {edits} edit{'s' if edits != 1 else ''}")
+    return lines
 
 
 def auto_log_to_daily(work: dict, cwd: str):
@@ -124,9 +622,11 @@ def auto_log_to_daily(work: dict, cwd: str):
     log_path = LOGS_DIR / f"{today}.md"
     now = datetime.now().strftime("%H:%M")
 
-    files = ", ".join(work["files_touched"][:10]) if work["files_touched"] else "none extracted"
+    files = ", ".join(work["files_touched"][-10:]) if work["files_touched"] else "none extracted"
     project = os.path.basename(cwd) if cwd else "unknown"
 
+    delta = work["since_last"]
+
     outcome = "Work in progress (auto-captured before compaction)"
     if work["last_messages"]:
         last_msg = work["last_messages"][-1]
@@ -139,34 +639,33 @@ def auto_log_to_daily(work: dict, cwd: str):
 - **status:** in-progress (compaction imminent)
 - **files_touched:** {files}
 - **cost_usd:** 0
-- **tokens_used:** ~{work['tool_calls'] * 500} (estimated from {work['tool_calls']} tool calls)
+- **tokens_used:** {delta['tok_in'] + delta['tok_out']} (in {delta['tok_in']}, out {delta['tok_out']}, cache read {delta['cache_read']}, cache write {delta['cache_write']}; {delta['turns']} turns, peak context {delta['peak_context']}; since last capture)
+- **tools:** {'; '.join(tool_summary(delta['tools'], 6)) or 'none'}
 - **outcome:** {outcome}
 - **notes:** Auto-logged by pre_compact_handover.py. {len(work['actions'])} file operations, {len(work['bash_commands'])} bash commands. Review and refine next session.
 """
 
-    if log_path.exists():
-        content = log_path.read_text(encoding="utf-8")
-        if "## Metrics" in content:
-            content = content.replace("## Metrics", entry + "\n## Metrics", 1)
-        else:
-            content += entry
-        log_path.write_text(content, encoding="utf-8")
-    else:
-        header = f"""# Daily Log — {today}
+    header = f"""# Daily Log — {today}
 **Agent:** {AGENT} | **Session start:** {now} UTC | **Session end:** TBD
 
 ## Summary
 Auto-created by pre-compact hook. Fill in summary next session.
 
 ## Work Log
-{entry}
 """
-        LOGS_DIR.mkdir(parents=True, exist_ok=True)
-        log_path.write_text(header, encoding="utf-8")
+    start, end = daily_log.append_entry(log_path, entry, header=header, fsync=LOG_FSYNC)
+    try:
+        log_rollup.add_entry(log_path, start, end)
+    except (OSError, ValueError):
+        pass  # derived data — `log_rollup.py` rebuilds it from the log
+    try:
+        journal.sync_log(log_path)  # this entry, plus any written by hand since the last sync
+    except OSError:
+        pass
 
 
-def save_handover(event_data: dict, work: dict) -> str:
-    """Save handover document."""
+def save_handover(event_data: dict, work: dict) -> tuple:
+    """Save handover document to this agent's handover store; returns (path, deduplicated)."""
     session_id = event_data.get("session_id", "unknown")
     trigger = event_data.get("trigger", "auto")
     cwd = event_data.get("cwd", "unknown")
@@ -179,16 +678,35 @@ def save_handover(event_data: dict, work: dict) -> str:
         f"**Trigger:** {trigger}",
         f"**CWD:** {cwd}",
         f"**Tool calls:** {work['tool_calls']}",
-        f"**Files touched:** {', '.join(work['files_touched'][:15])}",
+        f"**Tokens:** in {work['usage']['tok_in']}, out {work['usage']['tok_out']}, "
+        f"cache read {work['usage']['cache_read']}, cache write {work['usage']['cache_write']} "
+        f"over {work['turns']} turns (peak context since last capture {work['peak_context']})",
+        f"**Files touched:** {', '.join(work['files_touched'][-15:])}",
         "",
         "---",
         "",
     ]
 
-    if work["actions"]:
-        lines.append("## Recent File Operations")
-        for action in work["actions"][-10:]:
-            lines.append(f"- {action}")
+    # Most actionable first: what is unfinished, what is broken, where the work was
+    sections = [
+        ("Open TODOs", open_todos(work)),
+        ("Failed Commands", failed_commands(work)),
+        ("Files Edited", edited_files(work, cwd)),
+    ]
+    spans = topic_spans(work)
+    if spans:
+        sections.append(("Topics", [f"turns {first + 1}–{last}: {', '.join(words)}"
+                                    for first, last, words in spans if words]))
+    for title, items in sections:
+        if items:
+            lines.append(f"## {title}")
+            lines.extend(f"- {item}" for item in items)
+            lines.append("")
+
+    if work["tools"]:
+        lines.append("## Tool Usage (session)")
+        for line in tool_summary(work["tools"]):
+            lines.append(f"- {line}")
         lines.append("")
 
     if work["bash_commands"]:
@@ -216,48 +734,65 @@ def save_handover(event_data: dict, work: dict) -> str:
     ])
 
     content = "\n".join(lines)
-
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    sid = session_id[:8]
-    filepath = HANDOVER_DIR / f"handover_{ts}_{sid}.md"
-    filepath.write_text(content, encoding="utf-8")
-
-    latest = HANDOVER_DIR / "LATEST_HANDOVER.md"
-    latest.write_text(content, encoding="utf-8")
-
-    handovers = sorted(HANDOVER_DIR.glob("handover_*.md"), key=lambda p: p.name)
-    for old in handovers[:-10]:
+    return handover_store.save(content, session_id)
+
+
+def _capture(event_data: dict, transcript_path: str, cwd: str, probe):
+    """Parse the new transcript records, record metrics and auto-log; returns (work, log status)."""
+    with probe.phase("extract"):
+        work = extract_work_from_transcript(transcript_path)
+    since = dict(work["since_last"])
+    since["tools"] = {name: stats[0] for name, stats in since["tools"].items()}  # calls only
+    with probe.phase("metrics"):
+        metrics.record(
+            "pre_compact",
+            project=os.path.basename(cwd) if cwd else "",
+            session=event_data.get("session_id", "")[:12],
+            trigger=event_data.get("trigger", "auto"),
+            **since,
+        )
+
+    if not work["parsed_bytes"]:
+        log_status = "not auto-logged (nothing new since the last capture)"
+        probe.count("auto_log_skipped")
+    else:
         try:
-            old.unlink()
-        except OSError:
-            pass
-
-    return str(filepath)
-
-
-def main():
-    try:
-        raw = sys.stdin.read()
-        event_data = json.loads(raw) if raw.strip() else {}
-    except (json.JSONDecodeError, Exception):
-        event_data = {}
-
+            with probe.phase("auto_log"):
+                auto_log_to_daily(work, cwd)
+            log_status = "auto-logged to daily log"
+        except Exception as e:
+            log_status = f"auto-log FAILED: {e}"
+            probe.count("auto_log_failed")
+    return work, log_status
+
+
+def run(event_data: dict) -> str:
+    """Auto-log + handover for one PreCompact event; returns the hook's JSON output."""
+    probe = telemetry.start("pre_compact")
     transcript_path = event_data.get("transcript_path", "")
     cwd = event_data.get("cwd", os.getcwd())
 
-    work = extract_work_from_transcript(transcript_path)
-
-    try:
-        auto_log_to_daily(work, cwd)
-        log_status = "auto-logged to daily log"
-    except Exception as e:
-        log_status = f"auto-log FAILED: {e}"
+    # Two PreCompacts on one transcript (a retry, a second hook process) run
+    # one after the other: the second starts from the first one's cursor
+    # instead of logging and counting the same records again. Without a
+    # transcript there is no cursor to guard.
+    if transcript_path:
+        with shared_io.file_lock(_cursor_path(transcript_path)):
+            work, log_status = _capture(event_data, transcript_path, cwd, probe)
+    else:
+        work, log_status = _capture(event_data, transcript_path, cwd, probe)
 
     try:
-        handover_path = save_handover(event_data, work)
-        handover_status = f"saved to {os.path.basename(handover_path)}"
+        with probe.phase("handover"):
+            handover_path, unchanged = save_handover(event_data, work)
+        handover_status = (f"unchanged since {os.path.basename(handover_path)}" if unchanged
+                           else f"saved to {os.path.basename(handover_path)}")
     except Exception as e:
         handover_status = f"handover FAILED: {e}"
+        probe.count("handover_failed")
+
+    if recall.ENABLED and recall.needs_build(recall.BUILD_INTERVAL):
+        recall.start_build()  # picks up this compaction's log entry and handover in the background
 
     context = (
         f"[MEMORY V2 PRE-COMPACT] Work {log_status}. "
@@ -272,7 +807,18 @@ def main():
             "additionalContext": context
         }
     }
-    print(json.dumps(output))
+    probe.finish()
+    return json.dumps(output)
+
+
+def main():
+    try:
+        raw = sys.stdin.read()
+        event_data = json.loads(raw) if raw.strip() else {}
+    except (json.JSONDecodeError, Exception):
+        event_data = {}
+
+    print(run(event_data))
 
 
 if __name__ == "__main__":
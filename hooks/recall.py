@@ -0,0 +1,406 @@
+"""
+Recall — a local vector index of past work, so SessionStart can bring back
+what was done on this project weeks ago.
+
+Every work entry and Summary / Handoff / Blockers section in every agent's
+daily logs (archived months included) and every handover becomes a sparse
+vector: its words, word pairs and the character trigrams of its words,
+hashed into DIMS dimensions, tf-idf weighted, cut to its FEATURES
+strongest and L2-normalized. No model, no network, built-in modules only.
+
+The vectors are stored by dimension, as flat arrays in one file in TEMP:
+
+    header | offsets[DIMS + 1] | posting docs | posting weights | doc offsets | doc fields
+
+A query reads the offsets of its own few dozen dimensions and just those
+postings, and adds up the dot products. The cost grows with the query's
+postings, not with the number of days, agents or documents. Each
+dimension's postings are stored heaviest first and a query reads about
+MAX_POSTINGS in all, so a common term costs no more than a rare one;
+dimensions shared by more than COMMON_SHARE of the documents are skipped.
+
+Building is incremental. Each source file's documents and features are
+cached with the file's (mtime, size), and a build re-reads only the files
+that changed before it rewrites the arrays. PreCompact starts a build in
+the background once it has auto-logged and saved its handover (at most
+every BUILD_INTERVAL); SessionStart starts one when the index is missing or
+older than REFRESH_HOURS, and meanwhile queries what is there.
+"recall": false in agent_config.json turns all of this off.
+
+    python3 recall.py "upload retry flaky test"     # top 5 matches
+    python3 recall.py query "deploy" -k 10 [--json]
+    python3 recall.py build [--rebuild] [--quiet]
+    python3 recall.py status
+
+Part of Claude Code Memory.
+"""
+# Queried by SessionStart on every boot: built-in modules only, and
+# memory_search (which pulls in sqlite3) only when building.
+import math
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from heapq import nlargest
+
+import hook_config
+import shared_io
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+ENABLED = bool(_cfg.get("recall", True))
+INDEX_PATH = hook_config.state_path("recall", AGENT, ext=".idx")
+CACHE_PATH = hook_config.state_path("recall", AGENT, ext=".marshal")
+
+DIMS = 1 << 18            # hashed feature space; a power of two
+FEATURES = 48             # strongest dimensions kept per document
+CACHE_FEATURES = 160      # kept per document before idf is known
+QUERY_FEATURES = 64
+BIGRAM_WEIGHT = 0.7
+TRIGRAM_WEIGHT = 0.25     # trigrams match word forms: auth / authentication
+COMMON_SHARE = 0.25       # dimensions in more than this share of documents are skipped
+MAX_POSTINGS = 8192       # postings a query reads, split across its terms
+MIN_SCORE = 0.08          # cosine below which a match is noise
+SNIPPET_CHARS = 320
+REFRESH_HOURS = 6         # SessionStart rebuilds an index older than this
+BUILD_INTERVAL = 600      # seconds; PreCompact rebuilds no more often than this
+
+MAGIC = b"CCMRCL01"
+HEADER = struct.Struct("<8sIIId")  # magic, dims, docs, postings, built at
+CACHE_VERSION = 2
+FIELDS = ("kind", "agent", "day", "title", "text", "file", "start", "end")
+STOPWORDS = frozenset("""
+    the and for with that this from into was were are not but have has had been you your our its
+    via per all any can will then than also out when what which who how why there their them they
+""".split())
+_WORD_RE = re.compile(r"[^\W_]{2,}")
+_MARKUP_RE = re.compile(r"\*\*|^\s*[-*] ", re.MULTILINE)
+
+
+# === Vectors ===
+
+def features(text: str, limit=CACHE_FEATURES) -> dict:
+    """{dimension: weighted term count} of text, its limit strongest dimensions."""
+    words = [w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+    tf = {}
+
+    def add(term, weight):
+        dim = zlib.crc32(term.encode("utf-8")) & (DIMS - 1)
+        tf[dim] = tf.get(dim, 0.0) + weight
+
+    for i, word in enumerate(words):
+        add(word, 1.0)
+        if i:
+            add(words[i - 1] + " " + word, BIGRAM_WEIGHT)
+    for word in set(words):
+        if len(word) >= 4:
+            padded = f" {word} "
+            for j in range(len(padded) - 2):
+                add("#" + padded[j:j + 3], TRIGRAM_WEIGHT)
+    if len(tf) > limit:
+        tf = dict(sorted(tf.items(), key=lambda kv: kv[1], reverse=True)[:limit])
+    return tf
+
+
+def _clean(text: str, limit: int) -> str:
+    """text on one line, without markdown bullets and bold, cut to limit chars."""
+    return " ".join(_MARKUP_RE.sub("", text).split())[:limit]
+
+
+def _doc(path: str, doc) -> tuple:
+    """Cached form of one memory_search document: (fields line, dims bytes, sqrt-count bytes)."""
+    _, kind, agent, day, title, body, start, end = doc
+    title = title.strip()
+    tf = features(f"{title}\n{title}\n{body}")  # the title counts double
+    try:
+        rel = os.path.relpath(path, SHARED)
+    except ValueError:  # on another drive (Windows): no relative path exists
+        rel = os.path.abspath(path)
+    rel = rel.replace(os.sep, "/")
+    line = "\t".join((kind, agent, day, _clean(title, 160), _clean(body, SNIPPET_CHARS), rel, str(start), str(end)))
+    return line.encode("utf-8"), array("I", tf).tobytes(), array("f", map(math.sqrt, tf.values())).tobytes()
+
+
+# === Building ===
+
+def _load_cache() -> dict:
+    import marshal
+
+    data = hook_config.read_owned(CACHE_PATH)
+    try:
+        cache = marshal.loads(data) if data else {}
+        if cache.get("version") == CACHE_VERSION and cache.get("dims") == DIMS:
+            return cache["files"]
+    except (EOFError, ValueError, TypeError, AttributeError):
+        pass
+    return {}
+
+
+def _sources(shared=None):
+    """(path, splitter) for the daily logs, archived months and handovers; messages are left out."""
+    import memory_search
+
+    messages = os.path.join(os.path.abspath(shared or SHARED), "messages") + os.sep
+    for path, split in memory_search.source_files(shared):
+        if not os.path.abspath(path).startswith(messages):
+            yield path, split
+
+
+def build(rebuild=False, shared=None) -> dict:
+    """Bring the index up to date; only files whose mtime/size changed are re-read."""
+    import marshal
+    import zipfile
+
+    stats = {"files": 0, "indexed": 0, "removed": 0, "docs": 0, "postings": 0, "written": False}
+    with shared_io.file_lock(INDEX_PATH):
+        cache = {} if rebuild else _load_cache()
+        files = {}
+        for path, split in _sources(shared):
+            stats["files"] += 1
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            old = cache.get(path)
+            if old and tuple(old[0]) == stamp:
+                files[path] = old
+                continue
+            try:
+                docs = [_doc(path, d) for d in split(path) if d[5].strip()]
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                if old:
+                    files[path] = old  # unreadable right now; retried on the next build
+                continue
+            files[path] = (stamp, docs)
+            stats["indexed"] += 1
+        stats["removed"] = len(set(cache) - set(files))
+
+        if not stats["indexed"] and not stats["removed"] and os.path.exists(INDEX_PATH):
+            os.utime(INDEX_PATH)  # checked and current: fresh for another REFRESH_HOURS
+            return stats
+        docs = [d for path in sorted(files) for d in files[path][1]]
+        data, stats["postings"] = _pack(docs)
+        stats["docs"] = len(docs)
+        shared_io.atomic_write(CACHE_PATH, marshal.dumps({"version": CACHE_VERSION, "dims": DIMS, "files": files}),
+                               private=True)
+        shared_io.atomic_write(INDEX_PATH, data)
+        stats["written"] = True
+    return stats
+
+
+def _pack(docs) -> tuple:
+    """(index file bytes, posting count) for a list of cached documents."""
+    from collections import Counter
+    from itertools import accumulate
+    from operator import mul, sub
+
+    n = len(docs)
+    dims_of = []
+    df = Counter()
+    for _, dims, _ in docs:
+        a = array("I")
+        a.frombytes(dims)
+        dims_of.append(a)
+        df.update(a)
+    idf = {dim: math.log(1 + n / count) for dim, count in df.items()}
+
+    post_dim, post_doc, post_weight = array("I"), array("I"), array("f")
+    for i, (_, _, counts) in enumerate(docs):
+        tf = array("f")
+        tf.frombytes(counts)
+        vec = sorted(zip(map(mul, tf, map(idf.__getitem__, dims_of[i])), dims_of[i]), reverse=True)[:FEATURES]
+        norm = math.sqrt(sum(w * w for w, _ in vec)) or 1.0
+        post_dim.extend(d for _, d in vec)
+        post_doc.extend([i] * len(vec))
+        post_weight.extend(w / norm for w, _ in vec)
+
+    # Postings grouped by dimension behind an offsets table, heaviest first
+    # within each, so a query that reads only the head of a long list still
+    # gets the documents where that term matters most
+    sizes = array("I", bytes(4 * (DIMS + 1)))
+    for d, count in Counter(post_dim).items():
+        sizes[d + 1] = count
+    offsets = array("I", accumulate(sizes))
+    keys = array("d", map(sub, post_dim, post_weight))  # weights are in (0, 1]
+    order = sorted(range(len(post_dim)), key=keys.__getitem__)
+    docs_out = array("I", map(post_doc.__getitem__, order))
+    weights_out = array("f", map(post_weight.__getitem__, order))
+
+    doc_offsets = array("I", accumulate([0] + [len(line) for line, _, _ in docs]))
+    header = HEADER.pack(MAGIC, DIMS, n, len(order), time.time())
+    return b"".join((header, offsets.tobytes(), docs_out.tobytes(), weights_out.tobytes(),
+                     doc_offsets.tobytes(), b"".join(line for line, _, _ in docs))), len(order)
+
+
+def needs_build(max_age=REFRESH_HOURS * 3600) -> bool:
+    """True if the index is missing or was last built or checked more than max_age seconds ago."""
+    try:
+        return time.time() - os.path.getmtime(INDEX_PATH) > max_age
+    except OSError:
+        return True
+
+
+def start_build():
+    """Run `recall.py build` in the background; returns at once."""
+    import subprocess
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.join(hook_config.SCRIPT_DIR, "recall.py"), "build", "--quiet"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            close_fds=True, start_new_session=os.name == "posix",
+        )
+    except OSError:
+        pass
+
+
+# === Querying ===
+
+def _read(f, at: int, size: int, typecode: str) -> array:
+    f.seek(at)
+    a = array(typecode)
+    a.frombytes(f.read(size * 4))
+    return a
+
+
+def query(text: str, k=5, min_score=MIN_SCORE, exclude_day="", path=None) -> list:
+    """Best k documents for text, best first, as dicts of FIELDS plus "score" (cosine)."""
+    tf = features(text)
+    if not tf:
+        return []
+    try:
+        f = open(path or INDEX_PATH, "rb")
+    except OSError:
+        return []
+    with f:
+        try:
+            magic, dims, n, p, _ = HEADER.unpack(f.read(HEADER.size))
+        except struct.error:
+            return []
+        if magic != MAGIC or dims != DIMS or not n:
+            return []
+        at_offsets = HEADER.size
+        at_docs = at_offsets + 4 * (DIMS + 1)
+        at_weights = at_docs + 4 * p
+        at_doc_offsets = at_weights + 4 * p
+        at_fields = at_doc_offsets + 4 * (n + 1)
+
+        common = max(32, int(n * COMMON_SHARE))
+        terms = []
+        for count, dim in sorted(((math.sqrt(c), d) for d, c in tf.items()), reverse=True)[:QUERY_FEATURES]:
+            start, end = _read(f, at_offsets + 4 * dim, 2, "I")
+            if start < end <= start + common:
+                terms.append((count * math.log(1 + n / (end - start)), start, end))
+        norm = math.sqrt(sum(w * w for w, _, _ in terms)) or 1.0
+
+        # Each term reads at most its share of MAX_POSTINGS, from the heavy end of its list
+        scores = {}
+        get = scores.get
+        share = max(256, MAX_POSTINGS // max(1, len(terms)))
+        for weight, start, end in terms:
+            end = min(end, start + share)
+            weight /= norm
+            for doc, w in zip(_read(f, at_docs + 4 * start, end - start, "I"),
+                              _read(f, at_weights + 4 * start, end - start, "f")):
+                scores[doc] = get(doc, 0.0) + w * weight
+
+        candidates = []
+        for doc, score in nlargest(4 * k + 16, scores.items(), key=lambda kv: kv[1]):
+            if score < min_score:
+                break
+            start, end = _read(f, at_doc_offsets + 4 * doc, 2, "I")
+            f.seek(at_fields + start)
+            fields = f.read(end - start).decode("utf-8", errors="replace").split("\t")
+            if len(fields) == len(FIELDS):
+                result = dict(zip(FIELDS, fields))
+                result["score"] = round(score, 3)
+                candidates.append(result)
+
+    # Equal scores (the same note on many days) rank newest first and count once
+    results, seen = [], set()
+    for result in sorted(candidates, key=lambda r: (r["score"], r["day"]), reverse=True):
+        key = (result["title"], result["text"])
+        if (exclude_day and result["day"] == exclude_day) or key in seen:
+            continue
+        seen.add(key)
+        results.append(result)
+        if len(results) >= k:
+            break
+    return results
+
+
+def status(path=None) -> dict:
+    """Size, document and posting counts, and age of the index; {} if there is none."""
+    path = path or INDEX_PATH
+    try:
+        with open(path, "rb") as f:
+            magic, dims, n, p, built = HEADER.unpack(f.read(HEADER.size))
+        size = os.path.getsize(path)
+    except (OSError, struct.error):
+        return {}
+    if magic != MAGIC:
+        return {}
+    return {"path": path, "bytes": size, "docs": n, "postings": p, "dims": dims,
+            "built": time.strftime("%Y-%m-%d %H:%M", time.localtime(built))}
+
+
+# === CLI ===
+
+def main(argv):
+    import argparse
+
+    if argv and argv[0] not in ("query", "build", "status", "-h", "--help"):
+        argv = ["query"] + argv
+    ap = argparse.ArgumentParser(description="Vector recall over past work entries and handovers.")
+    ap.add_argument("cmd", choices=("query", "build", "status"))
+    ap.add_argument("text", nargs="*")
+    ap.add_argument("-k", type=int, default=5, help="query: results (default 5)")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--rebuild", action="store_true", help="build: re-read every file")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        stats = build(rebuild=args.rebuild)
+        if not args.quiet:
+            print(f"{stats['files']} files, {stats['indexed']} re-read, {stats['removed']} removed"
+                  + (f"; {stats['docs']} docs, {stats['postings']} postings written" if stats["written"] else "; index current")
+                  + f" in {time.perf_counter() - t0:.2f}s")
+        return 0
+    if args.cmd == "status":
+        info = status()
+        if not info:
+            print("no recall index yet — python3 recall.py build")
+            return 1
+        print(f"{info['docs']} docs, {info['postings']} postings, {info['bytes'] // 1024} KB, built {info['built']}")
+        return 0
+
+    text = " ".join(args.text)
+    if not text.strip():
+        ap.error("query text required")
+    if needs_build(max_age=float("inf")):
+        build()
+    t0 = time.perf_counter()
+    results = query(text, k=args.k)
+    elapsed = (time.perf_counter() - t0) * 1000
+    if args.json:
+        import json
+        print(json.dumps(results, indent=1))
+        return 0
+    for r in results:
+        print(f"{r['score']:.3f}  {r['day']}  {r['agent']:<10} {r['kind']:<8} {r['title']}")
+        print(f"       {r['text'][:160]}")
+        print(f"       {r['file']} [{r['start']}:{r['end']}]")
+    if not results:
+        print("no matches")
+    print(f"({elapsed:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -13,20 +13,28 @@ in the same directory as this script.
 """
 import json
 import os
+import queue
+import re
 import sys
+import threading
 import time
 from datetime import datetime, date, timedelta
 from pathlib import Path
 
-# === CONFIG (from agent_config.json) ===
-SCRIPT_DIR = Path(__file__).parent
-CONFIG_PATH = SCRIPT_DIR / "agent_config.json"
+import daily_log
+import handover_store
+import hook_config
+import inbox
+import journal
+import metrics
+import recall
+import shared_io
+import task_board
+import telemetry
 
-try:
-    with open(CONFIG_PATH) as f:
-        _cfg = json.load(f)
-except (FileNotFoundError, json.JSONDecodeError):
-    _cfg = {}
+# === CONFIG (from agent_config.json) ===
+SCRIPT_DIR = Path(hook_config.SCRIPT_DIR)
+_cfg = hook_config.load()
 
 AGENT = _cfg.get("agent", "Agent")
 SHARED = Path(_cfg.get("shared_path", str(SCRIPT_DIR)))
@@ -34,201 +42,667 @@ ALL_AGENTS = _cfg.get("all_agents", [AGENT])
 OTHER_AGENTS = [a for a in ALL_AGENTS if a != AGENT]
 
 LOGS_DIR = SHARED / AGENT / "logs"
-MESSAGES_FILE = SHARED / "messages" / f"{AGENT.lower()}.md"
+INBOX_DIR = Path(inbox.inbox_dir(AGENT))
 TASKS_FILE = SHARED / "TASKS.md"
-HANDOVER_DIR = SHARED / "handovers"
+LEGACY_HANDOVER = SHARED / "handovers" / "LATEST_HANDOVER.md"
 MAX_CONTEXT = 4000  # chars — keep injection lean
 
+# Boot context is packed to a token budget: every section offers candidate
+# snippets, scored by recency, CWD/project match and unread state, and the
+# most valuable per token are kept (see pack()).
+CONTEXT_TOKENS = int(_cfg.get("boot_context_tokens", MAX_CONTEXT // 4))
+RECENCY_HALF_LIFE_HOURS = 24.0
+PROJECT_BOOST = 1.5   # snippet mentions the CWD's directory name
+UNREAD_BOOST = 2.0    # inbox message not injected at a previous boot
+CLIP_MIN_TOKENS = 24  # don't clip a snippet to less than this
+TODAY_ENTRIES = 6     # newest work entries offered from today's log
+INBOX_MESSAGES = 10   # newest unread inbox messages offered
+INBOX_RECENT = 3      # already-read messages from the last 24h offered for context
+
+# Section reads run concurrently; whatever is not back by the deadline is
+# reported as still loading instead of holding up the boot.
+IO_WORKERS = int(_cfg.get("io_workers", 8))
+IO_BUDGET = float(_cfg.get("boot_budget_seconds", 3.0))
+# Team activity: "latest" shows each agent's newest `### HH:MM` entry, read
+# from the last team_tail_kb of their log; "first" shows the first line.
+TEAM_MODE = _cfg.get("team_activity", "latest")
+TEAM_TAIL_BYTES = int(_cfg.get("team_tail_kb", 16)) * 1024
+# Agents with records in the change journal are shown from there instead:
+# their newest records from the last TEAM_FEED_HOURS, found in one bounded
+# read of the journal's tail rather than a stat of every agent's logs.
+TEAM_FEED_HOURS = 48
+TEAM_FEED_ENTRIES = 3
+TEAM_FEED_BYTES = 64 * 1024
+# Related past work: the entries and handovers in the recall index (recall.py)
+# most like the CWD's project, this agent's open tasks and today's entries.
+RECALL_ENTRIES = int(_cfg.get("recall_entries", 3))
+RECALL_ABOUT = 3  # top tasks, and today's entries, the recall query is made from
+TIMING = bool(_cfg.get("timing")) or os.environ.get("CLAUDE_MEMORY_TIMING") == "1"
+
+# Rendered sections from the last boot, keyed on the (mtime_ns, size) of the
+# files they were built from. Local to this machine — never synced.
+CACHE_PATH = hook_config.state_path("session_start", AGENT, ext=".json")
+CACHE_VERSION = 2  # bump when a section's cached value changes shape
+
+_cache = {}
+_cache_dirty = False
+_stats = {}
+_feed = None
+_feed_lock = threading.Lock()
+_inbox_shard = None  # newest inbox shard, found (and stat'ed) by the messages job
+
+
+def _stat(path):
+    """os.stat once per boot; None if the file is missing."""
+    key = str(path)
+    if key not in _stats:
+        try:
+            _stats[key] = os.stat(key)
+        except OSError:
+            _stats[key] = None
+    return _stats[key]
+
+
+def _file_key(path):
+    st = _stat(path)
+    return [str(path), st.st_mtime_ns, st.st_size] if st else [str(path), None, None]
+
+
+def load_cache():
+    global _cache
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            _cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        _cache = {}
+    if _cache.get("version") != CACHE_VERSION:
+        _cache = {"version": CACHE_VERSION}
+
+
+def save_cache():
+    if not _cache_dirty:
+        return
+    try:
+        shared_io.atomic_write(CACHE_PATH, json.dumps(dict(_cache)).encode("utf-8"))
+    except OSError:
+        pass
+
+
+def cached_section(name, paths, build):
+    """Return build()'s output, reusing last boot's value if none of paths changed."""
+    global _cache_dirty
+    key = [_file_key(p) for p in paths]
+    hit = _cache.get(name)
+    if hit and hit.get("key") == key:
+        return hit["value"]
+    value = build()
+    _cache[name] = {"key": key, "value": value}
+    _cache_dirty = True
+    return value
+
+
+# === Candidate snippets ===
+# Collectors return snippets rather than finished text; pack() scores them
+# and fills the token budget with the most useful ones. A snippet is a dict:
+#   text    the line(s) to inject
+#   weight  base value of this kind of snippet
+#   at      epoch seconds the content is from (recency), optional
+#   must    always included (status lines, warnings, loading markers)
+#   clip    may be shortened to fit the remaining budget
+#   unread  inbox message past the read cursor
+#   backlog older unread messages were left out, so the cursor must not move
+# Snippets are plain dicts so they cache as JSON with the sections.
+
+def snip(text, weight=1.0, at=None, must=False, clip=False, **extra):
+    s = {"text": text, "weight": weight}
+    if at is not None:
+        s["at"] = at
+    if must:
+        s["must"] = True
+    if clip:
+        s["clip"] = True
+    s.update(extra)
+    return s
+
+
+def _at_hhmm(day, hhmm):
+    """Epoch seconds for HH:MM on day (an ISO date string); None if unparseable."""
+    # Split by hand: datetime.strptime imports _strptime (+5 ms at boot)
+    try:
+        y, mo, d = (int(x) for x in day.split("-"))
+        h, mi = (int(x) for x in hhmm.split(":"))
+        return datetime(y, mo, d, h, mi).timestamp()
+    except ValueError:
+        return None
+
 
 def get_today_log():
     """Read today's daily log or flag that it needs creation."""
     today = date.today().isoformat()
     log_path = LOGS_DIR / f"{today}.md"
+    return cached_section("today_log", [log_path], lambda: _render_today_log(log_path, today))
+
 
-    if log_path.exists():
-        content = log_path.read_text(encoding="utf-8")
-        lines = content.split("\n")
-        sections = {"summary": [], "last_work": [], "handoff": [], "blockers": []}
-        current = None
-        work_entries = []
-        work_buf = []
-
-        for line in lines:
-            if line.startswith("## Summary"):
-                current = "summary"
-                continue
-            elif line.startswith("## Work Log"):
-                current = "work"
-                continue
-            elif line.startswith("## Handoff Notes") or line.startswith("## Handoff"):
-                current = "handoff"
-                continue
-            elif line.startswith("## Blockers"):
-                current = "blockers"
-                continue
-            elif line.startswith("## ") and current:
-                current = None
-                continue
-
-            if current == "summary":
-                sections["summary"].append(line)
-            elif current == "work":
-                if line.startswith("### "):
-                    if work_buf:
-                        work_entries.append("\n".join(work_buf))
-                    work_buf = [line]
-                elif work_buf:
-                    work_buf.append(line)
-            elif current == "handoff":
-                sections["handoff"].append(line)
-            elif current == "blockers":
-                sections["blockers"].append(line)
-
-        if work_buf:
-            work_entries.append("\n".join(work_buf))
-
-        parts = []
-        parts.append(f"**Log exists** ({len(lines)} lines, {len(work_entries)} work entries)")
-
-        summary_text = "\n".join(sections["summary"]).strip()
-        if summary_text:
-            parts.append(f"Summary: {summary_text[:300]}")
-
-        if work_entries:
-            parts.append("Last entries:")
-            for entry in work_entries[-2:]:
-                parts.append(entry[:200])
-
-        handoff = "\n".join(sections["handoff"]).strip()
-        if handoff:
-            parts.append(f"Handoff: {handoff[:300]}")
-
-        blockers = "\n".join(sections["blockers"]).strip()
-        if blockers:
-            parts.append(f"Blockers: {blockers[:200]}")
-
-        return "\n".join(parts)
-    else:
-        return (
+def _render_today_log(log_path, today):
+    if not _stat(log_path):
+        return [snip(
             f"**NO LOG FOR TODAY ({today}).** "
-            f"CREATE ONE IMMEDIATELY from {AGENT}/logs/TEMPLATE.md before doing any work."
-        )
+            f"CREATE ONE IMMEDIATELY from {AGENT}/logs/TEMPLATE.md before doing any work.",
+            must=True,
+        )]
+
+    index = daily_log.load_index(log_path)
+    snippets = [snip(f"**Log exists** ({index['lines']} lines, {len(index['entries'])} work entries)", must=True)]
+
+    summary = daily_log.section_text(log_path, index, "summary", limit=1200)
+    if summary:
+        snippets.append(snip(f"Summary: {summary}", weight=2.0, clip=True))
+
+    for entry in daily_log.last_entries(log_path, index, TODAY_ENTRIES, limit=800):
+        m = _ENTRY_RE.match(entry)
+        snippets.append(snip(entry, weight=2.0, at=_at_hhmm(today, m.group(1)) if m else None, clip=True))
+
+    handoff = daily_log.section_text(log_path, index, "handoff", limit=1200)
+    if handoff:
+        snippets.append(snip(f"Handoff: {handoff}", weight=3.0, clip=True))
+
+    blockers = daily_log.section_text(log_path, index, "blockers", limit=800)
+    if blockers and blockers.lower().strip(" .") not in ("none", "n/a", "-"):
+        snippets.append(snip(f"Blockers: {blockers}", weight=3.0, clip=True))
+    return snippets
 
 
 def get_messages():
-    """Read messages inbox. Return content if recent."""
-    if MESSAGES_FILE.exists():
-        mtime = MESSAGES_FILE.stat().st_mtime
-        age_hours = (time.time() - mtime) / 3600
-        content = MESSAGES_FILE.read_text(encoding="utf-8").strip()
-        if content and age_hours < 24:
-            if len(content) > 600:
-                content = content[:600] + "\n[...truncated — read full file]"
-            return f"**Messages ({int(age_hours)}h ago):**\n{content}"
-    return ""
+    """Unread inbox messages, from the read cursor forward, plus the last few already read.
+
+    Reads only bytes past the cursor and a small window before it, never the
+    inbox history.
+    """
+    global _inbox_shard
+    inbox.absorb_legacy(AGENT)
+    _inbox_shard = INBOX_DIR / (inbox.shards(AGENT) or [inbox.shard_name()])[-1]
+    _stat(_inbox_shard)  # for the heading's age
+    messages, skipped = inbox.unread(AGENT)
+    if len(messages) > INBOX_MESSAGES:
+        skipped += len(messages) - INBOX_MESSAGES
+        messages = messages[-INBOX_MESSAGES:]
+    snippets = []
+    if skipped:
+        telemetry.count("inbox_skipped", skipped)
+        snippets.append(snip(f"({skipped} older unread messages not shown — python3 hooks/inbox.py read)",
+                             must=True, backlog=True))
+    cutoff = time.time() - 24 * 3600
+    for m in inbox.recent(AGENT, count=INBOX_RECENT):
+        at = _message_time(m)
+        if at >= cutoff:
+            snippets.append(snip(m["text"].lstrip("# "), weight=2.5, at=at, clip=True))
+    for m in messages:
+        snippets.append(snip(m["text"].lstrip("# "), weight=2.5, at=_message_time(m), clip=True,
+                             unread=True, shard=m["shard"], end=m["end"]))
+    return snippets
+
+
+_MESSAGE_DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})[ T]+(\d{1,2}:\d{2})")
+
+
+def _message_time(message):
+    """When a message was sent: the date in its `## From` line, else its shard's mtime."""
+    m = _MESSAGE_DATE_RE.search(message["text"].split("\n", 1)[0])
+    return (_at_hhmm(m.group(1), m.group(2)) if m else None) or message["mtime"]
+
+
+def mark_messages_seen(snippets, chosen):
+    """Move the inbox cursor past the unread messages that were injected.
+
+    Stops before the first unread message that did not fit, so it and the
+    ones after it are offered again at the next boot. Moves nothing when
+    older unread messages were not offered at all: they stay unread for
+    `inbox.py read`, which goes through them oldest first.
+    """
+    if any(s.get("backlog") for s in snippets):
+        return
+    injected = {id(s) for s in chosen}
+    last = None
+    for s in snippets:
+        if not s.get("unread"):
+            continue
+        if id(s) not in injected:
+            break
+        last = s
+    if last is not None:
+        try:
+            inbox.write_cursor(AGENT, last["shard"], last["end"])
+        except OSError:
+            pass
+
+
+def sync_journal():
+    """Journal entries written to today's log by hand since the last sync (e.g. at the end of the last session)."""
+    journal.sync_log(LOGS_DIR / f"{date.today().isoformat()}.md")
+    return []
 
 
 def get_other_agents_recent():
     """Get summary of other agents' recent activity."""
-    summaries = []
-    today = date.today().isoformat()
-    yesterday = (date.today() - timedelta(days=1)).isoformat()
-
-    for agent in OTHER_AGENTS:
-        for d, label in [(today, "today"), (yesterday, "yesterday")]:
-            log_path = SHARED / agent / "logs" / f"{d}.md"
-            if log_path.exists():
-                content = log_path.read_text(encoding="utf-8")
-                for line in content.split("\n"):
-                    if line.strip() and not line.startswith("#") and not line.startswith("**"):
-                        summaries.append(f"**{agent}** ({label}): {line.strip()[:150]}")
-                        break
-                else:
-                    summaries.append(f"**{agent}**: Log exists for {label}")
-                break
+    return [get_agent_recent(agent) for agent in OTHER_AGENTS]
+
+
+def team_feed():
+    """Other agents' journal records from the last TEAM_FEED_HOURS, by agent; read once per boot."""
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            feed = {}
+            cutoff = time.time() - TEAM_FEED_HOURS * 3600
+            own_inbox = f"messages/{AGENT.lower()}/"  # shown under Inbox already
+            for r in journal.recent(TEAM_FEED_BYTES):
+                if r["agent"] != AGENT and r["ts"] >= cutoff and not r["file"].startswith(own_inbox):
+                    feed.setdefault(r["agent"], []).append(r)
+            _feed = feed
+    return _feed
+
+
+def _feed_snippets(agent, records):
+    labels = {date.today(): "today", date.today() - timedelta(days=1): "yesterday"}
+    # Log entries first, then handovers and messages if there is room
+    logs = [r for r in records if r["kind"] == "log"][-TEAM_FEED_ENTRIES:]
+    room = TEAM_FEED_ENTRIES - len(logs)
+    others = [r for r in records if r["kind"] != "log"][-room:] if room else []
+    snippets = []
+    for r in sorted(logs + others, key=lambda r: r["ts"], reverse=True):
+        stamp = datetime.fromtimestamp(r["ts"])
+        when = f"{labels.get(stamp.date(), stamp.strftime('%a'))} {stamp.strftime('%H:%M')}"
+        if r["kind"] == "log":
+            text, weight = f"**{agent}** ({when}): {r['digest'][:150] or 'updated their log'}", 1.0
+        elif r["kind"] == "message":
+            text, weight = f"**{agent}** ({when}) → {r['digest'][:150]}", 0.7
         else:
-            summaries.append(f"**{agent}**: No recent logs")
+            text, weight = f"**{agent}** ({when}): saved a {r['kind']}", 0.5
+        snippets.append(snip(text, weight=weight, at=r["ts"]))
+    return snippets
+
 
-    return summaries
+def get_agent_recent(agent):
+    """What another agent did lately: their journal records, else one line from today's (or yesterday's) log."""
+    records = team_feed().get(agent)
+    if records:
+        return _feed_snippets(agent, records)
+    today = date.today().isoformat()
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    days = [(SHARED / agent / "logs" / f"{d}.md", label, d)
+            for d, label in [(today, "today"), (yesterday, "yesterday")]]
+    return cached_section(f"team:{agent}:{TEAM_MODE}", [p for p, _, _ in days],
+                          lambda: _agent_recent(agent, days))
+
+
+def _agent_recent(agent, days):
+    for log_path, label, day in days:
+        st = _stat(log_path)
+        if st:
+            if TEAM_MODE == "latest":
+                latest = read_latest_entry(log_path)
+                if latest:
+                    hhmm, title, status = latest
+                    text = f"{title} [{status}]" if status else title
+                    return [snip(f"**{agent}** ({label} {hhmm}): {text[:150]}",
+                                 at=_at_hhmm(day, hhmm) or st.st_mtime)]
+            line = read_first_line(log_path)
+            if line:
+                return [snip(f"**{agent}** ({label}): {line[:150]}", at=st.st_mtime)]
+            return [snip(f"**{agent}**: Log exists for {label}", weight=0.5, at=st.st_mtime)]
+    return [snip(f"**{agent}**: No recent logs", weight=0.2)]
+
+
+_ENTRY_RE = re.compile(r"^### (\d{1,2}:\d{2})\s*(?:—|-+)?\s*(.*)$", re.M)
+_STATUS_RE = re.compile(r"^- \*\*status:\*\*\s*(.+)$", re.M)
+
+
+def read_first_line(log_path):
+    """First meaningful line of a log, reading only as far as that line."""
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#") and not line.startswith("**"):
+                return line.strip()
+    return None
+
+
+def read_latest_entry(log_path, tail_bytes=None):
+    """Newest `### HH:MM — Title` entry in the last tail_bytes of a log, as (HH:MM, title, status).
+
+    None if the tail holds no entry. I/O is bounded by tail_bytes however
+    large the log has grown.
+    """
+    tail_bytes = tail_bytes or TEAM_TAIL_BYTES
+    with open(log_path, "rb") as f:
+        size = f.seek(0, 2)
+        start = max(0, size - tail_bytes)
+        f.seek(start)
+        tail = f.read().decode("utf-8", errors="ignore")
+    if start:
+        tail = tail.split("\n", 1)[-1]  # first line is probably cut mid-way
+
+    last = None
+    for last in _ENTRY_RE.finditer(tail):
+        pass
+    if last is None:
+        return None
+    status = _STATUS_RE.search(tail, last.end())
+    return last.group(1), last.group(2).strip(), status.group(1).strip() if status else ""
 
 
 def get_active_tasks():
     """Read shared task board for tasks assigned to this agent."""
-    if TASKS_FILE.exists():
-        content = TASKS_FILE.read_text(encoding="utf-8")
-        my_tasks = []
-        for line in content.split("\n"):
-            if AGENT in line and ("In Progress" in line or "TODO" in line or "Assigned" in line):
-                my_tasks.append(line.strip())
-        if my_tasks:
-            return "**My active tasks:** " + " | ".join(my_tasks[:5])
-    return ""
-
+    return cached_section("tasks", [TASKS_FILE], _render_tasks)
 
-def get_latest_handover(source):
-    """Check for recent handover from pre-compact (only on compact/resume)."""
-    if source not in ("compact", "resume"):
-        return ""
 
-    latest = HANDOVER_DIR / "LATEST_HANDOVER.md"
-    if latest.exists():
-        age_minutes = (time.time() - latest.stat().st_mtime) / 60
-        if age_minutes < 120:
-            content = latest.read_text(encoding="utf-8")
-            if len(content) > 800:
-                content = content[:800] + "\n[...truncated]"
-            return f"**Recent handover ({int(age_minutes)}m ago):**\n{content}"
-    return ""
+def _render_tasks():
+    snippets = []
+    if _stat(TASKS_FILE):
+        # Exact owner match through the shared board index, not a substring scan
+        for row, line in task_board.tasks_for(AGENT, ("in progress", "todo", "assigned"), TASKS_FILE):
+            weight = 2.0
+            if row["status"] == "in progress":
+                weight *= 1.5
+            if row["priority"] in ("P0", "P1"):
+                weight *= 1.5
+            snippets.append(snip(line, weight=weight, clip=True))
+    return snippets
 
 
-def main():
-    try:
-        raw = sys.stdin.read()
-        event = json.loads(raw) if raw.strip() else {}
-    except Exception:
-        event = {}
+def get_latest_handover(source):
+    """This agent's most recent pre-compact handover (only on compact/resume, only if < 2h old)."""
+    if source not in ("compact", "resume"):
+        return []
+
+    pointer = handover_store.latest(AGENT)
+    if pointer:
+        path, saved_at = pointer
+        if (time.time() - saved_at) / 60 < 120:
+            return cached_section("handover", [handover_store.pointer_path(AGENT)],
+                                  lambda: _read_handover(handover_store.read_file(path), saved_at))
+        return []
+
+    # Before per-agent stores: the shared LATEST_HANDOVER.md, if it is ours
+    st = _stat(LEGACY_HANDOVER)
+    if st and (time.time() - st.st_mtime) / 60 < 120:
+        content = LEGACY_HANDOVER.read_text(encoding="utf-8")
+        if f"**Agent:** {AGENT}\n" in content:
+            return _read_handover(content, st.st_mtime)
+    return []
+
+
+# Handover sections worth more than the default 3.0: what is unfinished or broken first
+HANDOVER_WEIGHTS = {"# ": 4.0, "## Resume": 4.0, "## Open TODOs": 4.0, "## Failed Commands": 3.5, "## Files Edited": 3.5}
+
+
+def _read_handover(content, mtime):
+    """One snippet per handover section, weighted by HANDOVER_WEIGHTS."""
+    snippets = []
+    for block in re.split(r"(?m)^(?=## )", content):
+        block = block.strip().strip("-").strip()
+        if not block:
+            continue
+        weight = next((w for prefix, w in HANDOVER_WEIGHTS.items() if block.startswith(prefix)), 3.0)
+        snippets.append(snip(block, weight=weight, at=mtime, clip=True))
+    return snippets
+
+
+def get_related(project, results, today):
+    """Snippets of past work like what this session is about; starts a background index build if stale."""
+    if not recall.ENABLED or RECALL_ENTRIES <= 0:
+        return []
+    if recall.needs_build():
+        recall.start_build()  # this boot queries the index as it is
+    # The project name counts for more than any one task or entry, and only
+    # the few most pressing of those go in, so a long task list can't drown it
+    about = [project] * 4
+    for name in ("tasks", "today_log"):
+        offered = sorted((s for s in results.get(name) or [] if not s.get("must")),
+                         key=lambda s: s.get("weight", 1.0), reverse=True)
+        about += [s["text"] for s in offered[:RECALL_ABOUT]]
+    snippets = []
+    for r in recall.query("\n".join(about), k=RECALL_ENTRIES, exclude_day=today):
+        snippets.append(snip(f"**{r['day']} {r['agent']}** {r['title']}: {r['text']}",
+                             weight=1.0 + r["score"], clip=True))
+    return snippets
+
+
+def fan_out(jobs, budget=IO_BUDGET, workers=IO_WORKERS):
+    """Run (name, fn) jobs on a bounded pool of daemon threads.
+
+    Returns ({name: result}, {name: seconds}) for the jobs that finished
+    within budget seconds. A job that raises gets its exception as result.
+    Daemon threads mean a stuck read on a slow share never delays exit.
+    """
+    todo = queue.Queue()
+    done = queue.Queue()
+    for job in jobs:
+        todo.put(job)
+
+    def worker():
+        while True:
+            try:
+                name, fn = todo.get_nowait()
+            except queue.Empty:
+                return
+            t0 = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                result = e
+            done.put((name, result, time.perf_counter() - t0))
+
+    for _ in range(max(1, min(workers, len(jobs)))):
+        threading.Thread(target=worker, daemon=True).start()
+
+    results, timings = {}, {}
+    deadline = time.monotonic() + budget
+    while len(results) < len(jobs):
+        try:
+            name, result, elapsed = done.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        results[name] = result
+        timings[name] = elapsed
+    return results, timings
+
+
+def _section(results, name, pending):
+    """Snippets of one fanned-out job, or a marker if it errored or is still running."""
+    if name not in results:
+        return [snip(pending, must=True)] if pending else []
+    result = results[name]
+    if isinstance(result, Exception):
+        return [snip(f"[{name} unavailable: {result}]", must=True)]
+    return result
+
+
+def report_timing(jobs, timings, total):
+    """Per-section latency on stderr (stdout carries the hook JSON)."""
+    cols = [f"{name}={timings[name] * 1000:.1f}ms" if name in timings else f"{name}=PENDING"
+            for name, _ in jobs]
+    print(f"[session_start timing] total={total * 1000:.1f}ms " + " ".join(cols), file=sys.stderr)
+
+
+# === Context packing ===
+
+def estimate_tokens(text):
+    """Rough token count: ~4 bytes of UTF-8 per token, plus the newline."""
+    return (len(text.encode("utf-8")) + 3) // 4 + 1
+
+
+def score(snippet, now, project):
+    """Value of a snippet: base weight x recency x project match x unread."""
+    value = snippet.get("weight", 1.0)
+    at = snippet.get("at")
+    if at is not None:
+        age_hours = max(0.0, (now - at) / 3600)
+        value *= 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+    if project and project in snippet["text"].lower():
+        value *= PROJECT_BOOST
+    if snippet.get("unread"):
+        value *= UNREAD_BOOST
+    return value
+
+
+def clip_text(text, tokens):
+    """text cut to about `tokens` tokens, at a word boundary."""
+    limit = max(0, (tokens - 2) * 4)
+    if len(text.encode("utf-8")) <= limit:
+        return text
+    cut = text.encode("utf-8")[:limit].decode("utf-8", errors="ignore")
+    # Prefer ending on a whole line (entries are bullet lists), else a whole word
+    for sep in ("\n", " "):
+        if sep in cut[len(cut) // 2:]:
+            cut = cut[:cut.rindex(sep)]
+            break
+    return cut.rstrip() + " …"
+
+
+def pack(sections, budget, now=None, project=""):
+    """Choose snippets to fit budget tokens; returns (rendered lines, chosen snippets).
+
+    sections is [(heading, [snippet, ...])] in display order. Must-have
+    snippets go in first; the rest are taken greedily by value per token,
+    clipping one that is too long when enough budget is left for it to be
+    useful. A section's heading is paid for by its first snippet. Output
+    keeps display order: sections as given, snippets in their own order.
+    """
+    now = now or time.time()
+    project = (project or "").lower()
+    opened = set()
+    taken = {}
+    left = budget
+
+    def cost(si, text):
+        heading = sections[si][0]
+        extra = estimate_tokens(heading) + 1 if heading and si not in opened else 0
+        return estimate_tokens(text) + extra
+
+    def take(si, i, text):
+        nonlocal left
+        left -= cost(si, text)
+        opened.add(si)
+        taken[(si, i)] = text
+
+    candidates = []
+    for si, (_, snippets) in enumerate(sections):
+        for i, s in enumerate(snippets):
+            if s.get("must"):
+                take(si, i, s["text"])
+            else:
+                value = score(s, now, project)
+                if value > 0:
+                    candidates.append((value / cost(si, s["text"]), si, i, s))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+
+    for _, si, i, s in candidates:
+        c = cost(si, s["text"])
+        if c <= left:
+            take(si, i, s["text"])
+        elif s.get("clip") and left - (c - estimate_tokens(s["text"])) >= CLIP_MIN_TOKENS:
+            take(si, i, clip_text(s["text"], left - (c - estimate_tokens(s["text"]))))
+            telemetry.count("snippets_clipped")
+
+    lines, chosen = [], []
+    for si, (heading, snippets) in enumerate(sections):
+        picked = [(i, taken[(si, i)]) for i in range(len(snippets)) if (si, i) in taken]
+        if not picked:
+            continue
+        if heading:
+            lines.append(heading)
+        for i, text in picked:
+            lines.append(text)
+            chosen.append(snippets[i])
+        lines.append("")
+    return lines, chosen
+
+
+def _aged_heading(heading, path, unit_seconds, unit):
+    """heading plus the age of path, e.g. "## Inbox (3h ago)", if a job already stat'ed it.
+
+    Runs on the main thread after the fan-out, so it never touches the
+    shared folder itself.
+    """
+    st = _stats.get(str(path)) if path else None
+    if not st:
+        return heading
+    return f"{heading} ({int((time.time() - st.st_mtime) / unit_seconds)}{unit} ago)"
+
+
+def run(event: dict) -> str:
+    """Boot context for one SessionStart event; returns the hook's JSON output."""
+    t_start = time.perf_counter()
+    probe = telemetry.start("session_start")
+    global _feed, _inbox_shard
+    _stats.clear()  # stats are memoised per boot, not across boots
+    _feed = _inbox_shard = None
 
     source = event.get("source", "startup")
     cwd = event.get("cwd", os.getcwd())
     now = datetime.now()
-
-    parts = []
-    parts.append(f"# {AGENT} Session Start ({source})")
-    parts.append(f"**Date:** {now.strftime('%Y-%m-%d')} | **Time:** {now.strftime('%H:%M')} | **CWD:** {os.path.basename(cwd)}")
-    parts.append("")
-
-    parts.append("## Today's Log")
-    parts.append(get_today_log())
-    parts.append("")
-
-    msgs = get_messages()
-    if msgs:
-        parts.append("## Inbox")
-        parts.append(msgs)
-        parts.append("")
-
-    agent_info = get_other_agents_recent()
-    if agent_info:
-        parts.append("## Team Activity")
-        parts.extend(agent_info)
-        parts.append("")
-
-    tasks = get_active_tasks()
-    if tasks:
-        parts.append("## Tasks")
-        parts.append(tasks)
-        parts.append("")
-
-    handover = get_latest_handover(source)
-    if handover:
-        parts.append("## Handover Context")
-        parts.append(handover)
-        parts.append("")
-
-    context = "\n".join(parts)
-
-    if len(context) > MAX_CONTEXT:
-        context = context[:MAX_CONTEXT] + "\n[...context trimmed to stay lean]"
+    with probe.phase("load_cache"):
+        load_cache()
+
+    # Everything that touches the shared folder runs here, within IO_BUDGET
+    jobs = [
+        ("today_log", get_today_log),
+        ("messages", get_messages),
+        ("tasks", get_active_tasks),
+        ("handover", lambda: get_latest_handover(source)),
+        ("journal", sync_journal),
+        ("metrics", lambda: metrics.record("session_start", project=os.path.basename(cwd), source=source) or []),
+    ] + [(f"team:{agent}", lambda agent=agent: get_agent_recent(agent)) for agent in OTHER_AGENTS]
+    deadline = time.monotonic() + IO_BUDGET
+    with probe.phase("fan_out"):
+        results, timings = fan_out(jobs)
+    # Recall works from the tasks and today's log, so it goes second, in what is left of the budget
+    recall_job = ("related", lambda: get_related(os.path.basename(cwd), results, now.strftime("%Y-%m-%d")))
+    with probe.phase("recall"):
+        related, related_timing = fan_out([recall_job], budget=max(0.0, deadline - time.monotonic()))
+    jobs.append(recall_job)
+    results.update(related)
+    timings.update(related_timing)
+    for name, secs in timings.items():
+        probe.add("job:" + name.partition(":")[0], secs * 1000)
+    probe.count("jobs_pending", len(jobs) - len(timings))
+
+    header = [
+        f"# {AGENT} Session Start ({source})",
+        f"**Date:** {now.strftime('%Y-%m-%d')} | **Time:** {now.strftime('%H:%M')} | **CWD:** {os.path.basename(cwd)}",
+        "",
+    ]
+    inbox_snippets = _section(results, "messages",
+                              "[still loading — run python3 hooks/inbox.py read --peek]")
+    sections = [
+        ("## Today's Log", _section(results, "today_log",
+                                    f"[still loading — read {AGENT}/logs/{now.strftime('%Y-%m-%d')}.md directly]")),
+        (_aged_heading("## Inbox", _inbox_shard, 3600, "h"), inbox_snippets),
+        ("## Team Activity", [s for agent in OTHER_AGENTS
+                              for s in _section(results, f"team:{agent}", f"**{agent}**: [still loading]")]),
+        ("## Tasks", _section(results, "tasks", "[still loading — read TASKS.md directly]")),
+        ("## Related Past Work", _section(results, "related", "")),
+        (_aged_heading("## Handover Context", handover_store.pointer_path(AGENT), 60, "m"),
+         _section(results, "handover", "")),
+    ]
+    budget = CONTEXT_TOKENS - sum(estimate_tokens(line) for line in header)
+    with probe.phase("pack"):
+        lines, chosen = pack(sections, budget, now.timestamp(), os.path.basename(cwd))
+    probe.count("snippets_dropped", sum(len(snippets) for _, snippets in sections) - len(chosen))
+    mark_messages_seen(inbox_snippets, chosen)
+
+    with probe.phase("save_cache"):
+        save_cache()
+    context = "\n".join(header + lines)
+
+    # Safety net only: pack() already keeps to the token budget
+    max_chars = max(MAX_CONTEXT, CONTEXT_TOKENS * 4)
+    if len(context) > max_chars:
+        context = context[:max_chars] + "\n[...context trimmed to stay lean]"
+        probe.count("context_trimmed")
+    probe.note("context_bytes", len(context.encode("utf-8")))
+    today_st = _stat(LOGS_DIR / f"{now.strftime('%Y-%m-%d')}.md")
+    probe.note("today_log_bytes", today_st.st_size if today_st else 0)
 
     output = {
         "hookSpecificOutput": {
@@ -236,7 +710,21 @@ def main():
             "additionalContext": context
         }
     }
-    print(json.dumps(output))
+
+    if TIMING:
+        report_timing(jobs, timings, time.perf_counter() - t_start)
+    probe.finish()
+    return json.dumps(output)
+
+
+def main():
+    try:
+        raw = sys.stdin.read()
+        event = json.loads(raw) if raw.strip() else {}
+    except Exception:
+        event = {}
+
+    print(run(event))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""
+Shared-folder write helpers — locked appends, atomic replaces, file locks.
+
+Every hook writes through these, so parallel sessions and agents on one
+host (or one synced folder) never tear or lose each other's writes:
+
+    append_bytes(path, data)      one O_APPEND write under an exclusive lock;
+                                  concurrent writers interleave whole records
+    atomic_write(path, data)      temp file in the same directory + os.replace;
+                                  readers see the old file or the new, never half
+    with file_lock(path): ...     exclusive lock on path + ".lock" around a
+                                  read-modify-write of path
+    claim_pid_file(path)          a server's pid file in TEMP, held locked
+
+Hooks never rewrite shared files they only add to; I/O is proportional to
+the record, not the file. Locking uses fcntl.flock on POSIX and
+msvcrt.locking on Windows; where neither exists, appends are still single
+O_APPEND writes and replaces are still atomic.
+
+Built-in modules only (no contextlib), so the per-prompt heartbeat can
+import it without paying for it.
+
+Part of Claude Code Memory.
+"""
+import os
+from _thread import get_ident
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+
+
+def _lock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        # Locks one byte at offset 0 — enough as a mutex between cooperating writers
+        pos = os.lseek(fd, 0, os.SEEK_CUR)
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        os.lseek(fd, pos, os.SEEK_SET)
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        pos = os.lseek(fd, 0, os.SEEK_CUR)
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.lseek(fd, pos, os.SEEK_SET)
+
+
+class locked:
+    """Hold an exclusive advisory lock on an open file descriptor (a context manager)."""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def __enter__(self):
+        _lock(self.fd)
+        return self.fd
+
+    def __exit__(self, *exc):
+        _unlock(self.fd)
+
+
+class open_append:
+    """Open path for locked appending; `with` yields the fd with the lock held."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.fd = None
+
+    def __enter__(self):
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        try:
+            self.fd = os.open(self.path, flags, 0o644)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.fd = os.open(self.path, flags, 0o644)
+        try:
+            _lock(self.fd)
+        except BaseException:
+            os.close(self.fd)
+            raise
+        return self.fd
+
+    def __exit__(self, *exc):
+        try:
+            _unlock(self.fd)
+        finally:
+            os.close(self.fd)
+
+
+class file_lock(open_append):
+    """Exclusive lock on path + ".lock" for a read-modify-write of path.
+
+    The lock file is separate from path so path itself can be replaced
+    atomically while the lock is held. Blocks until the lock is free.
+    """
+
+    def __init__(self, path):
+        super().__init__(f"{path}.lock")
+
+
+def write_all(fd: int, data: bytes, fsync=True):
+    """Write every byte of data to fd (one write call unless the OS splits it)."""
+    view = memoryview(data)
+    while view:
+        n = os.write(fd, view)
+        view = view[n:]
+    if fsync:
+        os.fsync(fd)
+
+
+def append_bytes(path, data: bytes, fsync=True, header: bytes = b"") -> tuple:
+    """Append data to path under lock; header is written first if the file is new/empty.
+
+    Returns the (start, end) byte offsets the write landed at.
+    """
+    with open_append(path) as fd:
+        start = os.fstat(fd).st_size
+        if start == 0 and header:
+            data = header + data
+        write_all(fd, data, fsync)
+        return start, start + len(data)
+
+
+def atomic_write(path, data: bytes, fsync=False, private=False):
+    """Replace path with data: write a temp file beside it, then os.replace.
+
+    Readers see the old content or the new, never a partial file; of two
+    concurrent writers one wins whole. The temp name is unique per process
+    and thread. fsync makes the new content durable before the rename.
+    private is for state in a shared TEMP: the file is 0600 and the temp
+    file is created fresh, never through a name someone else planted.
+    """
+    path = str(path)
+    tmp = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    mode = 0o644
+    if private:
+        flags |= os.O_EXCL | _NOFOLLOW
+        mode = 0o600
+        try:
+            os.remove(tmp)  # a leftover of ours from a crashed run; not removable if someone else's
+        except FileNotFoundError:
+            pass
+    try:
+        fd = os.open(tmp, flags, mode)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd = os.open(tmp, flags, mode)
+    try:
+        try:
+            write_all(fd, data, fsync)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# === Pid files ===
+# The hook server and the heartbeat watcher keep theirs in TEMP, which other
+# users can write to: never follow a symlink there, and only trust our own.
+
+
+def _ours(fd: int) -> bool:
+    return not hasattr(os, "getuid") or os.fstat(fd).st_uid == os.getuid()
+
+
+def claim_pid_file(path):
+    """Write our pid to path and lock it; returns the fd, which holds the lock until closed.
+
+    None if another process holds the lock or the file is not this user's.
+    """
+    try:
+        fd = os.open(str(path), os.O_RDWR | os.O_CREAT | _NOFOLLOW, 0o600)
+    except OSError:
+        return None
+    try:
+        if not _ours(fd):
+            raise PermissionError(path)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.ftruncate(fd, 0)
+        write_all(fd, str(os.getpid()).encode("ascii"), fsync=False)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def read_pid(path):
+    """The live process named by one of our pid files, else None."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY | _NOFOLLOW)
+    except OSError:
+        return None
+    try:
+        if not _ours(fd):
+            return None
+        pid = int(os.read(fd, 32).strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+    finally:
+        os.close(fd)
@@ -0,0 +1,305 @@
+"""
+Task board index — parsed TASKS.md with lookups by owner and status.
+
+Scans the shared task board once and records, for every table row, its
+byte range plus the fields the hooks filter on (ID, owner(s), priority,
+status, section). Columns are found by their header names (the layout of
+templates/TASKS.md), so tables with extra or reordered columns still parse.
+
+    owner:   {"anna": [row, ...]}           exact, case-insensitive names
+    status:  {"in progress": [row, ...]}
+
+Owners are matched as whole names: a cell of "Ann, Bob" lists Ann and Bob;
+"Anna" is never a match for Ann. Rows in a Completed section without a
+Status column have status "done".
+
+The index is saved next to the board as a hidden sidecar
+(`.TASKS.md.idx.json`) and reused while the board's mtime and size are
+unchanged, so every agent's hooks share one parse per edit. A query reads
+the sidecar's header and the one row list it needs, then seeks to each
+matching row: cost follows the rows returned, not the size of the board.
+
+Part of Claude Code Memory.
+
+CLI:
+    python3 task_board.py                             # this agent's open tasks
+    python3 task_board.py --owner Anna --status "In Progress"
+    python3 task_board.py --counts                    # rows per owner and status
+"""
+import json
+import os
+import re
+import sys
+
+import hook_config
+import shared_io
+
+INDEX_VERSION = 1
+OPEN_STATUSES = ("in progress", "todo", "assigned", "blocked")
+NO_OWNER = {"", "-", "—", "unassigned", "none", "tbd", "n/a"}
+
+# Header text -> field name; other columns are kept only as row text
+COLUMNS = {
+    "id": "id",
+    "task": "task",
+    "owner": "owner",
+    "assignee": "owner",
+    "priority": "priority",
+    "status": "status",
+}
+
+_OWNER_SPLIT = re.compile(r"\s*(?:,|/|&|\+|;|\band\b)\s*", re.IGNORECASE)
+_CELL_SPLIT = re.compile(r"(?<!\\)\|")
+_DECORATION = "*_`@~[] \t"
+
+
+def board_path(shared=None) -> str:
+    if shared is None:
+        shared = hook_config.load().get("shared_path", hook_config.SCRIPT_DIR)
+    return os.path.join(str(shared), "TASKS.md")
+
+
+def sidecar_path(board) -> str:
+    head, name = os.path.split(str(board))
+    return os.path.join(head, f".{name}.idx.json")
+
+
+def owner_key(name: str) -> str:
+    """Normalised owner name: no markdown decoration, lower case."""
+    return name.strip(_DECORATION).lower()
+
+
+def owners_of(cell: str) -> list:
+    """Owner keys listed in an Owner cell ("Ann, Bob" -> ["ann", "bob"])."""
+    keys = []
+    for part in _OWNER_SPLIT.split(cell):
+        key = owner_key(part)
+        if key not in NO_OWNER and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def status_key(text: str) -> str:
+    """Normalised status: "**In-Progress** 🚧" -> "in progress"."""
+    return " ".join(re.sub(r"[\W_]+", " ", text).split()).lower()
+
+
+def _cells(line: str) -> list:
+    """Raw cells of a `| a | b |` row, cells[0] being the text before the first pipe."""
+    return _CELL_SPLIT.split(line) if "\\|" in line else line.split("|")
+
+
+def build_index(board) -> dict:
+    """Scan the board once into row lists per owner, per status and overall.
+
+    A row is [start, end, section, id, owners, priority, status].
+    """
+    board = str(board)
+    sections = []
+    lists = {"owner": {}, "status": {}, "all": {"": []}}
+    owner_cache, status_cache = {}, {}  # few distinct cells; normalise each once
+    columns = None  # cell numbers of id, owner, priority, status in the current table
+    completed = False
+    section = -1
+    pos = 0
+    with open(board, "rb") as f:
+        st = os.fstat(f.fileno())
+        for raw in f:
+            start, pos = pos, pos + len(raw)
+            if raw.startswith(b"#"):
+                name = raw.decode("utf-8", errors="replace").lstrip("#").strip()
+                sections.append(name)
+                section = len(sections) - 1
+                completed = name.lower().startswith("completed")
+                columns = None
+                continue
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line.startswith("|"):
+                columns = None  # a table ends at the first non-table line
+                continue
+            cells = _cells(line)
+            if columns is None:
+                found = {COLUMNS[c.strip().lower()]: i for i, c in enumerate(cells) if c.strip().lower() in COLUMNS}
+                columns = [found.get(name) for name in ("id", "owner", "priority", "status")]
+                continue
+            if len(cells) > 1 and cells[1].strip() and not cells[1].strip(" -:"):
+                continue  # |----|---| separator
+            id_at, owner_at, priority_at, status_at = (
+                i if i is not None and i < len(cells) else None for i in columns)
+
+            cell = cells[status_at].strip() if status_at is not None else ""
+            status = status_cache.get(cell)
+            if status is None:
+                status = status_cache[cell] = status_key(cell)
+            if not status and columns[3] is None and completed:
+                status = "done"
+            cell = cells[owner_at].strip() if owner_at is not None else ""
+            owners = owner_cache.get(cell)
+            if owners is None:
+                owners = owner_cache[cell] = owners_of(cell)
+
+            entry = [start, pos, section,
+                     cells[id_at].strip() if id_at is not None else "", owners,
+                     cells[priority_at].strip(_DECORATION) if priority_at is not None else "", status]
+            lists["all"][""].append(entry)
+            for key in owners:
+                lists["owner"].setdefault(key, []).append(entry)
+            if status:
+                lists["status"].setdefault(status, []).append(entry)
+
+    return {"version": INDEX_VERSION, "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+            "sections": sections, "lists": lists}
+
+
+# The sidecar is a JSON header line, then one JSON line per row list. The
+# header maps each owner/status to its line's [offset, length, rows], so a
+# lookup parses one short line instead of the whole board's index.
+
+def save_index(board, index: dict):
+    header = {k: index[k] for k in ("version", "mtime_ns", "size", "sections")}
+    body = []
+    offset = 0
+    for kind, table in index["lists"].items():
+        header[kind] = {}
+        for key, entries in table.items():
+            line = json.dumps(entries, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+            header[kind][key] = [offset, len(line), len(entries)]
+            body.append(line)
+            offset += len(line)
+    body.insert(0, json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n")
+    try:
+        shared_io.atomic_write(sidecar_path(board), b"".join(body))
+    except OSError:
+        pass  # the index is an optimisation — a read-only share must not break the hook
+
+
+def load_index(board=None, save=True) -> dict:
+    """Index for the board: the sidecar's header when it is current, else a fresh scan (saved).
+
+    A fresh index holds its row lists in memory; one read from the sidecar
+    holds only the header, and lookup() reads the lists it needs.
+    """
+    board = str(board or board_path())
+    st = os.stat(board)
+    side = sidecar_path(board)
+    try:
+        with open(side, "rb") as f:
+            raw = f.readline()
+        header = json.loads(raw)
+        if header.get("version") == INDEX_VERSION \
+                and header.get("mtime_ns") == st.st_mtime_ns and header.get("size") == st.st_size:
+            header["sidecar"] = (side, raw)
+            return header
+    except (OSError, ValueError):
+        pass
+
+    index = build_index(board)
+    if save:
+        save_index(board, index)
+    return index
+
+
+def lookup(index: dict, kind: str, keys) -> list:
+    """Rows listed under any of keys in one of the "owner", "status" or "all" tables, in board order."""
+    if "lists" in index:
+        found = [e for k in keys for e in index["lists"][kind].get(k, [])]
+    else:
+        side, raw = index["sidecar"]
+        found = []
+        with open(side, "rb") as f:
+            if f.readline() != raw:
+                # Replaced since the header was read: fall back to the board itself
+                return lookup(build_index(board_path_of(side)), kind, keys)
+            base = len(raw)
+            for k in keys:
+                where = index[kind].get(k)
+                if where:
+                    f.seek(base + where[0])
+                    found.extend(json.loads(f.read(where[1])))
+    if len(keys) > 1:
+        found.sort(key=lambda e: e[0])
+    return found
+
+
+def board_path_of(side) -> str:
+    head, name = os.path.split(side)
+    return os.path.join(head, name[1:-len(".idx.json")])
+
+
+def query(index: dict, owner=None, statuses=None) -> list:
+    """Rows for owner (exact name) with a status in statuses; either filter may be None."""
+    keys = [status_key(s) for s in statuses] if statuses is not None else None
+    if owner is not None:
+        found = lookup(index, "owner", [owner_key(owner)])
+        return found if keys is None else [e for e in found if e[6] in keys]
+    if keys is not None:
+        return lookup(index, "status", keys)
+    return lookup(index, "all", [""])
+
+
+def row(index: dict, entry) -> dict:
+    start, end, section, task_id, owners, priority, status = entry
+    return {"start": start, "end": end, "section": index["sections"][section] if section >= 0 else "",
+            "id": task_id, "owners": owners, "priority": priority, "status": status}
+
+
+def row_text(board, entries) -> list:
+    """The table lines of the given rows, read by seeking to each."""
+    lines = []
+    with open(str(board), "rb") as f:
+        for entry in entries:
+            f.seek(entry[0])
+            lines.append(f.read(entry[1] - entry[0]).decode("utf-8", errors="replace").strip())
+    return lines
+
+
+def tasks_for(owner, statuses=OPEN_STATUSES, board=None) -> list:
+    """[(row dict, line)] for owner's tasks with one of statuses, in board order."""
+    board = str(board or board_path())
+    index = load_index(board)
+    entries = query(index, owner, statuses)
+    return list(zip((row(index, e) for e in entries), row_text(board, entries)))
+
+
+def main(argv):
+    import argparse
+
+    agent = hook_config.load().get("agent", "Agent")
+    ap = argparse.ArgumentParser(description="Query the shared task board by owner and status.")
+    ap.add_argument("--board", default=None, help="path to TASKS.md (default: shared_path/TASKS.md)")
+    ap.add_argument("--owner", default=agent, help=f"owner name, matched exactly (default: {agent}); '' for any")
+    ap.add_argument("--status", action="append", help="status to include, repeatable (default: open statuses)")
+    ap.add_argument("--counts", action="store_true", help="rows per owner and per status")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    board = args.board or board_path()
+    try:
+        index = load_index(board)
+    except OSError as e:
+        print(f"cannot read {board}: {e}", file=sys.stderr)
+        return 1
+    if args.counts:
+        if "lists" in index:
+            counts = {kind: {k: len(v) for k, v in sorted(index["lists"][kind].items())}
+                      for kind in ("owner", "status")}
+        else:
+            counts = {kind: {k: v[2] for k, v in sorted(index[kind].items())} for kind in ("owner", "status")}
+        if args.json:
+            print(json.dumps(counts, indent=2))
+        else:
+            for kind, table in counts.items():
+                print(f"{kind}: " + ", ".join(f"{k} {v}" for k, v in table.items()))
+        return 0
+
+    entries = query(index, args.owner or None, args.status or OPEN_STATUSES)
+    if args.json:
+        print(json.dumps([row(index, e) for e in entries], indent=2))
+    else:
+        for line in row_text(board, entries):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
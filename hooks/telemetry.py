@@ -0,0 +1,396 @@
+"""
+Telemetry — opt-in, host-local instrumentation of the hooks.
+
+With "telemetry": true in agent_config.json (or CLAUDE_MEMORY_TELEMETRY=1)
+every hook run appends one compact JSON line to a local file in TEMP
+(claude_telemetry_{uid}_{agent}.jsonl, rotated at telemetry_max_kb):
+
+    {"ts":1760781234.5,"hook":"session_start","agent":"Alice","ms":41.2,
+     "ph":{"fan_out":30.1,"pack":1.2},"rd":18234,"wr":912,"st":23,"op":11,"ls":2,
+     "n":{"snippets_dropped":4,"today_log_bytes":5120}}
+
+    ms      wall time of the run; a process's first run also counts its
+            startup: the interpreter's start-up CPU and every module import
+    ph      per-phase wall time (ms), "startup" and "imports" included
+    rd/wr   bytes read/written by the process (/proc/self/io; Linux only)
+    st/op/ls  stat, open and directory-listing calls on the shared folder
+    n       counters and sizes: truncations, dropped snippets, log and
+            transcript sizes — whatever each hook notes
+
+Off by default, and then free: start() hands back a no-op probe and
+nothing is wrapped. When on, os.stat/lstat/open/listdir/scandir and open()
+are wrapped once per process to count calls on paths under the shared
+folder. Counters are per process: in the warm hook server, events that
+overlap share them, so their counts are approximate.
+
+    python3 telemetry.py report                    # percentiles per hook
+    python3 telemetry.py report --by agent,day [--since 2026-10-01] [--hook heartbeat]
+    python3 telemetry.py report --by phase
+    python3 telemetry.py tail [-n 20]
+
+Part of Claude Code Memory.
+"""
+# Imported by every hook, the heartbeat included: built-in modules only at
+# import time; json and the wrappers only when telemetry is on.
+import os
+import sys
+import time
+
+import hook_config
+
+_cfg = hook_config.load()
+AGENT = _cfg.get("agent", "Agent")
+SHARED = _cfg.get("shared_path", hook_config.SCRIPT_DIR)
+ENABLED = bool(_cfg.get("telemetry", False)) or os.environ.get("CLAUDE_MEMORY_TELEMETRY") == "1"
+MAX_BYTES = int(_cfg.get("telemetry_max_kb", 512)) * 1024
+ROTATIONS = 2  # telemetry.jsonl.1, .2
+
+STATE_KIND = "telemetry"
+FS_CALLS = {"stat": "st", "lstat": "st", "open": "op", "listdir": "ls", "scandir": "ls"}
+
+# Kept on the os module it counts calls on, so that reloading this module (the
+# warm hook server does on config changes) neither wraps twice nor resets them
+_fs = os.__dict__.setdefault("_claude_memory_fs_calls", {"st": 0, "op": 0, "ls": 0})
+_startup_claimed = os.__dict__.setdefault("_claude_memory_startup_claimed", [])
+_active = None
+
+
+def log_path(agent=None) -> str:
+    return hook_config.state_path(STATE_KIND, agent or AGENT, ext=".jsonl")
+
+
+# === Counting ===
+
+def _install():
+    """Wrap the filesystem calls once per process to count those on the shared folder."""
+    if os.__dict__.get("_claude_memory_fs_wrapped"):
+        return
+    import builtins
+    import io
+
+    root = os.path.abspath(str(SHARED))
+
+    def wrap(key, fn):
+        def counted(path=".", *args, **kwargs):
+            if isinstance(path, (str, bytes, os.PathLike)):
+                target = os.fsdecode(os.fspath(path))
+                if not os.path.isabs(target):
+                    target = os.path.join(os.getcwd(), target)
+                if target.startswith(root):
+                    _fs[key] += 1
+            return fn(path, *args, **kwargs)
+        counted.__wrapped__ = fn
+        return counted
+
+    for name, key in FS_CALLS.items():
+        setattr(os, name, wrap(key, getattr(os, name)))
+    builtins.open = io.open = wrap("op", io.open)
+    os._claude_memory_fs_wrapped = True
+
+
+def proc_io() -> dict:
+    """rchar/wchar of this process from /proc/self/io; {} where there is none."""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            lines = f.read().decode().splitlines()
+    except OSError:
+        return {}
+    stats = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        if key in ("rchar", "wchar"):
+            stats[key] = int(value)
+    return stats
+
+
+# === Probes ===
+
+def claim_startup():
+    """(hook_config load time, startup CPU ms) on the process's first call, else None.
+
+    A hook run as its own process is charged its start-up and imports; the
+    warm server claims these itself, so its events only pay for themselves.
+    """
+    if _startup_claimed:
+        return None
+    _startup_claimed.append(True)
+    loaded, cpu = hook_config.LOADED_AT
+    return loaded, cpu * 1000
+
+
+class _Phase:
+    def __init__(self, probe, name):
+        self.probe = probe
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.probe.add(self.name, (time.perf_counter() - self.t0) * 1000)
+
+
+class Probe:
+    """One hook run: phase timers, counters, and the fs/io deltas since start."""
+
+    def __init__(self, hook: str, startup=None):
+        self.hook = hook
+        self.t0 = time.perf_counter()
+        self.phases = {}
+        self.since, self.startup_ms = self.t0, 0.0
+        if startup:
+            self.since, self.startup_ms = startup
+            self.phases["startup"] = self.startup_ms
+            self.phases["imports"] = (self.t0 - self.since) * 1000
+        self.counts = {}
+        self.fs0 = dict(_fs)
+        self.io0 = proc_io()
+
+    def phase(self, name: str):
+        """`with probe.phase("name"):` times a block; repeated names add up."""
+        return _Phase(self, name)
+
+    def add(self, name: str, ms: float):
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    def count(self, key: str, n=1):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    def note(self, key: str, value):
+        self.counts[key] = value
+
+    def finish(self):
+        """Write the run's record; never raises."""
+        global _active
+        if _active is self:
+            _active = None
+        record = {"ts": round(time.time(), 3), "hook": self.hook, "agent": AGENT,
+                  "ms": round(self.startup_ms + (time.perf_counter() - self.since) * 1000, 2),
+                  "ph": {k: round(v, 2) for k, v in self.phases.items()}}
+        io_now = proc_io()
+        if io_now and self.io0:
+            record["rd"] = io_now["rchar"] - self.io0["rchar"]
+            record["wr"] = io_now["wchar"] - self.io0["wchar"]
+        for key, value in _fs.items():
+            record[key] = value - self.fs0[key]
+        if self.counts:
+            record["n"] = self.counts
+        try:
+            import json
+            _append(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+        except (OSError, TypeError, ValueError):
+            pass
+
+
+class _Off:
+    """The probe handed out when telemetry is off: every call does nothing."""
+
+    def phase(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def add(self, name, ms):
+        pass
+
+    def count(self, key, n=1):
+        pass
+
+    def note(self, key, value):
+        pass
+
+    def finish(self):
+        pass
+
+
+OFF = _Off()
+
+
+def start(hook: str):
+    """A probe for one run of hook (the no-op OFF when telemetry is disabled)."""
+    global _active
+    if not ENABLED:
+        return OFF
+    _install()
+    _active = Probe(hook, claim_startup())
+    return _active
+
+
+def count(key: str, n=1):
+    """Bump a counter on the run in progress, from code that has no probe at hand."""
+    if _active is not None:
+        _active.count(key, n)
+
+
+def note(key: str, value):
+    if _active is not None:
+        _active.note(key, value)
+
+
+# === Local log ===
+
+def _append(line: bytes):
+    import shared_io
+
+    path = log_path()
+    try:
+        if os.path.getsize(path) + len(line) > MAX_BYTES:
+            _rotate(path)
+    except OSError:
+        pass
+    shared_io.append_bytes(path, line, fsync=False)
+
+
+def _rotate(path):
+    import shared_io
+
+    with shared_io.file_lock(path):
+        if os.path.getsize(path) <= MAX_BYTES // 2:
+            return  # another process rotated it meanwhile
+        for i in range(ROTATIONS - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+
+def iter_records(paths=None):
+    """Records from every telemetry file on this host (all agents, rotated files included)."""
+    import json
+
+    if paths is None:
+        paths = [p for p in hook_config.state_files(STATE_KIND) if ".jsonl" in p and not p.endswith(".lock")]
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                for raw in f:
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and "hook" in record:
+                        yield record
+        except OSError:
+            continue
+
+
+# === Report ===
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (pct in 0-100)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _day(record) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(record.get("ts", 0)))
+
+
+def group_key(record, by) -> tuple:
+    return tuple(_day(record) if field == "day" else str(record.get(field, "")) for field in by)
+
+
+def summarize(records, by=("hook",)) -> dict:
+    """{group: stats}: run count, ms and bytes-read percentiles, fs call p95, counter totals."""
+    groups = {}
+    for r in records:
+        groups.setdefault(group_key(r, by), []).append(r)
+    out = {}
+    for key, rows in sorted(groups.items()):
+        ms = [r.get("ms", 0) for r in rows]
+        rd = [r["rd"] for r in rows if "rd" in r]
+        counters = {}
+        for r in rows:
+            for name, value in (r.get("n") or {}).items():
+                if isinstance(value, (int, float)):
+                    counters[name] = max(counters.get(name, 0), value) if name.endswith("_bytes") \
+                        else counters.get(name, 0) + value
+        out[key] = {
+            "runs": len(rows),
+            "p50": percentile(ms, 50), "p95": percentile(ms, 95), "p99": percentile(ms, 99),
+            "max": max(ms),
+            "rd_p50": percentile(rd, 50) if rd else None, "rd_p95": percentile(rd, 95) if rd else None,
+            "fs_p95": percentile([r.get("st", 0) + r.get("op", 0) + r.get("ls", 0) for r in rows], 95),
+            "counters": counters,
+        }
+    return out
+
+
+def summarize_phases(records) -> dict:
+    """{(hook, phase): stats} of the per-phase timers."""
+    phases = {}
+    for r in records:
+        for name, ms in (r.get("ph") or {}).items():
+            phases.setdefault((r.get("hook", ""), name), []).append(ms)
+    return {key: {"runs": len(ms), "p50": percentile(ms, 50), "p95": percentile(ms, 95),
+                  "p99": percentile(ms, 99), "max": max(ms)}
+            for key, ms in sorted(phases.items())}
+
+
+def _kb(n):
+    return "-" if n is None else f"{n / 1024:.0f}K"
+
+
+def render(stats: dict, by) -> str:
+    label = "/".join(by)
+    lines = [f"{label:<32} {'runs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+             f"{'read p50':>9} {'read p95':>9} {'fs p95':>7}  counters (sizes: max)"]
+    for key, s in stats.items():
+        counters = ", ".join(f"{k}={v:g}" for k, v in sorted(s["counters"].items()) if v)
+        lines.append(f"{'/'.join(key):<32} {s['runs']:>6} {s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f} "
+                     f"{s['max']:>8.1f} {_kb(s['rd_p50']):>9} {_kb(s['rd_p95']):>9} {s['fs_p95']:>7}  {counters}")
+    return "\n".join(lines)
+
+
+def render_phases(stats: dict) -> str:
+    lines = [f"{'hook/phase':<40} {'runs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+    for (hook, name), s in stats.items():
+        lines.append(f"{hook + '/' + name:<40} {s['runs']:>6} {s['p50']:>8.1f} {s['p95']:>8.1f} "
+                     f"{s['p99']:>8.1f} {s['max']:>8.1f}")
+    return "\n".join(lines)
+
+
+# === CLI ===
+
+def main(argv):
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Summarize the hooks' local telemetry.")
+    ap.add_argument("cmd", nargs="?", default="report", choices=("report", "tail"))
+    ap.add_argument("--by", default="hook", help="comma-separated: hook, agent, day, or phase (default hook)")
+    ap.add_argument("--since", default="", help="YYYY-MM-DD")
+    ap.add_argument("--hook", help="only this hook")
+    ap.add_argument("--agent", help="only this agent")
+    ap.add_argument("-n", type=int, default=20, help="tail: records to show")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    records = [r for r in iter_records()
+               if (not args.since or _day(r) >= args.since)
+               and (not args.hook or r.get("hook") == args.hook)
+               and (not args.agent or r.get("agent") == args.agent)]
+    if not records:
+        print("no telemetry recorded" + ("" if ENABLED else " (set \"telemetry\": true in agent_config.json)"))
+        return 1
+    if args.cmd == "tail":
+        for r in sorted(records, key=lambda r: r.get("ts", 0))[-args.n:]:
+            print(json.dumps(r, separators=(",", ":")))
+        return 0
+
+    by = tuple(f.strip() for f in args.by.split(",") if f.strip())
+    if by == ("phase",):
+        stats = summarize_phases(records)
+        print(json.dumps({"/".join(k): v for k, v in stats.items()}, indent=1) if args.json else render_phases(stats))
+    else:
+        stats = summarize(records, by)
+        print(json.dumps({"/".join(k): v for k, v in stats.items()}, indent=1) if args.json else render(stats, by))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))